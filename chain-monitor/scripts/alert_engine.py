@@ -0,0 +1,265 @@
+#!/usr/bin/env python3
+"""
+链上项目监控 - 流式告警引擎
+
+替代 check_alerts 里"state 旧值 vs 本轮新值"的两条硬编码规则：
+  - 每个代币一个环形窗口（array，定长），记录最近 WINDOW_POINTS 次观测的时间、价格、流动性，
+    增量维护价格 EWMA，窗口内最大 / 最小值按 WINDOW_MINUTES 计算
+  - 规则是数据（RULES）：读哪些特征、阈值、适用范围（AI / 收藏 / 全部）、冷却时间；
+    按输入字段建索引，一次更新只评估输入有变化的规则
+  - 输入（价格、流动性、市值、1h 涨幅）没变的代币直接跳过，一轮的开销与有变化的代币数成正比
+  - 条件由假变真时触发（持续满足不重复告警），同一规则两次告警至少间隔 cooldown 秒；
+    同一代币同一轮同类型的多条规则合并为一条告警
+
+特征：
+  change_1h            上游 1h 涨幅（%）
+  price_change_pct     相对上一次观测的价格变化（%）
+  liq_change_pct       相对上一次观测的流动性变化（%）
+  price_vs_ewma_pct    价格相对 EWMA 的偏离（%）
+  price_drawdown_pct   相对窗口内最高价的回撤（%）
+  liq_drawdown_pct     相对窗口内最高流动性的回撤（%）
+  price_rise_pct       相对窗口内最低价的涨幅（%）
+  liq_rise_pct         相对窗口内最低流动性的涨幅（%）
+窗口包含本次观测；最低值忽略 0（缺失数据），窗口内没有有效值时这两个特征为 0。
+"""
+
+import operator
+from array import array
+
+WINDOW_POINTS = 48        # 每个代币环形窗口的观测数
+WINDOW_MINUTES = 360      # 窗口内最大 / 最小值的时间范围
+EWMA_ALPHA = 0.3
+PRUNE_INTERVAL = 3600     # 清理过期窗口的间隔（秒）
+INPUT_FIELDS = ('price', 'liquidity', 'market_cap', 'price_change_1h')
+
+# 特征 -> 依赖的输入字段
+FEATURE_INPUTS = {
+    'change_1h': ('price_change_1h',),
+    'price_change_pct': ('price',),
+    'liq_change_pct': ('liquidity',),
+    'price_vs_ewma_pct': ('price',),
+    'price_drawdown_pct': ('price',),
+    'liq_drawdown_pct': ('liquidity',),
+    'price_rise_pct': ('price',),
+    'liq_rise_pct': ('liquidity',),
+}
+
+OPS = {
+    '>': operator.gt,
+    '<': operator.lt,
+    'abs>': lambda v, x: abs(v) > x,
+}
+
+# when 中的条件全部满足才触发；scope: ai / fav / all
+RULES = [
+    {'name': 'ai_surge', 'type': 'surge', 'scope': 'ai',
+     'when': [('change_1h', '>', 500)], 'cooldown': 3600},
+    {'name': 'fav_price_move', 'type': 'fav_change', 'scope': 'fav',
+     'when': [('price_change_pct', 'abs>', 50)], 'cooldown': 1800},
+    {'name': 'fav_liq_move', 'type': 'fav_change', 'scope': 'fav',
+     'when': [('liq_change_pct', 'abs>', 50)], 'cooldown': 1800},
+    {'name': 'fav_liq_drain', 'type': 'liq_drain', 'scope': 'fav',
+     'when': [('liq_drawdown_pct', '>', 70)], 'cooldown': 6 * 3600},
+]
+
+
+def index_rules(rules):
+    """输入字段 -> 读到该字段的规则"""
+    index = {}
+    for rule in rules:
+        fields = {f for feat, _, _ in rule['when'] for f in FEATURE_INPUTS[feat]}
+        for f in fields:
+            index.setdefault(f, []).append(rule)
+    return index
+
+
+def _pct(new, old):
+    return (new - old) / old * 100 if old > 0 else 0.0
+
+
+class TokenWindow:
+    """单个代币的环形观测窗口"""
+    __slots__ = ('ts', 'price', 'liq', 'head', 'size', 'ewma', 'inputs', 'seen')
+
+    def __init__(self, points=WINDOW_POINTS):
+        self.ts = array('d', bytes(8 * points))
+        self.price = array('d', bytes(8 * points))
+        self.liq = array('d', bytes(8 * points))
+        self.head = 0          # 下一个写入位置
+        self.size = 0
+        self.ewma = 0.0
+        self.inputs = None     # 上一次观测的输入字段，用于跳过没变化的代币
+        self.seen = 0.0
+
+    def last(self):
+        """上一次观测的 (价格, 流动性)，没有返回 None"""
+        if not self.size:
+            return None
+        i = (self.head - 1) % len(self.ts)
+        return self.price[i], self.liq[i]
+
+    def push(self, ts, price, liq):
+        n = len(self.ts)
+        self.ts[self.head] = ts
+        self.price[self.head] = price
+        self.liq[self.head] = liq
+        self.head = (self.head + 1) % n
+        self.size = min(self.size + 1, n)
+        self.ewma = price if self.size == 1 else EWMA_ALPHA * price + (1 - EWMA_ALPHA) * self.ewma
+        self.seen = ts
+
+    def window_max(self, since):
+        """since 之后的最高价、最高流动性"""
+        n = len(self.ts)
+        max_price = max_liq = 0.0
+        for k in range(self.size):
+            i = (self.head - 1 - k) % n
+            if self.ts[i] < since:
+                break
+            max_price = max(max_price, self.price[i])
+            max_liq = max(max_liq, self.liq[i])
+        return max_price, max_liq
+
+    def window_min(self, since):
+        """since 之后的最低价、最低流动性（忽略 0），没有有效值时为 0"""
+        n = len(self.ts)
+        min_price = min_liq = 0.0
+        for k in range(self.size):
+            i = (self.head - 1 - k) % n
+            if self.ts[i] < since:
+                break
+            price, liq = self.price[i], self.liq[i]
+            if price > 0 and (min_price == 0 or price < min_price):
+                min_price = price
+            if liq > 0 and (min_liq == 0 or liq < min_liq):
+                min_liq = liq
+        return min_price, min_liq
+
+
+class AlertEngine:
+    """按代币维护窗口、按规则索引评估的告警引擎"""
+
+    def __init__(self, rules=RULES, points=WINDOW_POINTS, window_minutes=WINDOW_MINUTES):
+        self.rules = rules
+        self.index = index_rules(rules)
+        self.max_cooldown = max((r['cooldown'] for r in rules), default=0)
+        self.points = points
+        self.window = window_minutes * 60
+        self.windows = {}      # address -> TokenWindow
+        self.fired = {}        # (address, rule name) -> 上次告警时间
+        self.active = set()    # 当前条件满足的 (address, rule name)
+        self._last_prune = 0
+
+    def features(self, w, token, prev, now):
+        price = float(token.get('price', 0) or 0)
+        liq = float(token.get('liquidity', 0) or 0)
+        max_price, max_liq = w.window_max(now - self.window)
+        min_price, min_liq = w.window_min(now - self.window)
+        prev_price, prev_liq = prev or (0.0, 0.0)
+        try:
+            change_1h = float(token.get('price_change_1h', 0) or 0)
+        except (TypeError, ValueError):
+            change_1h = 0.0
+        return {
+            'change_1h': change_1h,
+            'price_change_pct': _pct(price, prev_price) if prev and price > 0 else 0.0,
+            'liq_change_pct': _pct(liq, prev_liq) if prev else 0.0,
+            'price_vs_ewma_pct': _pct(price, w.ewma),
+            'price_drawdown_pct': -_pct(price, max_price) if max_price > 0 else 0.0,
+            'liq_drawdown_pct': -_pct(liq, max_liq) if max_liq > 0 else 0.0,
+            'price_rise_pct': _pct(price, min_price) if min_price > 0 else 0.0,
+            'liq_rise_pct': _pct(liq, min_liq) if min_liq > 0 else 0.0,
+            'price_old': prev_price, 'price_new': price,
+            'liq_old': prev_liq, 'liq_new': liq,
+            'liq_max': max_liq, 'liq_min': min_liq,
+        }
+
+    def _in_scope(self, rule, meta, is_fav):
+        scope = rule['scope']
+        return scope == 'all' or (scope == 'ai' and meta.get('is_ai_mining')) or (scope == 'fav' and is_fav)
+
+    def update(self, tokens, lookup, favs, now):
+        """
+        tokens: 本轮扫描到的代币；lookup(addr) 返回已通知项目（未通知返回 None，不告警）；
+        favs: 收藏地址集合。返回本轮新触发的告警列表。
+        """
+        alerts = []
+        for t in tokens:
+            addr = t.get('address')
+            inputs = tuple(t.get(f) for f in INPUT_FIELDS)
+            w = self.windows.get(addr)
+            if w is not None and w.inputs == inputs:
+                continue  # 没有变化
+            meta = lookup(addr)
+            if meta is None:
+                continue
+            if w is None:
+                w = self.windows[addr] = TokenWindow(self.points)
+            changed = INPUT_FIELDS if w.inputs is None else \
+                [f for f, old, new in zip(INPUT_FIELDS, w.inputs, inputs) if old != new]
+            w.inputs = inputs
+            prev = w.last()
+            w.push(now, float(t.get('price', 0) or 0), float(t.get('liquidity', 0) or 0))
+
+            rules = {id(r): r for f in changed for r in self.index.get(f, ())}
+            if not rules:
+                continue
+            is_fav = addr in favs
+            feats = None
+            hits = {}
+            for rule in rules.values():
+                if not self._in_scope(rule, meta, is_fav):
+                    continue
+                if feats is None:
+                    feats = self.features(w, t, prev, now)
+                key = (addr, rule['name'])
+                if not all(OPS[op](feats[feat], x) for feat, op, x in rule['when']):
+                    self.active.discard(key)
+                    continue
+                if key in self.active:
+                    continue  # 持续满足，不重复告警
+                self.active.add(key)
+                if key in self.fired and now - self.fired[key] < rule['cooldown']:
+                    continue
+                self.fired[key] = now
+                hits.setdefault(rule['type'], []).append(rule['name'])
+
+            for alert_type, names in hits.items():
+                alerts.append({
+                    'type': alert_type,
+                    'rules': names,
+                    'symbol': meta.get('symbol', ''),
+                    'address': addr,
+                    'change_1h': feats['change_1h'],
+                    'market_cap': float(t.get('market_cap', 0) or 0),
+                    'liquidity': feats['liq_new'],
+                    'holders': t.get('holders', 0),
+                    'price_old': feats['price_old'],
+                    'price_new': feats['price_new'],
+                    'price_change_pct': abs(feats['price_change_pct']),
+                    'liq_old': feats['liq_old'],
+                    'liq_new': feats['liq_new'],
+                    'liq_change_pct': abs(feats['liq_change_pct']),
+                    'liq_max': feats['liq_max'],
+                    'liq_drawdown_pct': feats['liq_drawdown_pct'],
+                })
+
+        if now - self._last_prune >= PRUNE_INTERVAL:
+            self.prune(now)
+        return alerts
+
+    def prune(self, now):
+        """删除超过一个窗口没有新观测的代币，返回删除数"""
+        cutoff = now - self.window
+        stale = [addr for addr, w in self.windows.items() if w.seen < cutoff]
+        for addr in stale:
+            del self.windows[addr]
+        if stale:
+            gone = set(stale)
+            self.active = {k for k in self.active if k[0] not in gone}
+            self.fired = {k: ts for k, ts in self.fired.items() if k[0] not in gone or now - ts < self.max_cooldown}
+        self._last_prune = now
+        return len(stale)
+
+    def stats(self):
+        return {'tokens': len(self.windows), 'active': len(self.active), 'rules': len(self.rules)}
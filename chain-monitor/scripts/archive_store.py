@@ -0,0 +1,452 @@
+#!/usr/bin/env python3
+"""
+链上项目监控 - 按日期分区的归档存储
+
+替代单个 archive_db.json：
+  archive/db/YYYY-MM-DD.jsonl   每个开盘日期一个文件，一行一个项目，只追加
+  archive/db/MANIFEST.json      {"dates": {日期: {"count", "ai", "bytes", "dup_symbols", "dup_projects", "sources"
+                                                 [, "segment", "offset", "length"]}}}，只有标量计数，大小随天数增长
+  archive/db/YYYY-MM-DD.rollup.json  该日期的汇总累加量（symbol 计数、来源、流动性 / 市值取值），追加时增量更新
+  archive/db/cold/YYYY-MM.seg   冷存储段：超过 COLD_AFTER_DAYS 天的日期压缩（zlib）后按月追加，
+                                每个日期一个独立压缩块，manifest 记录段文件、偏移和长度，
+                                读一天只解压那一块；冷日期再追加时解压回热分区，段里的旧块成为垃圾，
+                                pack 时垃圾超过一半的段重写为只含有效块的新段（COMPACT_GARBAGE）
+
+归档一天只追加那一天的文件；读者按日期或日期范围加载，不用解析全部历史。
+每个日期的汇总（rollup：条数、AI数、流动性/市值分位数、来源分布、同名统计）放在分区旁的 rollup 文件，
+追加时只用新追加的项目增量更新，不重读分区；合计（summary）只读 manifest，开销随天数而不是项目数增长。
+manifest 中的 bytes 是已提交长度：追加先写数据再原子更新 manifest，
+读取只读到 bytes 为止，崩溃留下的半行在下次追加时截掉。
+旧的 archive_db.json 在第一次写入（append / pack）时持锁迁移（原文件改名为 archive_db.json.migrated），
+只读打开（看板、API）从不迁移。
+
+用法：
+  python3 archive_store.py --pack                 # 把超过 COLD_AFTER_DAYS 天的日期转入冷存储
+  python3 archive_store.py --render 2026-01-01    # 重新生成某天（或 --start/--end 范围）的 markdown
+  python3 archive_store.py --stats                # 热 / 冷存储占用
+"""
+
+import argparse
+import contextlib
+import fcntl
+import json
+import os
+import zlib
+from collections import Counter
+from datetime import datetime, timedelta
+
+ARCHIVE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "archive")
+DB_DIR = os.path.join(ARCHIVE_DIR, "db")
+MANIFEST = "MANIFEST.json"
+LEGACY_DB = "archive_db.json"
+COLD_DIR = "cold"
+COMPACT_GARBAGE = 0.5  # 段中垃圾字节占比超过这个值时 pack 顺带压实
+COLD_AFTER_DAYS = 30    # 开盘日期超过 N 天的分区转入冷存储
+ROLLUP_PERCENTILES = (10, 50, 90)
+
+
+@contextlib.contextmanager
+def _locked(root):
+    """归档目录级文件锁，多个写入进程互斥"""
+    os.makedirs(root, exist_ok=True)
+    with open(os.path.join(root, '.lock'), 'w') as lf:
+        fcntl.flock(lf, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lf, fcntl.LOCK_UN)
+
+
+def _dumps(p):
+    return json.dumps(p, ensure_ascii=False, separators=(',', ':'))
+
+
+def _percentiles(values):
+    """最近秩分位数 {"p10": ..., "p50": ..., "p90": ...}"""
+    if not values:
+        return {}
+    v = sorted(values)
+    return {f"p{q}": v[min(len(v) - 1, len(v) * q // 100)] for q in ROLLUP_PERCENTILES}
+
+
+def _accumulate(acc, projects):
+    """把项目累加进汇总累加量 {"symbols", "sources", "liquidity", "market_cap"}（原地修改并返回）"""
+    symbols = Counter(acc.get('symbols', {}))
+    sources = Counter(acc.get('sources', {}))
+    liq = acc.get('liquidity', [])
+    mc = acc.get('market_cap', [])
+    for p in projects:
+        symbols[p.get('symbol', '')] += 1
+        sources[p.get('source', '?')] += 1
+        liq.append(p.get('liquidity', 0) or 0)
+        mc.append(p.get('market_cap', 0) or 0)
+    liq.sort()
+    mc.sort()
+    acc.update(symbols=dict(symbols), sources=dict(sources), liquidity=liq, market_cap=mc)
+    return acc
+
+
+def _rollup_view(acc, count, ai):
+    """累加量 -> 汇总"""
+    dups = {sym: n for sym, n in acc['symbols'].items() if n > 1}
+    return {
+        'count': count,
+        'ai': ai,
+        'liquidity': _percentiles(acc['liquidity']),
+        'market_cap': _percentiles(acc['market_cap']),
+        'sources': acc['sources'],
+        'symbols': acc['symbols'],
+        'dup_symbols': len(dups),
+        'dup_projects': sum(dups.values()),
+    }
+
+
+def rollup(projects):
+    """一天项目的汇总"""
+    return _rollup_view(_accumulate({}, projects), len(projects),
+                        sum(1 for p in projects if p.get('is_ai_mining')))
+
+
+class ArchiveStore:
+    """{日期: [项目]} 的分区存储"""
+
+    def __init__(self, root=DB_DIR, legacy_file=None):
+        self.root = root
+        self.legacy_file = legacy_file or os.path.join(os.path.dirname(root), LEGACY_DB)
+        self.manifest = self._load_manifest()
+
+    # ---------- manifest ----------
+    def _load_manifest(self):
+        try:
+            with open(os.path.join(self.root, MANIFEST)) as f:
+                m = json.load(f)
+        except (OSError, ValueError):
+            m = {}
+        m.setdefault('dates', {})
+        for entry in m['dates'].values():
+            # 旧格式把整份汇总放在 manifest 里：只留标量，下次保存时变小
+            old = entry.pop('rollup', None)
+            if old is not None:
+                for k in ('dup_symbols', 'dup_projects', 'sources'):
+                    entry.setdefault(k, old.get(k, 0 if k != 'sources' else {}))
+        return m
+
+    def _save_manifest(self):
+        path = os.path.join(self.root, MANIFEST)
+        tmp_file = path + '.tmp'
+        with open(tmp_file, 'w') as f:
+            json.dump(self.manifest, f, ensure_ascii=False, separators=(',', ':'), sort_keys=True)
+        os.rename(tmp_file, path)
+
+    def _rollup_path(self, date_str):
+        return os.path.join(self.root, f"{date_str}.rollup.json")
+
+    def _load_acc(self, date_str):
+        """某一天的汇总累加量；rollup 文件不存在（旧数据）或和已提交字节数对不上（写到一半崩溃）时从分区重算"""
+        committed = self.manifest['dates'].get(date_str, {}).get('bytes', 0)
+        try:
+            with open(self._rollup_path(date_str)) as f:
+                acc = json.load(f)
+            if acc.get('bytes') == committed:
+                return acc
+        except (OSError, ValueError):
+            pass
+        return _accumulate({'bytes': committed}, self.load(date_str))
+
+    def _save_acc(self, date_str, acc):
+        path = self._rollup_path(date_str)
+        tmp_file = path + '.tmp'
+        with open(tmp_file, 'w') as f:
+            f.write(json.dumps(acc, ensure_ascii=False, separators=(',', ':')))
+        os.rename(tmp_file, path)
+
+    def refresh(self):
+        """重新读取 manifest（其他进程可能已追加）"""
+        self.manifest = self._load_manifest()
+
+    def dates(self):
+        return sorted(self.manifest['dates'])
+
+    def count(self, date_str):
+        return self.manifest['dates'].get(date_str, {}).get('count', 0)
+
+    def ai_count(self, date_str):
+        return self.manifest['dates'].get(date_str, {}).get('ai', 0)
+
+    def is_cold(self, date_str):
+        return 'segment' in self.manifest['dates'].get(date_str, {})
+
+    def stamp(self, date_str):
+        """热分区当前的 (项目数, 字节数)，用于判断调用方缓存的 load 结果是否过期；冷日期或不存在时返回 None"""
+        entry = self.manifest['dates'].get(date_str)
+        if entry is None or 'segment' in entry:
+            return None
+        return entry['count'], entry['bytes']
+
+    def rollup(self, date_str):
+        """某一天的汇总（读该日期的 rollup 文件）"""
+        entry = self.manifest['dates'].get(date_str)
+        if entry is None:
+            return rollup([])
+        return _rollup_view(self._load_acc(date_str), entry['count'], entry['ai'])
+
+    def summary(self, start=None, end=None):
+        """[start, end] 范围内各日期汇总的合计（只读 manifest）"""
+        out = {'days': 0, 'count': 0, 'ai': 0, 'dup_projects': 0, 'sources': Counter()}
+        for d in self.dates():
+            if (start and d < start) or (end and d > end):
+                continue
+            entry = self.manifest['dates'][d]
+            if 'dup_projects' not in entry:
+                entry.update({k: v for k, v in self.rollup(d).items()
+                              if k in ('dup_symbols', 'dup_projects', 'sources')})
+            out['days'] += 1
+            out['count'] += entry['count']
+            out['ai'] += entry['ai']
+            out['dup_projects'] += entry['dup_projects']
+            out['sources'].update(entry['sources'])
+        out['sources'] = dict(out['sources'])
+        return out
+
+    def __contains__(self, date_str):
+        return date_str in self.manifest['dates']
+
+    def __len__(self):
+        return sum(e['count'] for e in self.manifest['dates'].values())
+
+    # ---------- 读 ----------
+    def _path(self, date_str):
+        return os.path.join(self.root, f"{date_str}.jsonl")
+
+    def _read_raw(self, date_str):
+        """某一天已提交的 JSONL 字节；冷日期只解压对应的块"""
+        entry = self.manifest['dates'].get(date_str, {})
+        if 'segment' in entry:
+            try:
+                f = open(os.path.join(self.root, COLD_DIR, entry['segment']), 'rb')
+            except FileNotFoundError:
+                # 段刚被压实改名，按新 manifest 重读一次
+                self.refresh()
+                entry = self.manifest['dates'].get(date_str, {})
+                f = open(os.path.join(self.root, COLD_DIR, entry['segment']), 'rb')
+            with f:
+                f.seek(entry['offset'])
+                return zlib.decompress(f.read(entry['length']))
+        if not entry.get('bytes'):
+            return b''
+        with open(self._path(date_str), 'rb') as f:
+            return f.read(entry['bytes'])
+
+    def load(self, date_str):
+        """读取某一天的全部项目（按追加顺序）"""
+        return [json.loads(line) for line in self._read_raw(date_str).splitlines() if line.strip()]
+
+    def find(self, date_str, address):
+        """在某一天中查找单个项目，找不到返回 None"""
+        needle = f'"address":{json.dumps(address)}'.encode()
+        for line in self._read_raw(date_str).splitlines():
+            if needle in line:
+                p = json.loads(line)
+                if p.get('address') == address:
+                    return p
+        return None
+
+    def load_range(self, start=None, end=None):
+        """读取 [start, end] 日期范围（含两端，None 表示不限）的项目：{日期: [项目]}"""
+        return {d: self.load(d) for d in self.dates()
+                if (start is None or d >= start) and (end is None or d <= end)}
+
+    # ---------- 写 ----------
+    def append(self, date_str, projects):
+        """追加某一天的项目，返回追加条数"""
+        if not projects:
+            return 0
+        with _locked(self.root):
+            self.refresh()
+            self._migrate_locked()
+            self._append_locked(date_str, projects)
+        return len(projects)
+
+    def _append_locked(self, date_str, projects):
+        """append 的主体，调用方已持锁并 refresh"""
+        data = ''.join(_dumps(p) + '\n' for p in projects).encode()
+        if self.is_cold(date_str):
+            self._thaw(date_str)
+        entry = self.manifest['dates'].setdefault(date_str, {'count': 0, 'ai': 0, 'bytes': 0})
+        acc = self._load_acc(date_str) if entry['bytes'] else {}  # 先于写入读取，补算时不含新项目
+        with open(self._path(date_str), 'ab') as f:
+            f.truncate(entry['bytes'])  # 丢弃未提交的半行
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        entry['bytes'] += len(data)
+        entry['count'] += len(projects)
+        entry['ai'] += sum(1 for p in projects if p.get('is_ai_mining'))
+        # 汇总只累加新项目，不重读分区
+        view = _rollup_view(_accumulate(acc, projects), entry['count'], entry['ai'])
+        acc['bytes'] = entry['bytes']
+        self._save_acc(date_str, acc)
+        entry.update(dup_symbols=view['dup_symbols'], dup_projects=view['dup_projects'], sources=view['sources'])
+        self._save_manifest()
+
+    # ---------- 冷存储 ----------
+    def _thaw(self, date_str):
+        """冷日期需要追加时先解压回热分区（段中的旧块成为垃圾，不影响读取，由 _compact_locked 回收）"""
+        raw = self._read_raw(date_str)
+        with open(self._path(date_str), 'wb') as f:
+            f.write(raw)
+            f.flush()
+            os.fsync(f.fileno())
+        entry = self.manifest['dates'][date_str]
+        for k in ('segment', 'offset', 'length'):
+            entry.pop(k, None)
+        entry['bytes'] = len(raw)
+        self._save_manifest()
+
+    def pack(self, before):
+        """
+        把开盘日期早于 before（YYYY-MM-DD）的热分区压缩进按月的段文件，
+        删除原 JSONL，返回转入冷存储的日期列表。
+        """
+        packed = []
+        cold_dir = os.path.join(self.root, COLD_DIR)
+        with _locked(self.root):
+            self.refresh()
+            self._migrate_locked()
+            for date_str in self.dates():
+                entry = self.manifest['dates'][date_str]
+                if date_str >= before or 'segment' in entry or date_str == 'unknown':
+                    continue
+                block = zlib.compress(self._read_raw(date_str), 9)
+                os.makedirs(cold_dir, exist_ok=True)
+                segment = f"{date_str[:7]}.seg"
+                with open(os.path.join(cold_dir, segment), 'ab') as f:
+                    offset = f.tell()
+                    f.write(block)
+                    f.flush()
+                    os.fsync(f.fileno())
+                entry.update(segment=segment, offset=offset, length=len(block))
+                self._save_manifest()
+                try:
+                    os.remove(self._path(date_str))
+                except FileNotFoundError:
+                    pass
+                packed.append(date_str)
+            self._compact_locked()
+        return packed
+
+    def _compact_locked(self, threshold=COMPACT_GARBAGE):
+        """
+        重写垃圾占比超过 threshold 的段：有效块拷到新文件名的段，manifest 指向新段后再删旧段，
+        持有旧 manifest 的读者打开旧段失败时会 refresh 重读。调用方已持锁。返回压实的段数。
+        """
+        cold_dir = os.path.join(self.root, COLD_DIR)
+        live = {}
+        for date_str, entry in self.manifest['dates'].items():
+            if 'segment' in entry:
+                live.setdefault(entry['segment'], []).append(date_str)
+        compacted = 0
+        for name in (sorted(os.listdir(cold_dir)) if os.path.isdir(cold_dir) else []):
+            if not name.endswith('.seg'):
+                continue
+            path = os.path.join(cold_dir, name)
+            size = os.path.getsize(path)
+            used = sum(self.manifest['dates'][d]['length'] for d in live.get(name, []))
+            if not size or (size - used) / size <= threshold:
+                continue
+            compacted += 1
+            if not used:
+                os.remove(path)
+                continue
+            new_name = f"{name[:7]}.{int(datetime.now().timestamp() * 1000)}.seg"
+            moves = {}
+            with open(path, 'rb') as src, open(os.path.join(cold_dir, new_name), 'wb') as dst:
+                for date_str in sorted(live[name]):
+                    entry = self.manifest['dates'][date_str]
+                    src.seek(entry['offset'])
+                    moves[date_str] = dst.tell()
+                    dst.write(src.read(entry['length']))
+                dst.flush()
+                os.fsync(dst.fileno())
+            for date_str, offset in moves.items():
+                self.manifest['dates'][date_str].update(segment=new_name, offset=offset)
+            self._save_manifest()
+            os.remove(path)
+        return compacted
+
+    def pack_expired(self, days=COLD_AFTER_DAYS, now=None):
+        """按 COLD_AFTER_DAYS 转入冷存储"""
+        now = now or datetime.now()
+        return self.pack((now - timedelta(days=days)).strftime('%Y-%m-%d'))
+
+    def disk_usage(self):
+        """(热分区字节, 冷存储字节, 冷存储解压后字节)"""
+        hot = cold_raw = 0
+        for entry in self.manifest['dates'].values():
+            if 'segment' in entry:
+                cold_raw += entry['bytes']
+            else:
+                hot += entry['bytes']
+        cold_dir = os.path.join(self.root, COLD_DIR)
+        cold = sum(os.path.getsize(os.path.join(cold_dir, n)) for n in os.listdir(cold_dir)) \
+            if os.path.isdir(cold_dir) else 0
+        return hot, cold, cold_raw
+
+    def migrate(self):
+        """把旧的 archive_db.json 拆分到按日期的分区（写入方调用；没有旧文件时什么都不做）"""
+        with _locked(self.root):
+            self.refresh()
+            self._migrate_locked()
+
+    def _migrate_locked(self):
+        # 持锁后再检查：另一个写入进程可能刚迁移完并改名
+        if not os.path.exists(self.legacy_file):
+            return
+        with open(self.legacy_file) as f:
+            db = json.load(f)
+        for date_str, projects in sorted(db.items()):
+            if date_str in self.manifest['dates'] or not projects:
+                continue
+            self._append_locked(date_str, projects)
+        os.rename(self.legacy_file, self.legacy_file + '.migrated')
+
+
+def main():
+    parser = argparse.ArgumentParser(description="归档存储维护")
+    parser.add_argument('--pack', action='store_true', help="把超过 --days 天的日期转入冷存储")
+    parser.add_argument('--days', type=int, default=COLD_AFTER_DAYS)
+    parser.add_argument('--render', nargs='*', metavar='DATE', help="重新生成指定日期的 markdown")
+    parser.add_argument('--start', help="--render 日期范围起")
+    parser.add_argument('--end', help="--render 日期范围止")
+    parser.add_argument('--stats', action='store_true', help="热 / 冷存储占用")
+    args = parser.parse_args()
+
+    store = ArchiveStore()
+    packed = []
+    if args.pack:
+        packed = store.pack_expired(args.days)
+        print(f"✅ 转入冷存储: {len(packed)} 天")
+    if args.render is not None:
+        from gmgn_monitor import render_day_file
+        dates = args.render or [d for d in store.dates()
+                                if (not args.start or d >= args.start) and (not args.end or d <= args.end)]
+        for date_str in dates:
+            if date_str not in store:
+                print(f"❌ 没有 {date_str} 的归档")
+                continue
+            path = render_day_file(date_str, store.load(date_str))
+            print(f"📁 {path}")
+    if packed or args.render is not None:
+        # 转冷的日期删除 markdown、INDEX.md 改为 🧊 行；重新生成过的日期恢复链接
+        from gmgn_monitor import sync_archive_index
+        sync_archive_index(store, packed)
+        print("📋 INDEX.md 已更新")
+    if args.stats:
+        hot, cold, cold_raw = store.disk_usage()
+        n_cold = sum(1 for d in store.dates() if store.is_cold(d))
+        print(f"日期: {len(store.dates())} (冷 {n_cold}) | 项目: {len(store)}")
+        print(f"热分区: {hot/1e6:.2f}MB | 冷存储: {cold/1e6:.2f}MB (解压后 {cold_raw/1e6:.2f}MB)")
+
+
+if __name__ == '__main__':
+    main()
@@ -7,10 +7,14 @@
 
 import json
 import os
+import argparse
 import time
-import requests
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 
+import http_client
+from renderer import is_fake_mc, render_text
+
 CHAIN = "base"
 MIN_LIQUIDITY = 5000
 MIN_HOLDERS = 20
@@ -48,6 +52,13 @@ DEXSCREENER_HEADERS = {
     "Accept": "application/json",
 }
 
+ENRICH_WORKERS = 8   # 补查并发数
+# 各域名每秒请求上限，按服务方公开的配额设置（见 references/data-sources.md「限流注意」）；
+# gmgn.ai、api.honeypot.is 没有公开配额，不按域名限速，补查并发由 ENRICH_WORKERS 限制
+HOST_RATE_LIMITS = {
+    'api.dexscreener.com': 5,   # search / pairs / tokens 接口 300 次/分钟
+}
+
 NOW = int(time.time())
 CUTOFF = NOW - 48 * 3600
 
@@ -68,7 +79,7 @@ def fetch_gmgn_token_detail(address):
     """从 GMGN api/v1/token_info 获取单个 token 详情"""
     try:
         url = f"https://gmgn.ai/api/v1/token_info/{CHAIN}/{address}"
-        resp = requests.get(url, headers=GMGN_HEADERS, timeout=10)
+        resp = http_client.get(url, headers=GMGN_HEADERS, timeout=10)
         data = resp.json()
         if data.get('code') == 0:
             return data.get('data', {})
@@ -82,8 +93,8 @@ def fetch_gmgn_token_detail(address):
 def fetch_honeypot_check(address):
     """从 honeypot.is 获取真实税率和貔貅检测结果"""
     try:
-        url = f"https://api.honeypot.is/v2/IsHoneypot?address={address}&chainId=8453"
-        resp = requests.get(url, timeout=10)
+        url = f"https://api.honeypot.is/v2/IsHoneypot?address={address}&chainID=8453"
+        resp = http_client.get(url, timeout=10)
         data = resp.json()
         result = {}
         if data.get('honeypotResult'):
@@ -100,6 +111,14 @@ def fetch_honeypot_check(address):
     return {}
 
 
+def fetch_concurrent(fetch, addresses, workers=ENRICH_WORKERS):
+    """并发调用 fetch(address)，返回 {address: 结果}（限流由 http_client 按域名控制）"""
+    if not addresses:
+        return {}
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        return dict(zip(addresses, pool.map(fetch, addresses)))
+
+
 # === 数据源 1: GMGN rank ===
 def fetch_gmgn_rank():
     all_tokens = []
@@ -107,13 +126,13 @@ def fetch_gmgn_rank():
         try:
             url = f"https://gmgn.ai/defi/quotation/v1/rank/{CHAIN}/swaps/{timeframe}"
             params = {"limit": 100, "orderby": "open_timestamp", "direction": "desc", "tag": "graduated"}
-            resp = requests.get(url, params=params, headers=GMGN_HEADERS, timeout=15)
+            resp = http_client.get(url, params=params, headers=GMGN_HEADERS, timeout=15)
             data = resp.json()
             if data.get('code') == 0:
                 tokens = data['data']['rank']
                 log(f"[GMGN-rank/{timeframe}] {len(tokens)} 个项目")
                 all_tokens.extend(tokens)
-            time.sleep(0.5)
+            http_client.sleep(0.5)
         except Exception as e:
             log(f"[GMGN-rank/{timeframe}] error: {e}")
     return all_tokens
@@ -154,7 +173,7 @@ def fetch_gmgn_pairs():
     try:
         url = f"https://gmgn.ai/defi/quotation/v1/pairs/{CHAIN}/new_pairs"
         params = {"limit": 100, "orderby": "open_timestamp", "direction": "desc"}
-        resp = requests.get(url, params=params, headers=GMGN_HEADERS, timeout=15)
+        resp = http_client.get(url, params=params, headers=GMGN_HEADERS, timeout=15)
         data = resp.json()
         if data.get('code') == 0:
             pairs = data['data'].get('pairs', [])
@@ -203,7 +222,7 @@ def fetch_dexscreener():
     all_tokens = {}
     for kw in DEXSCREENER_KEYWORDS:
         try:
-            resp = requests.get(
+            resp = http_client.get(
                 f'https://api.dexscreener.com/latest/dex/search?q={kw}',
                 headers=DEXSCREENER_HEADERS, timeout=15
             )
@@ -215,7 +234,7 @@ def fetch_dexscreener():
                 addr = (p.get('baseToken', {}).get('address') or '').lower()
                 if addr and addr not in all_tokens:
                     all_tokens[addr] = p
-            time.sleep(0.3)
+            http_client.sleep(0.3)
         except Exception as e:
             log(f"[DexScreener] '{kw}' error: {e}")
     log(f"[DexScreener] 共 {len(all_tokens)} 个 Base 链项目")
@@ -224,7 +243,7 @@ def fetch_dexscreener():
 
 def parse_dexscreener(p):
     bt = p.get('baseToken', {})
-    now_ms = time.time() * 1000
+    now_ms = NOW * 1000
     created = p.get('pairCreatedAt') or 0
     age_hours = (now_ms - created) / 3600000 if created else 0
     txns_1h = p.get('txns', {}).get('h1', {})
@@ -268,6 +287,31 @@ def parse_dexscreener(p):
 
 
 def main():
+    global NOW, CUTOFF
+    parser = argparse.ArgumentParser(description="48小时回测")
+    parser.add_argument('--record', action='store_true', help="请求上游的同时录制响应")
+    parser.add_argument('--replay', action='store_true', help="离线回放录制的响应（不联网、不等待）")
+    parser.add_argument('--cassettes', default=http_client.CASSETTE_DIR, help="录制文件目录")
+    parser.add_argument('--at', type=http_client.parse_time,
+                        help="回放时钟（时间戳或 'YYYY-MM-DD HH:MM'），默认为最后一次录制时间")
+    parser.add_argument('--workers', type=int, default=ENRICH_WORKERS, help="补查并发数")
+    args = parser.parse_args()
+
+    if args.replay:
+        http_client.configure('replay', args.cassettes)
+        clock = args.at or http_client.recorded_range()[1]
+        if clock is None:
+            log(f"❌ {args.cassettes} 中没有录制文件")
+            return
+        http_client.set_clock(clock)
+        # 年龄、回测范围都以回放时钟为准，结果可复现
+        NOW = int(clock)
+        CUTOFF = NOW - 48 * 3600
+    elif args.record:
+        http_client.configure('record', args.cassettes)
+    for host, rate in HOST_RATE_LIMITS.items():
+        http_client.set_rate_limit(host, rate)
+
     log("=" * 60)
     log("链上项目监控 - 48小时回测")
     log(f"回测范围: {datetime.fromtimestamp(CUTOFF).strftime('%m-%d %H:%M')} ~ {datetime.fromtimestamp(NOW).strftime('%m-%d %H:%M')}")
@@ -346,12 +390,14 @@ def main():
             continue
         quality[k] = v
 
-    # 对持有人为0的项目，从 GMGN token_info API 补查
+    # GMGN token_info 每个项目只查一次：补持有人 / 缺失字段，同时做流动性二次验证
+    t0 = time.time()
+    details = fetch_concurrent(fetch_gmgn_token_detail, list(quality), args.workers)
     missing_holders = [addr for addr, v in quality.items() if v['holders'] == 0]
     if missing_holders:
         log(f"补查 {len(missing_holders)} 个缺失持有人数据的项目...")
         for addr in missing_holders:
-            info = fetch_gmgn_token_detail(addr)
+            info = details.get(addr)
             if info:
                 holders = int(info.get('holder_count') or 0)
                 if holders > 0:
@@ -369,19 +415,17 @@ def main():
                     ots = int(info['open_timestamp'])
                     quality[addr]['age_hours'] = round((NOW - ots) / 3600, 1)
                     quality[addr]['open_timestamp'] = ots
-            time.sleep(0.3)
         # 补查后重新过滤持有人不足的和超龄的
         to_remove = [k for k, v in quality.items()
                      if (0 < v['holders'] < MIN_HOLDERS) or v['age_hours'] > MAX_AGE_HOURS]
         for k in to_remove:
             del quality[k]
 
-    # 流动性二次验证 + Honeypot.is 真实税率检测
+    # 流动性二次验证
     log(f"流动性二次验证 + 貔貅检测...")
     to_remove = []
     for addr, v in quality.items():
-        # 1. GMGN 流动性验证
-        info = fetch_gmgn_token_detail(addr)
+        info = details.get(addr)
         if info:
             real_liq = float(info.get('liquidity') or 0)
             if real_liq < MIN_LIQUIDITY and v['liquidity'] >= MIN_LIQUIDITY:
@@ -390,8 +434,12 @@ def main():
                 continue
             elif real_liq > 0 and v['liquidity'] > 0:
                 v['liquidity'] = real_liq
-        # 2. Honeypot.is 真实税率检测
-        hp = fetch_honeypot_check(addr)
+    for k in to_remove:
+        del quality[k]
+
+    # Honeypot.is 真实税率检测（只查通过验证的项目）
+    for addr, hp in fetch_concurrent(fetch_honeypot_check, list(quality), args.workers).items():
+        v = quality[addr]
         if hp:
             if hp.get('is_honeypot') == 1:
                 v['is_honeypot'] = 1
@@ -403,9 +451,7 @@ def main():
                 v['sell_tax'] = hp['sell_tax']
             if hp.get('sell_tax', 0) >= 50:
                 log(f"  ⚠️ {v['symbol']}: 卖出税 {hp['sell_tax']}%")
-        time.sleep(0.2)
-    for k in to_remove:
-        del quality[k]
+    log(f"补查用时 {time.time() - t0:.1f}s（{args.workers} 并发）")
 
     log(f"质量过滤后: {len(quality)} 个")
 
@@ -421,6 +467,9 @@ def main():
     ai_count = sum(1 for r in results if r['is_ai_mining'])
     log(f"\n{'=' * 60}")
     log(f"回测结果: {len(results)} 个项目 (AI挖矿: {ai_count})")
+    if http_client.mode() == 'replay' and http_client.misses():
+        # 监控录制不含 6h/24h 排行和 token_info，这部分补充数据缺省
+        log(f"⚠️ {http_client.misses()} 个请求没有录制（6h/24h 排行、token_info 只在 --record 录制中）")
     log(f"{'=' * 60}")
 
     # 数据源统计
@@ -431,64 +480,6 @@ def main():
     for src, cnt in sorted(src_count.items()):
         log(f"  数据源 {src}: {cnt} 个")
 
-    # 数据异常检测
-    def get_warnings(p):
-        warns = []
-        mc = p['market_cap']
-        liq = p['liquidity']
-        if liq > 0 and mc / liq > 1000:
-            warns.append(f"MC/Liq比={mc/liq:.0f}x，疑似假市值")
-        elif liq > 0 and mc / liq > 100:
-            warns.append(f"MC/Liq比={mc/liq:.0f}x，市值偏高")
-        if p['age_hours'] == 0 and p['source'] == 'dexscreener':
-            warns.append("age=0h，可能是新pair非新币")
-        if p['holders'] == 0 and p['source'] == 'dexscreener':
-            warns.append("持有人数据缺失")
-        # 貔貅盘检测
-        if p.get('is_honeypot') == 1:
-            warns.append("🚫 貔貅盘（Honeypot）！只能买不能卖")
-        # 买卖税检测
-        buy_tax = p.get('buy_tax')
-        sell_tax = p.get('sell_tax')
-        if buy_tax is not None and float(buy_tax) > 5:
-            warns.append(f"买入税 {float(buy_tax):.1f}%")
-        if sell_tax is not None and float(sell_tax) > 5:
-            warns.append(f"卖出税 {float(sell_tax):.1f}%")
-        if sell_tax is not None and float(sell_tax) > 30:
-            warns.append("🚫 卖出税过高，疑似貔貅")
-        # Rug 风险
-        rug = p.get('rug_ratio')
-        if rug is not None and float(rug) > 0.5:
-            warns.append(f"⛔ Rug风险 {float(rug)*100:.0f}%")
-        elif rug is not None and float(rug) > 0.2:
-            warns.append(f"Rug风险 {float(rug)*100:.0f}%")
-        return warns
-
-    # 安全标签生成
-    def get_security_tags(p):
-        tags = []
-        if p.get('renounced') == 1:
-            tags.append("✅弃权")
-        elif p.get('renounced') == 0 and p.get('renounced') is not None:
-            tags.append("❌未弃权")
-        if p.get('is_open_source') == 1:
-            tags.append("✅开源")
-        elif p.get('is_open_source') == 0 and p.get('is_open_source') is not None:
-            tags.append("❌未开源")
-        if p.get('is_honeypot') == 1:
-            tags.append("🚫貔貅")
-        elif p.get('is_honeypot') == 0 and p.get('is_honeypot') is not None:
-            tags.append("✅非貔貅")
-        buy_tax = p.get('buy_tax')
-        sell_tax = p.get('sell_tax')
-        if buy_tax is not None and sell_tax is not None:
-            tags.append(f"税:{float(buy_tax):.1f}%/{float(sell_tax):.1f}%")
-        return tags
-
-    # 重点项目检测（有网页/社交资料）
-    def is_featured(p):
-        return bool(p.get('website') or p.get('twitter') or p.get('telegram'))
-
     # 同名检测：当批结果 + 历史 notified_full 合并统计
     from collections import Counter
     _symbol_counts = Counter(r['symbol'] for r in results)
@@ -499,6 +490,9 @@ def main():
         if os.path.exists(_state_file):
             with open(_state_file) as _sf:
                 _hist = _json.load(_sf).get('notified_full', {})
+            # 监控把冷项目溢出到磁盘，合并后才是完整历史
+            from notified_store import dump_all
+            _hist = dump_all(hot=_hist)
             for _addr, _hp in _hist.items():
                 _sym = _hp.get('symbol', '')
                 if _sym:
@@ -510,63 +504,6 @@ def main():
     except Exception:
         pass
 
-    def _display_name(p):
-        """同名项目在 symbol 后加合约地址前6位+同名数量"""
-        sym = p['symbol']
-        cnt = _symbol_counts.get(sym, 1)
-        if cnt > 1:
-            return f"{sym} ({p['address'][:6]}) [同名×{cnt}]"
-        return sym
-
-    def format_project(i, p, show_keywords=False):
-        lines = []
-        warns = get_warnings(p)
-        featured = is_featured(p)
-        # 标题行
-        prefix = ""
-        if featured and warns:
-            prefix = "⭐⚠️ "
-        elif featured:
-            prefix = "⭐ "
-        elif warns:
-            prefix = "⚠️ "
-        suffix = ""
-        if featured:
-            suffix += " — 有网页资料"
-        lines.append(f"  {prefix}#{i} {_display_name(p)}{suffix}")
-        lines.append(f"     合约: {p['address']}")
-        lines.append(f"     MC: ${p['market_cap']:,.0f} | 流动性: ${p['liquidity']:,.0f} | 持有人: {p['holders']}")
-        try:
-            chg_val = float(p['price_change_1h']) if p['price_change_1h'] else 0
-        except (ValueError, TypeError):
-            chg_val = 0
-        chg_str = f"+{chg_val:.1f}%" if chg_val > 0 else f"{chg_val:.1f}%"
-        lines.append(f"     年龄: {p['age_hours']}h | 1h: {chg_str} | 来源: {p['source']}")
-        # 安全标签
-        sec_tags = get_security_tags(p)
-        if sec_tags:
-            lines.append(f"     🔒 {' | '.join(sec_tags)}")
-        if show_keywords and p.get('ai_keywords'):
-            lines.append(f"     关键词: {', '.join(p['ai_keywords'])}")
-        if p.get('website'):
-            lines.append(f"     🌐 {p['website']}")
-        if p.get('twitter'):
-            lines.append(f"     🐦 @{p['twitter']}")
-        if p.get('telegram'):
-            lines.append(f"     💬 {p['telegram']}")
-        lines.append(f"     🔗 gmgn.ai/base/token/{p['address']}")
-        if warns:
-            for w in warns:
-                lines.append(f"     ⚠️ {w}")
-        lines.append("")
-        return lines
-
-    # 疑似假市值判断
-    def _is_fake_mc(p):
-        liq = p.get('liquidity', 0)
-        mc = p.get('market_cap', 0)
-        return liq > 0 and mc / liq > 1000
-
     # 新项目检测：不在历史 notified_full 里的
     _hist_addrs = set(_hist.keys()) if '_hist' in dir() else set()
     try:
@@ -575,7 +512,8 @@ def main():
             _sf2 = "/tmp/gmgn_monitor_state.json"
             if os.path.exists(_sf2):
                 with open(_sf2) as _f2:
-                    _hist_addrs = set(_json2.load(_f2).get('notified_full', {}).keys())
+                    from notified_store import dump_all
+                    _hist_addrs = set(dump_all(hot=_json2.load(_f2).get('notified_full', {})).keys())
     except Exception:
         pass
 
@@ -583,39 +521,39 @@ def main():
         return p['address'] not in _hist_addrs
 
     # 四分类：新项目、AI挖矿、其他、疑似假市值
-    new_projects = [r for r in results if _is_new(r) and not _is_fake_mc(r)]
+    new_projects = [r for r in results if _is_new(r) and not is_fake_mc(r)]
     new_addrs = {r['address'] for r in new_projects}
-    ai_projects = [r for r in results if r['is_ai_mining'] and not _is_fake_mc(r) and r['address'] not in new_addrs]
-    normal = [r for r in results if not r['is_ai_mining'] and not _is_fake_mc(r) and r['address'] not in new_addrs]
-    fake_mc = [r for r in results if _is_fake_mc(r)]
+    ai_projects = [r for r in results if r['is_ai_mining'] and not is_fake_mc(r) and r['address'] not in new_addrs]
+    normal = [r for r in results if not r['is_ai_mining'] and not is_fake_mc(r) and r['address'] not in new_addrs]
+    fake_mc = [r for r in results if is_fake_mc(r)]
 
     if new_projects:
         log(f"\n🆕 新项目 ({len(new_projects)}):")
         log("-" * 60)
         for i, p in enumerate(new_projects, 1):
-            for line in format_project(i, p, show_keywords=p.get('is_ai_mining', False)):
-                log(line)
+            log(render_text(p, i, _symbol_counts.get(p['symbol'], 1), p.get('is_ai_mining', False), indent='     ', title_indent='  '))
+            log("")
 
     if ai_projects:
         log(f"\n🤖 AI 挖矿项目 ({len(ai_projects)}):")
         log("-" * 60)
         for i, p in enumerate(ai_projects, 1):
-            for line in format_project(i, p, show_keywords=True):
-                log(line)
+            log(render_text(p, i, _symbol_counts.get(p['symbol'], 1), True, indent='     ', title_indent='  '))
+            log("")
 
     if normal:
         log(f"\n📊 其他项目 ({len(normal)}):")
         log("-" * 60)
         for i, p in enumerate(normal, 1):
-            for line in format_project(i, p):
-                log(line)
+            log(render_text(p, i, _symbol_counts.get(p['symbol'], 1), False, indent='     ', title_indent='  '))
+            log("")
 
     if fake_mc:
         log(f"\n⚠️ 疑似假市值 ({len(fake_mc)}):")
         log("-" * 60)
         for i, p in enumerate(fake_mc, 1):
-            for line in format_project(i, p, show_keywords=p.get('is_ai_mining', False)):
-                log(line)
+            log(render_text(p, i, _symbol_counts.get(p['symbol'], 1), p.get('is_ai_mining', False), indent='     ', title_indent='  '))
+            log("")
 
     # 保存完整结果
     out_file = "/tmp/backtest_48h_results.json"
@@ -625,14 +563,14 @@ def main():
 
     # 生成格式化报告文件（供 AI 直接转发，省 token）
     report_file = "/tmp/backtest_report.txt"
-    _generate_report(results, new_projects, ai_projects, normal, fake_mc, _display_name, get_security_tags, get_warnings, report_file)
+    _generate_report(results, new_projects, ai_projects, normal, fake_mc, _symbol_counts, report_file)
     log(f"格式化报告已保存: {report_file}")
 
 
-def _generate_report(results, new_projects, ai_projects, normal, fake_mc, display_name_fn, sec_tags_fn, warns_fn, out_path):
+def _generate_report(results, new_projects, ai_projects, normal, fake_mc, symbol_counts, out_path):
     """生成可直接发送的格式化报告"""
     from datetime import datetime, timedelta
-    now = datetime.now()
+    now = datetime.fromtimestamp(NOW)
     start = now - timedelta(hours=48)
     lines = []
 
@@ -648,54 +586,8 @@ def _generate_report(results, new_projects, ai_projects, normal, fake_mc, displa
     lines.append(summary)
     lines.append("")
 
-    def _fmt_mc(val):
-        if val >= 1_000_000_000:
-            return f"${val/1_000_000_000:.2f}B"
-        elif val >= 1_000_000:
-            return f"${val/1_000_000:.2f}M"
-        elif val >= 1_000:
-            return f"${val/1_000:.0f}K"
-        return f"${val:.0f}"
-
     def _fmt_project(i, p, show_kw=False):
-        plines = []
-        warns = warns_fn(p)
-        has_web = bool(p.get('website') or p.get('twitter') or p.get('telegram'))
-        prefix = ""
-        if has_web and warns:
-            prefix = "⭐⚠️ "
-        elif has_web:
-            prefix = "⭐ "
-        elif warns:
-            prefix = "⚠️ "
-        suffix = ""
-        if has_web:
-            suffix = " — 有网页资料"
-        plines.append(f"{prefix}#{i} {display_name_fn(p)}{suffix}")
-        plines.append(f"合约: {p['address']}")
-        plines.append(f"MC: {_fmt_mc(p['market_cap'])} | 流动性: {_fmt_mc(p['liquidity'])} | 持有人: {p['holders']:,}")
-        try:
-            chg = float(p['price_change_1h']) if p['price_change_1h'] else 0
-        except (ValueError, TypeError):
-            chg = 0
-        chg_str = f"+{chg:.1f}%" if chg > 0 else f"{chg:.1f}%"
-        plines.append(f"年龄: {p['age_hours']}h | 1h: {chg_str} | 来源: {p['source']}")
-        sec = sec_tags_fn(p)
-        if sec:
-            plines.append(f"🔒 {' | '.join(sec)}")
-        if show_kw and p.get('ai_keywords'):
-            plines.append(f"关键词: {', '.join(p['ai_keywords'])}")
-        if p.get('website'):
-            plines.append(f"🌐 {p['website']}")
-        if p.get('twitter'):
-            plines.append(f"🐦 @{p['twitter']}")
-        if p.get('telegram'):
-            plines.append(f"💬 {p['telegram']}")
-        plines.append(f"🔗 gmgn.ai/base/token/{p['address']}")
-        if warns:
-            for w in warns:
-                plines.append(f"⚠️ {w}")
-        return "\n".join(plines)
+        return render_text(p, i, symbol_counts.get(p['symbol'], 1), show_kw)
 
     if new_projects:
         lines.append("")
@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+链上项目监控 - 任意时间窗口回放回测
+
+按时间顺序回放录制的上游响应，逐轮执行监控本身的扫描循环（gmgn_monitor.scan_once）：
+获取、通知、同名评分、告警、重点项目更新、归档、清理全部走监控代码，
+时钟替换为模拟时钟，不等待 SCAN_INTERVAL，唤醒只记录不执行。
+
+  - 默认在每轮录制扫描结束时执行一轮；--interval 按固定间隔推进（间隔内没有新录制时沿用上一份响应）
+  - 录制流式读取，每个 URL 只保留最新响应，回放一周内存不随时长增长
+  - state、通知 / 告警发件箱、归档、索引、搜索库、时序、快照全部写到 --out 目录，不影响线上监控
+
+用法：
+  python3 backtest_window.py --start 2026-01-01 --end 2026-01-08
+  python3 backtest_window.py --start "2026-01-01 08:00" --end "2026-01-01 20:00" --interval 300 --out /tmp/bt --clean
+"""
+
+import argparse
+import contextlib
+import json
+import os
+import shutil
+import sys
+import time
+from datetime import datetime
+
+import gmgn_monitor as gm
+import http_client
+import state_snapshot
+from search_index import SearchIndex
+from seen_filter import SeenFilter
+from token_history import TokenHistory
+
+DEFAULT_OUT = "/tmp/backtest_window"
+
+
+def redirect_outputs(out):
+    """监控的全部输出路径指向 out 目录（收藏列表只读，沿用原路径）"""
+    archive = os.path.join(out, "archive")
+    gm.STATE_FILE = os.path.join(out, "state.json")
+    gm.OUTBOX_DIR = os.path.join(out, "outbox")
+    gm.ARCHIVE_DIR = archive
+    gm.ARCHIVE_DB_DIR = os.path.join(archive, "db")
+    gm.INDEX_FILE = os.path.join(archive, "INDEX.md")
+    gm.REPORT_FILE = os.path.join(archive, "REPORT_48H.md")
+    gm.RENDER_CACHE_FILE = os.path.join(archive, ".render_cache.json")
+    gm.INDEX_CACHE_FILE = os.path.join(archive, ".index_cache.json")
+    gm.SEARCH_DB_FILE = os.path.join(archive, "search.db")
+    os.makedirs(archive, exist_ok=True)
+
+
+def iter_ticks(records, start, interval=None):
+    """(模拟时间, 截至该时间的新录制) 序列"""
+    if not interval:
+        for scan in http_client.iter_scans(records):
+            yield scan[-1]['ts'], scan
+        return
+    tick, batch = start, []
+    for r in records:
+        while r['ts'] > tick:
+            yield tick, batch
+            tick, batch = tick + interval, []
+        batch.append(r)
+    yield tick, batch
+
+
+def replay(cassette_dir, start, end, out, interval=None, progress=print):
+    """回放 [start, end] 内的录制，返回统计"""
+    redirect_outputs(out)
+    now = [start]
+    wakes = []
+    gm.clock = lambda: now[0]
+    gm.waker = lambda text: wakes.append({'time': now[0], 'text': text})
+    http_client.configure('replay', cassette_dir)
+    http_client.replay_records([])
+
+    # 回放窗口有限，notified_full 用普通 dict 全部放在内存，不做冷热分层
+    state = {'notified_tokens': {}, 'notified_full': {}, 'last_scan': 0}
+    history = TokenHistory(os.path.join(out, "history"))
+    seen = SeenFilter()
+    search = SearchIndex(gm.SEARCH_DB_FILE, durable=False)
+
+    scans = errors = 0
+    day = None
+    for tick, batch in iter_ticks(http_client.iter_records(cassette_dir, start, end), start, interval):
+        http_client.replay_records(batch)
+        http_client.set_clock(tick)
+        now[0] = tick
+        try:
+            gm.scan_once(state, history, seen, search, persist=False)
+        except Exception as e:
+            gm.log(f"❌ Error: {e}")
+            errors += 1
+        scans += 1
+        date_str = datetime.fromtimestamp(tick).strftime('%Y-%m-%d')
+        if date_str != day:
+            day = date_str
+            progress(f"📅 {date_str}  第 {scans} 轮，已通知 {sum(1 for w in wakes if w['text'].startswith('链上监控'))} 次")
+    # 每轮只整理 state 不写盘、不生成 48h 报告，结束时各做一次
+    gm.archive_and_report(state, search=search)
+    search.close()
+    gm.save_state(state)
+    seen.save(os.path.join(out, "seen.bloom"))
+    state_snapshot.publish(state, os.path.join(out, "state.snap"))
+
+    with open(os.path.join(out, "wakes.json"), 'w') as f:
+        json.dump(wakes, f, ensure_ascii=False, indent=2)
+    return {
+        'scans': scans,
+        'errors': errors,
+        'notify_wakes': sum(1 for w in wakes if w['text'].startswith('链上监控')),
+        'alert_wakes': sum(1 for w in wakes if w['text'].startswith('链上告警')),
+        'tracked': len(state['notified_tokens']),
+        'archived_dates': len([d for d in os.listdir(gm.ARCHIVE_DIR) if d.endswith('.md') and d[0].isdigit()]),
+        'end': now[0],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="用录制数据回放监控扫描循环")
+    parser.add_argument('--start', required=True, type=http_client.parse_time, help="窗口起（YYYY-MM-DD [HH:MM]）")
+    parser.add_argument('--end', type=http_client.parse_time, help="窗口止，默认到最后一次录制")
+    parser.add_argument('--cassettes', default=http_client.CASSETTE_DIR, help="录制目录")
+    parser.add_argument('--interval', type=int, help="按固定间隔（秒）推进，默认跟随录制的扫描")
+    parser.add_argument('--out', default=DEFAULT_OUT, help="输出目录")
+    parser.add_argument('--clean', action='store_true', help="输出目录非空时先清空")
+    args = parser.parse_args()
+
+    if os.path.isdir(args.out) and os.listdir(args.out):
+        if not args.clean:
+            print(f"❌ 输出目录 {args.out} 非空，换一个目录或加 --clean")
+            sys.exit(1)
+        shutil.rmtree(args.out)
+    os.makedirs(args.out, exist_ok=True)
+
+    start, end = args.start, args.end
+    until = f"{datetime.fromtimestamp(end):%Y-%m-%d %H:%M}" if end else "最后一次录制"
+    print(f"回放 {args.cassettes}: {datetime.fromtimestamp(start):%Y-%m-%d %H:%M} ~ {until}")
+    t0 = time.time()
+    console = sys.stdout
+    # 监控日志写入输出目录，控制台只显示进度
+    with open(os.path.join(args.out, "monitor.log"), 'w') as log_file, contextlib.redirect_stdout(log_file):
+        stats = replay(args.cassettes, start, end, args.out, args.interval,
+                       progress=lambda msg: print(msg, file=console, flush=True))
+    elapsed = time.time() - t0
+    if not stats['scans']:
+        print("❌ 窗口内没有录制数据")
+        sys.exit(1)
+    span = (stats['end'] - start) / 3600
+    print(f"\n✅ {stats['scans']} 轮扫描（模拟 {span:.1f} 小时），用时 {elapsed:.1f}s")
+    print(f"   通知唤醒 {stats['notify_wakes']} 次，告警唤醒 {stats['alert_wakes']} 次，"
+          f"跟踪中项目 {stats['tracked']} 个，归档日期 {stats['archived_dates']} 个，扫描出错 {stats['errors']} 轮")
+    print(f"   输出: {args.out}（monitor.log / wakes.json / outbox/ / state.json / archive/）")
+
+
+if __name__ == '__main__':
+    main()
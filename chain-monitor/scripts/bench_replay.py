@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+链上项目监控 - 窗口回放基准
+
+生成一份固定随机种子的合成录制（每 10 分钟一轮扫描，每轮 5 个新项目，通知密集），
+用 backtest_window.replay 回放并报告用时；--profile 时用 cProfile 输出最耗时的函数。
+
+  - 合成录制包含 GMGN 两个列表、DexScreener 关键词搜索和新项目的单币查询；
+    不含 honeypot.is 响应（相当于该接口整段不可用，蜜罐检测每次都失败）
+  - 默认一周（1008 轮），目标是一周回放在一分钟内完成
+
+用法：
+  python3 bench_replay.py
+  python3 bench_replay.py --days 1 --profile 30
+"""
+
+import argparse
+import contextlib
+import cProfile
+import gzip
+import json
+import os
+import pstats
+import random
+import shutil
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+import backtest_window
+import http_client
+
+START = datetime(2026, 1, 1).timestamp()
+SCAN_INTERVAL = 600
+NEW_PER_SCAN = 5
+KEYWORDS = ["botcoin", "mining", "miner", "ai agent", "bot coin", "agent coin", "compute", "gpu",
+            "hash", "proof", "node", "earn", "farm", "stake", "reward"]
+
+
+def make_cassettes(out, days, seed=7):
+    """写入 days 天的合成录制，返回 (扫描轮数, 代币数)"""
+    rng = random.Random(seed)
+    tokens = []
+    files = {}
+
+    def emit(ts, url, params, body):
+        r = {'ts': round(ts, 3), 'method': 'GET', 'url': http_client._canonical('GET', url, params),
+             'status': 200, 'body': json.dumps(body)}
+        files.setdefault(datetime.fromtimestamp(ts).strftime('%Y-%m-%d-%H'), []).append(json.dumps(r))
+
+    n_scans = int(days * 86400 / SCAN_INTERVAL)
+    for s in range(n_scans):
+        ts = START + s * SCAN_INTERVAL
+        for _ in range(NEW_PER_SCAN):
+            i = len(tokens)
+            tokens.append({'address': f"0x{i:040x}", 'symbol': f"T{i % 300}",
+                           'open_timestamp': int(ts - rng.uniform(0, 600)),
+                           'liquidity': rng.choice([2000, 6000, 12000, 30000]), 'holder_count': rng.randint(5, 300),
+                           'market_cap': rng.uniform(1e4, 1e6), 'price': rng.uniform(1e-6, 1e-3),
+                           'website': f"https://t{i}.xyz" if i % 4 == 0 else '',
+                           'twitter_username': f"t{i}" if i % 3 == 0 else '',
+                           'buys': rng.randint(0, 100), 'sells': rng.randint(0, 60),
+                           'price_change_percent1h': rng.choice([0, 10, 700])})
+        recent = tokens[-100:]
+        for t in recent:
+            t['liquidity'] *= rng.uniform(0.8, 1.25)
+            t['price'] *= rng.uniform(0.7, 1.5)
+        emit(ts + 1, "https://gmgn.ai/defi/quotation/v1/rank/base/swaps/1h",
+             {"limit": 100, "orderby": "open_timestamp", "direction": "desc", "tag": "graduated"},
+             {'code': 0, 'data': {'rank': recent}})
+        emit(ts + 2, "https://gmgn.ai/defi/quotation/v1/pairs/base/new_pairs",
+             {"limit": 100, "orderby": "open_timestamp", "direction": "desc"},
+             {'code': 0, 'data': {'pairs': [{'open_timestamp': t['open_timestamp'], 'base_token_info': t}
+                                            for t in recent[-50:]]}})
+        for k, kw in enumerate(KEYWORDS):
+            pairs = [{'chainId': 'base', 'baseToken': {'address': t['address'], 'symbol': t['symbol']},
+                      'priceUsd': str(t['price']), 'marketCap': t['market_cap'], 'liquidity': {'usd': t['liquidity']},
+                      'pairCreatedAt': t['open_timestamp'] * 1000, 'txns': {'h1': {'buys': 3, 'sells': 2}}}
+                     for t in rng.sample(tokens[-300:], min(10, len(tokens)))]
+            emit(ts + 3 + k * 0.5, f"https://api.dexscreener.com/latest/dex/search?q={kw}", None, {'pairs': pairs})
+        for j, t in enumerate(tokens[-NEW_PER_SCAN:]):
+            emit(ts + 12 + j * 0.3, f"https://api.dexscreener.com/latest/dex/tokens/{t['address']}", None,
+                 {'pairs': [{'pairCreatedAt': t['open_timestamp'] * 1000, 'priceUsd': str(t['price']),
+                             'liquidity': {'usd': t['liquidity']}}]})
+
+    os.makedirs(out, exist_ok=True)
+    for hour, lines in files.items():
+        with gzip.open(os.path.join(out, f"{hour}.jsonl.gz"), 'wt') as f:
+            f.write("\n".join(lines) + "\n")
+    return n_scans, len(tokens)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="合成录制上的窗口回放基准")
+    parser.add_argument('--days', type=float, default=7, help="回放天数（默认 7）")
+    parser.add_argument('--profile', type=int, metavar='N', help="用 cProfile 运行并输出最耗时的 N 个函数")
+    parser.add_argument('--keep', action='store_true', help="保留临时目录（录制 + 回放输出）")
+    args = parser.parse_args()
+
+    work = tempfile.mkdtemp(prefix="bench_replay_")
+    cassettes, out = os.path.join(work, "cassettes"), os.path.join(work, "out")
+    n_scans, n_tokens = make_cassettes(cassettes, args.days)
+    print(f"合成录制: {n_scans} 轮扫描，{n_tokens} 个代币")
+
+    profiler = cProfile.Profile() if args.profile else None
+    t0 = time.time()
+    with open(os.path.join(work, "monitor.log"), 'w') as log_file, contextlib.redirect_stdout(log_file):
+        if profiler:
+            profiler.enable()
+        stats = backtest_window.replay(cassettes, START, None, out, progress=lambda msg: None)
+        if profiler:
+            profiler.disable()
+    elapsed = time.time() - t0
+
+    print(f"✅ {stats['scans']} 轮回放用时 {elapsed:.1f}s（{elapsed / max(stats['scans'], 1) * 1000:.1f}ms/轮），"
+          f"通知唤醒 {stats['notify_wakes']} 次，跟踪中项目 {stats['tracked']} 个")
+    if profiler:
+        print("（cProfile 开销使总用时约翻倍，只看相对比例）")
+        pstats.Stats(profiler, stream=sys.stdout).sort_stats('cumulative').print_stats(args.profile)
+    if args.keep:
+        print(f"   目录: {work}")
+    else:
+        shutil.rmtree(work)
+
+
+if __name__ == '__main__':
+    main()
@@ -11,27 +11,42 @@ GMGN Base Chain Monitor - 多数据源项目监控
 
 import json
 import time
+import hashlib
 import re
-import requests
 import os
 import sys
-import subprocess
 from datetime import datetime
 from collections import Counter, defaultdict
 
+from token_history import TokenHistory, start_compactor
+import state_snapshot
+import http_client
+from notified_store import NotifiedStore
+from seen_filter import SeenFilter
+from archive_store import ArchiveStore
+from search_index import SEARCH_DB_FILE, SearchIndex
+from notifier import WAKE_URL, spawn_wake, start_notifier
+from outbox import Outbox
+from alert_engine import AlertEngine
+from webhooks import load_endpoints, start_fanout
+from renderer import is_fake_mc, render_markdown
+
 # === 配置 ===
 CHAIN = "base"
 SCAN_INTERVAL = 600  # 10分钟
 STATE_FILE = "/tmp/gmgn_monitor_state.json"
-NOTIFY_FILE = "/tmp/gmgn_notify.json"
-ALERT_FILE = "/tmp/gmgn_alert.json"
+OUTBOX_DIR = "/tmp/gmgn_outbox"   # 通知 / 告警发件箱（outbox.py）
 FAV_FILE = "/tmp/gmgn_favorites.json"
 SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
 ARCHIVE_DIR = os.path.join(os.path.dirname(SCRIPT_DIR), "archive")
-ARCHIVE_DB_FILE = os.path.join(ARCHIVE_DIR, "archive_db.json")
+ARCHIVE_DB_DIR = os.path.join(ARCHIVE_DIR, "db")
 INDEX_FILE = os.path.join(ARCHIVE_DIR, "INDEX.md")
 REPORT_FILE = os.path.join(ARCHIVE_DIR, "REPORT_48H.md")
+RENDER_CACHE_FILE = os.path.join(ARCHIVE_DIR, ".render_cache.json")
+INDEX_CACHE_FILE = os.path.join(ARCHIVE_DIR, ".index_cache.json")
 GMGN_TOKEN_URL = "https://gmgn.ai/base/token/"
+# 上游响应录制（供回测 / 参数回放）：record | off，环境变量 GMGN_HTTP_MODE 覆盖
+HTTP_MODE = os.environ.get('GMGN_HTTP_MODE', 'record')
 
 # AI 挖矿关键词
 AI_MINING_KEYWORDS = [
@@ -66,6 +81,18 @@ MIN_LIQUIDITY = 5000       # 最低流动性 $5k
 MIN_HOLDERS = 20           # 最低持有人数
 MAX_AGE_HOURS = 72         # 最大项目年龄
 
+# 单项目基础评分分值（score_single_token），参数扫描可逐项覆盖
+SCORE_WEIGHTS = {
+    'social': 3,            # 有 Twitter / Website
+    'renounced': 2,         # 合约已弃权
+    'smart_buy': 3,         # Smart money 买入
+    'low_liq_scale': 1,     # 低流动性扣分（按年龄分级）的倍数
+    'suspect_honeypot': 3,  # 买卖比异常扣分
+    'honeypot': 5,          # 确认貔貅扣分
+    'sell_tax_50': 4,       # 卖出税 >= 50% 扣分
+    'sell_tax_20': 2,       # 卖出税 >= 20% 扣分
+}
+
 # 排除的主流币/稳定币（不需要监控）
 EXCLUDED_SYMBOLS = {
     "cbbtc", "weth", "usdc", "usdt", "dai", "wbtc", "eth",
@@ -73,9 +100,18 @@ EXCLUDED_SYMBOLS = {
 }
 
 
+# 当前时间：回放回测时替换为模拟时钟（backtest_window.py）
+clock = time.time
+
+
+_log_cache = {'sec': None, 'ts': ''}  # 同一秒内的日志复用格式化好的时间
+
+
 def log(msg):
-    ts = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-    print(f'[{ts}] {msg}', flush=True)
+    sec = int(clock())
+    if sec != _log_cache['sec']:
+        _log_cache.update(sec=sec, ts=datetime.fromtimestamp(sec).strftime('%Y-%m-%d %H:%M:%S'))
+    print(f"[{_log_cache['ts']}] {msg}", flush=True)
 
 
 def load_state():
@@ -86,8 +122,38 @@ def load_state():
         return {'notified_tokens': {}, 'last_scan': 0}
 
 
-def save_state(state):
-    now = int(time.time())
+_favs_cache = {'mtime': None, 'favs': []}
+
+
+def load_favs():
+    """收藏列表；文件修改时间没变时复用上次读取的结果"""
+    try:
+        mtime = os.stat(FAV_FILE).st_mtime_ns
+    except OSError:
+        return []
+    if _favs_cache['mtime'] != mtime:
+        with open(FAV_FILE) as f:
+            _favs_cache.update(mtime=mtime, favs=json.load(f))
+    return _favs_cache['favs']
+
+
+def _hot_priority(favs_set, now):
+    """notified_full 常驻内存优先级：收藏 > 重点项目 > 1小时内新项目，其余溢出到磁盘"""
+    def priority(addr, p):
+        ots = p.get('open_timestamp', 0) or 0
+        if addr in favs_set:
+            return (0, -ots)
+        if p.get('website') or p.get('twitter') or '真品' in p.get('trust_rank', ''):
+            return (1, -ots)
+        if ots and now - ots < 3600:
+            return (2, -ots)
+        return None
+    return priority
+
+
+def save_state(state, write=True):
+    """清理过期记录、冷热分层后写入 state 文件（write=False 时只整理不写盘）"""
+    now = int(clock())
     # 清理72小时前的记录
     expired_addrs = {
         k for k, v in state['notified_tokens'].items()
@@ -101,17 +167,29 @@ def save_state(state):
     if 'notified_full' in state:
         for addr in expired_addrs:
             state['notified_full'].pop(addr, None)
+    # 分层存储：冷项目写回磁盘，state 文件只保存常驻内存的部分
+    full = state.get('notified_full')
+    if isinstance(full, NotifiedStore):
+        spilled = full.rebalance(_hot_priority(set(load_favs()), now))
+        if spilled:
+            log(f"[内存] {spilled} 个项目转入冷存储 (内存 {len(full.hot)} / 冷存储 {full.cold_count()})")
+        state = dict(state, notified_full=full.hot)
+    if not write:
+        return
     # 原子写入：先写临时文件再 rename，防止进程被kill导致损坏
     tmp_file = STATE_FILE + '.tmp'
     with open(tmp_file, 'w') as f:
-        json.dump(state, f)
+        f.write(json.dumps(state))
     os.rename(tmp_file, STATE_FILE)
+    if isinstance(full, NotifiedStore):
+        full.persisted()
 
 
 
-def is_ai_mining(text_parts):
+def is_ai_mining(text_parts, keywords=None):
     """检测是否为 AI 挖矿类项目，text_parts 是待检测的字符串列表
-    对 symbol（第一个元素）使用全词匹配，对 website/twitter 使用全词匹配（含URL分隔符）"""
+    对 symbol（第一个元素）使用全词匹配，对 website/twitter 使用全词匹配（含URL分隔符）
+    keywords 默认 AI_MINING_KEYWORDS"""
     if not text_parts:
         return False, []
     symbol = (text_parts[0] or '').lower()
@@ -119,7 +197,7 @@ def is_ai_mining(text_parts):
     # 将 URL 分隔符替换为空格，使全词匹配能识别 URL 路径中的词
     rest = re.sub(r'[/\-_\.:]', ' ', rest)
     matches = []
-    for kw in AI_MINING_KEYWORDS:
+    for kw in (AI_MINING_KEYWORDS if keywords is None else keywords):
         # symbol 用全词匹配
         if re.search(r'\b' + re.escape(kw) + r'\b', symbol) or kw == symbol:
             matches.append(kw)
@@ -142,7 +220,7 @@ def fetch_gmgn_graduated(limit=100):
         "tag": "graduated"
     }
     try:
-        resp = requests.get(url, params=params, headers=GMGN_HEADERS, timeout=15)
+        resp = http_client.get(url, params=params, headers=GMGN_HEADERS, timeout=15)
         data = resp.json()
         if data.get('code') == 0:
             tokens = data['data']['rank']
@@ -154,9 +232,9 @@ def fetch_gmgn_graduated(limit=100):
     return []
 
 
-def parse_gmgn_rank_token(t):
-    """将 GMGN rank token 转为统一格式"""
-    now = int(time.time())
+def parse_gmgn_rank_token(t, now=None):
+    """将 GMGN rank token 转为统一格式；now 为计算年龄用的时间（回放录制时为录制时间）"""
+    now = int(now or clock())
     age_hours = (now - (t.get('open_timestamp') or 0)) / 3600
     return {
         'address': (t.get('address') or '').lower(),
@@ -197,7 +275,7 @@ def fetch_gmgn_new_pairs(limit=100):
         "direction": "desc",
     }
     try:
-        resp = requests.get(url, params=params, headers=GMGN_HEADERS, timeout=15)
+        resp = http_client.get(url, params=params, headers=GMGN_HEADERS, timeout=15)
         data = resp.json()
         if data.get('code') == 0:
             pairs = data['data'].get('pairs', [])
@@ -209,10 +287,10 @@ def fetch_gmgn_new_pairs(limit=100):
     return []
 
 
-def parse_gmgn_pair(p):
+def parse_gmgn_pair(p, now=None):
     """将 GMGN new_pair 转为统一格式"""
     bti = p.get('base_token_info', {})
-    now = int(time.time())
+    now = int(now or clock())
     open_ts = p.get('open_timestamp') or 0
     age_hours = (now - open_ts) / 3600 if open_ts else 0
 
@@ -252,13 +330,13 @@ def fetch_dexscreener():
     all_tokens = {}
     for kw in DEXSCREENER_KEYWORDS:
         try:
-            resp = requests.get(
+            resp = http_client.get(
                 f'https://api.dexscreener.com/latest/dex/search?q={kw}',
                 headers=DEXSCREENER_HEADERS, timeout=15
             )
             if resp.status_code == 429:
                 log(f"[DexScreener] 限流，暂停30s")
-                time.sleep(30)
+                http_client.sleep(30)
                 continue
             if resp.status_code != 200:
                 continue
@@ -268,17 +346,17 @@ def fetch_dexscreener():
                 addr = (p.get('baseToken', {}).get('address') or '').lower()
                 if addr and addr not in all_tokens:
                     all_tokens[addr] = p
-            time.sleep(0.5)  # 避免限流（15个关键词，总计~7.5s）
+            http_client.sleep(0.5)  # 避免限流（15个关键词，总计~7.5s）
         except Exception as e:
             log(f"[DexScreener] search '{kw}' error: {e}")
     log(f"[DexScreener] 关键词搜索获取 {len(all_tokens)} 个 Base 链项目")
     return list(all_tokens.values())
 
 
-def parse_dexscreener_pair(p):
+def parse_dexscreener_pair(p, now=None):
     """将 DexScreener pair 转为统一格式"""
     bt = p.get('baseToken', {})
-    now_ms = time.time() * 1000
+    now_ms = (now or clock()) * 1000
     created = p.get('pairCreatedAt') or 0
     age_hours = (now_ms - created) / 3600000 if created else 0
 
@@ -351,33 +429,33 @@ def merge_tokens(sources):
     return list(merged.values())
 
 
-def filter_quality(tokens):
-    """质量过滤"""
+def filter_quality(tokens, min_liquidity=MIN_LIQUIDITY, min_holders=MIN_HOLDERS, max_age_hours=MAX_AGE_HOURS):
+    """质量过滤（阈值默认取顶部常量，参数扫描时传入）"""
     results = []
     for t in tokens:
         # 排除主流币/稳定币
         if t['symbol'].lower() in EXCLUDED_SYMBOLS:
             continue
         # 年龄过滤
-        if t['age_hours'] > MAX_AGE_HOURS:
+        if t['age_hours'] > max_age_hours:
             continue
         # 流动性过滤
-        if t['liquidity'] < MIN_LIQUIDITY:
+        if t['liquidity'] < min_liquidity:
             continue
         # 持有人过滤（DexScreener 没有 holder 数据，放宽）
-        if t['holders'] > 0 and t['holders'] < MIN_HOLDERS:
+        if t['holders'] > 0 and t['holders'] < min_holders:
             continue
         results.append(t)
     return results
 
 
-def enrich_ai_mining(tokens):
+def enrich_ai_mining(tokens, keywords=None):
     """标记 AI 挖矿项目"""
     for t in tokens:
         text_parts = [t['symbol'], t['website'], t['twitter']]
-        is_ai, keywords = is_ai_mining(text_parts)
+        is_ai, matched = is_ai_mining(text_parts, keywords)
         t['is_ai_mining'] = is_ai
-        t['ai_keywords'] = keywords
+        t['ai_keywords'] = matched
         # 市值/流动性比值
         liq = t.get('liquidity', 0)
         mc = t.get('market_cap', 0)
@@ -398,7 +476,7 @@ def enrich_ai_mining(tokens):
 def _fetch_dexscreener_creation(address):
     """用 DexScreener 获取代币最早创建时间"""
     try:
-        resp = requests.get(
+        resp = http_client.get(
             f'https://api.dexscreener.com/latest/dex/tokens/{address}',
             headers=DEXSCREENER_HEADERS, timeout=10
         )
@@ -414,51 +492,54 @@ def _fetch_dexscreener_creation(address):
     return 0
 
 
-def score_single_token(t):
-    """对单个项目打基础分（无同名对比时使用）"""
+def score_single_token(t, weights=None):
+    """对单个项目打基础分（无同名对比时使用）；weights 覆盖 SCORE_WEIGHTS 中的部分分值"""
+    w = dict(SCORE_WEIGHTS, **(weights or {}))
     score = 0
     # 有 Twitter/Website +3
     if bool(t.get('twitter')) or bool(t.get('website')):
-        score += 3
+        score += w['social']
     # 合约已验证(renounced) +2
     if t.get('renounced'):
-        score += 2
+        score += w['renounced']
     # Smart money 买入 +3
     if t.get('smart_buy_24h', 0) > 0:
-        score += 3
+        score += w['smart_buy']
     # 流动性惩罚（按年龄分级）
     liq = t.get('liquidity', 0)
     age = t.get('age_hours', 0) or 0
+    penalty = 0
     if age < 1:
-        if liq < 10000: score -= 1
+        if liq < 10000: penalty = 1
     elif age < 24:
-        if liq < 10000: score -= 2
-        elif liq < 20000: score -= 1
+        if liq < 10000: penalty = 2
+        elif liq < 20000: penalty = 1
     elif age < 48:
-        if liq < 10000: score -= 4
-        elif liq < 20000: score -= 2
+        if liq < 10000: penalty = 4
+        elif liq < 20000: penalty = 2
     else:
-        if liq < 10000: score -= 6
-        elif liq < 20000: score -= 3
+        if liq < 10000: penalty = 6
+        elif liq < 20000: penalty = 3
+    score -= penalty * w['low_liq_scale']
     # 买卖比异常检测（疑似貔貅）
     buys = int(t.get('buys', 0) or 0)
     sells = int(t.get('sells', 0) or 0)
     if buys > 50 and sells > 0 and buys / sells >= 3:
         t['suspect_honeypot'] = True
-        score -= 3
+        score -= w['suspect_honeypot']
     elif buys > 50 and sells == 0:
         t['suspect_honeypot'] = True
-        score -= 3
+        score -= w['suspect_honeypot']
     # 确认蜜罐/高税率
     if t.get('is_honeypot') == 1:
-        score -= 5
+        score -= w['honeypot']
     else:
         try:
             st = float(t.get('sell_tax', 0) or 0)
             if st >= 50:
-                score -= 4
+                score -= w['sell_tax_50']
             elif st >= 20:
-                score -= 2
+                score -= w['sell_tax_20']
         except (ValueError, TypeError):
             pass
     t['trust_score'] = score
@@ -495,7 +576,7 @@ def score_duplicate_tokens(duplicates):
             if ts:
                 t['open_timestamp'] = int(ts / 1000) if ts > 1e12 else int(ts)
             api_calls += 1
-            time.sleep(0.5)
+            http_client.sleep(0.5)
 
     # 找各维度最优值
     valid_ts = [t['open_timestamp'] for t in duplicates if t.get('open_timestamp', 0) > 1000000000]
@@ -598,24 +679,32 @@ def detect_and_score_duplicates(new_projects, state):
     检测新项目中是否有同名代币（与本轮其他新项目 + 历史已通知项目对比）。
     对同名组进行评分，给每个项目附加 trust_score 和 trust_rank。
     """
-    # 构建 symbol -> [tokens] 映射（新项目 + 历史，按地址去重）
-    symbol_groups = defaultdict(dict)  # symbol -> {addr: token}
-
-    # 历史已通知项目
+    # 构建 symbol -> {addr} 映射（新项目 + 历史，按地址去重），先只记地址，避免冷存储项目全部驻留内存
+    symbol_addrs = defaultdict(set)
     for addr, full in state.get('notified_full', {}).items():
         if full:
             sym = full.get('symbol', '').upper()
             if sym:
-                symbol_groups[sym][addr] = full
-
-    # 本轮新项目（覆盖历史中的同地址数据）
+                symbol_addrs[sym].add(addr)
     for t in new_projects:
         sym = t.get('symbol', '').upper()
         if sym:
-            symbol_groups[sym][t['address']] = t
+            symbol_addrs[sym].add(t['address'])
 
     # 找出有同名的 symbol
-    dup_symbols = {sym for sym, tokens in symbol_groups.items() if len(tokens) > 1}
+    dup_symbols = {sym for sym, addrs in symbol_addrs.items() if len(addrs) > 1}
+
+    # 只为同名组加载完整数据（本轮新项目覆盖历史中的同地址数据）
+    symbol_groups = defaultdict(dict)  # symbol -> {addr: token}
+    for sym in dup_symbols:
+        for addr in symbol_addrs[sym]:
+            full = state.get('notified_full', {}).get(addr)
+            if full:
+                symbol_groups[sym][addr] = full
+    for t in new_projects:
+        sym = t.get('symbol', '').upper()
+        if sym in dup_symbols:
+            symbol_groups[sym][t['address']] = t
 
     if not dup_symbols:
         # 无同名，所有新项目打基础分
@@ -654,8 +743,8 @@ def detect_and_score_duplicates(new_projects, state):
     return new_projects
 
 
-def process_all(notified_set, state=None):
-    """从三个数据源获取、合并、过滤项目"""
+def process_all(notified_set, state=None, seen=None):
+    """从三个数据源获取、合并、过滤项目；seen 为长期已通知地址过滤器"""
     all_parsed = []
 
     # 数据源 1: GMGN graduated
@@ -685,14 +774,16 @@ def process_all(notified_set, state=None):
                 new_ots = merged_by_addr[addr].get('open_timestamp', 0)
                 if new_ots and new_ots > 1000000000:
                     full['open_timestamp'] = new_ots
-                    full['age_hours'] = round((time.time() - new_ots) / 3600, 1)
+                    full['age_hours'] = round((clock() - new_ots) / 3600, 1)
                     patched += 1
         if patched:
             log(f"[补全] 交叉验证修复了 {patched} 个项目的 open_timestamp")
             save_state(state)
 
-    # 过滤已通知的
+    # 过滤已通知的（notified_tokens 只保留72小时，更早通知过的由 seen 过滤）
     new_tokens = [t for t in merged if t['address'] not in notified_set]
+    if seen is not None:
+        new_tokens = [t for t in new_tokens if t['address'] not in seen]
     log(f"[过滤] 排除已通知后 {len(new_tokens)} 个")
 
     # 校验新项目的 open_timestamp（取最早池子创建时间，限制最多20次API调用）
@@ -707,9 +798,9 @@ def process_all(notified_set, state=None):
             cur_ts = t.get('open_timestamp', 0)
             if not cur_ts or cur_ts > dex_ts_sec:
                 t['open_timestamp'] = dex_ts_sec
-                t['age_hours'] = round((time.time() - dex_ts_sec) / 3600, 1)
+                t['age_hours'] = round((clock() - dex_ts_sec) / 3600, 1)
         api_calls += 1
-        time.sleep(0.3)
+        http_client.sleep(0.3)
 
     # 质量过滤
     quality = filter_quality(new_tokens)
@@ -724,8 +815,22 @@ def process_all(notified_set, state=None):
     return enriched, merged
 
 
+# 唤醒函数：run() 中替换为常驻通知器的 submit，回放回测时替换为只记录的函数
+waker = spawn_wake
+
+def _no_publish(kind, payload, seq=None):
+    pass
+
+
+# 事件推送：run() 中配置了 webhook 时替换为 WebhookFanout.publish
+publish = _no_publish
+
+# 告警引擎：每个代币的滚动窗口和告警冷却只保存在进程内，重启后重新积累
+alert_engine = AlertEngine()
+
+
 def notify(projects):
-    """写入通知文件并唤醒 AI agent，通知格式带 GMGN 链接和评分"""
+    """通知写入发件箱并唤醒 AI agent，通知格式带 GMGN 链接和评分"""
     # 给每个项目加上 gmgn 链接
     for p in projects:
         p['gmgn_url'] = f"{GMGN_TOKEN_URL}{p['address']}"
@@ -734,289 +839,447 @@ def notify(projects):
     dup_count = sum(1 for p in projects if p.get('trust_score', 0) > 0 or p.get('trust_rank'))
 
     notification = {
-        'time': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        'time': datetime.fromtimestamp(clock()).strftime('%Y-%m-%d %H:%M:%S'),
         'count': len(projects),
         'ai_mining_count': sum(1 for p in projects if p['is_ai_mining']),
         'duplicate_scored_count': dup_count,
         'projects': projects
     }
-    with open(NOTIFY_FILE, 'w') as f:
-        json.dump(notification, f, ensure_ascii=False)
+    # 追加到发件箱，Heartbeat 按游标读取，上一批没读走也不会被覆盖
+    seq = Outbox(OUTBOX_DIR).append('notify', notification, ts=clock())
+    publish('notify', notification, seq)
 
-    try:
-        ai_count = notification['ai_mining_count']
-        text = f"链上监控: {len(projects)} 个新项目"
-        if ai_count > 0:
-            text += f"，其中 {ai_count} 个AI挖矿项目！"
-        subprocess.Popen([
-            'openclaw', 'system', 'event', '--text', text, '--mode', 'now'
-        ], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
-    except Exception:
-        pass
+    ai_count = notification['ai_mining_count']
+    text = f"链上监控: {len(projects)} 个新项目 (#{seq})"
+    if ai_count > 0:
+        text += f"，其中 {ai_count} 个AI挖矿项目！"
+    waker(text)
 
 
 # ============================================================
 # 归档系统
 # ============================================================
-def _fmt_mc(val):
-    if val >= 1_000_000_000:
-        return f"${val/1_000_000_000:.2f}B"
-    elif val >= 1_000_000:
-        return f"${val/1_000_000:.2f}M"
-    elif val >= 1_000:
-        return f"${val/1_000:.0f}K"
-    return f"${val:.0f}"
-
-
-def _fmt_liq(val):
-    """流动性格式化，带颜色标记"""
-    formatted = _fmt_mc(val)
-    if val < 10000:
-        return f"🔴{formatted}"
-    elif val < 20000:
-        return f"🟡{formatted}"
-    return formatted
-
-
-def _fmt_project_md(p, idx, symbol_counts=None):
-    ai_tag = "🤖" if p.get('is_ai_mining') else "📊"
-    sym = p['symbol']
-    cnt = symbol_counts.get(sym, 1) if symbol_counts else 1
-    if cnt > 1:
-        sym = f"{sym} ({p['address'][:6]}) [同名×{cnt}]"
-    mc = p.get('market_cap', 0)
-    liq = p.get('liquidity', 0)
-    mc_liq_ratio = round(mc / liq, 1) if liq > 0 else 0
-    lines = [
-        f"### {ai_tag} #{idx} {sym}",
-        f"",
-        f"- 合约: `{p['address']}`",
-        f"- MC: {_fmt_mc(mc)} | 流动性: {_fmt_liq(liq)} | MC/Liq: {mc_liq_ratio}x",
-    ]
-    if p.get('holders'):
-        lines.append(f"- 持有人: {p['holders']:,}")
-    lines.append(f"- 年龄: {p.get('age_hours', 0)}h | 来源: {p.get('source', '?')}")
-    if p.get('website'):
-        lines.append(f"- 🌐 {p['website']}")
-    if p.get('twitter'):
-        lines.append(f"- 🐦 @{p['twitter']}")
-    if p.get('telegram'):
-        lines.append(f"- 💬 {p['telegram']}")
-    lines.append(f"- 🔗 [GMGN]({GMGN_TOKEN_URL}{p['address']})")
-    if p.get('ai_keywords'):
-        lines.append(f"- 关键词: {', '.join(p['ai_keywords'])}")
-    if p.get('trust_rank'):
-        lines.append(f"- 可信度: {p['trust_rank']} (评分: {p.get('trust_score', 0)}/15)")
-    lines.append("")
-    return "\n".join(lines)
-
-
-def _load_archive_db():
-    if os.path.exists(ARCHIVE_DB_FILE):
-        with open(ARCHIVE_DB_FILE) as f:
+def _day_order(projects):
+    """日期归档内的排序：AI 挖矿在前，同类按开盘时间倒序"""
+    return sorted(projects, key=lambda x: (not x.get('is_ai_mining', False), -x.get('open_timestamp', 0)))
+
+
+# 归档进程内缓存的日期分区 {日期: (分区 stamp, 全部项目)}：过期项目每轮追加到同一天，不必每轮重读整个分区
+_day_cache = {}
+
+
+def _load_day(store, date_str):
+    """读取日期分区；分区自上次归档以来没有被追加或重建时复用缓存"""
+    stamp = store.stamp(date_str)
+    cached = _day_cache.get(date_str)
+    if stamp is not None and cached and cached[0] == stamp:
+        return list(cached[1])
+    return store.load(date_str)
+
+
+def _cache_day(store, date_str, projects, touched):
+    """记下本轮读过 / 追加过的日期分区；项目数和 manifest 对不上（其他进程同时追加）时不缓存"""
+    stamp = store.stamp(date_str)
+    if stamp is not None and stamp[0] == len(projects):
+        touched[date_str] = (stamp, projects)
+
+
+def _render_day(date_str, projects):
+    """渲染日期归档文件 YYYY-MM-DD.md 的内容"""
+    all_day = _day_order(projects)
+    day_ai = sum(1 for p in all_day if p.get('is_ai_mining'))
+    day_sc = Counter(p['symbol'] for p in all_day)
+    dl = [f"# 链上项目归档 - {date_str}", "",
+          f"项目总数: {len(all_day)} | AI挖矿: {day_ai}", ""]
+    for i, p in enumerate(all_day, 1):
+        dl += [render_markdown(p, i, day_sc), "---", ""]
+    return "\n".join(dl)
+
+
+def render_day_file(date_str, projects):
+    """重新生成日期归档文件（冷存储中的日期按需恢复 markdown），返回文件路径"""
+    path = os.path.join(ARCHIVE_DIR, f"{date_str}.md")
+    tmp_file = _tmp_path(path)
+    with open(tmp_file, 'w') as f:
+        f.write(_render_day(date_str, projects))
+    os.rename(tmp_file, path)
+    return path
+
+
+def _load_json_cache(path):
+    try:
+        with open(path) as f:
             return json.load(f)
-    return {}
+    except (OSError, ValueError):
+        return {}
 
 
-def _save_archive_db(db):
-    with open(ARCHIVE_DB_FILE, 'w') as f:
-        json.dump(db, f, ensure_ascii=False, indent=2)
+def _tmp_path(path):
+    """按进程区分的临时文件名，多个进程同时写同一文件时不会互相截断"""
+    return f"{path}.{os.getpid()}.tmp"
 
 
-def _update_index(db):
-    # 统计全局同名
-    _all_symbols = Counter()
-    for projects in db.values():
-        for p in projects:
-            _all_symbols[p['symbol']] += 1
+def _save_json_cache(path, cache):
+    tmp_file = _tmp_path(path)
+    with open(tmp_file, 'w') as f:
+        # json.dumps 走 C 编码器，json.dump 写文件时逐块走纯 Python 编码，大缓存慢数倍
+        f.write(json.dumps(cache, ensure_ascii=False, separators=(',', ':')))
+    os.rename(tmp_file, path)
 
-    lines = [
-        "# 链上项目归档索引", "",
-        f"更新时间: {datetime.now().strftime('%Y-%m-%d %H:%M')}", "",
-        "| 日期 | 项目数 | AI挖矿 | 项目列表 |",
-        "|------|--------|---------|----------|",
-    ]
-    total = total_ai = 0
-    for date_str in sorted(db.keys(), reverse=True):
-        projects = db[date_str]
-        ai_count = sum(1 for p in projects if p.get('is_ai_mining'))
-        total += len(projects)
-        total_ai += ai_count
-        def _idx_name(p):
-            tag = "🤖" if p.get('is_ai_mining') else ""
-            sym = p['symbol']
-            if _all_symbols.get(sym, 1) > 1:
-                sym = f"{sym}({p['address'][:6]})"
-            return tag + sym
-        names = [_idx_name(p) for p in projects]
-        names_str = ", ".join(names[:8])
-        if len(names) > 8:
-            names_str += f" +{len(names)-8}"
-        lines.append(f"| [{date_str}]({date_str}.md) | {len(projects)} | {ai_count} | {names_str} |")
-    lines += ["", f"**总计: {total} 个项目 | AI挖矿: {total_ai}**", ""]
+
+def _write_if_changed(hashes, name, content, hash_text=None):
+    """
+    内容哈希未变化时跳过写入；hash_text 用于排除时间戳等每次都变的行。
+    hashes 记录 {文件名: [sha1, mtime_ns]}，文件被其他工具改写过（mtime 不符）时照常写入。
+    返回是否写入。
+    """
+    digest = hashlib.sha1((content if hash_text is None else hash_text).encode()).hexdigest()
+    path = os.path.join(ARCHIVE_DIR, name)
+    try:
+        mtime = os.stat(path).st_mtime_ns
+    except FileNotFoundError:
+        mtime = None
+    if hashes.get(name) == [digest, mtime]:
+        return False
+    tmp_file = _tmp_path(path)
+    with open(tmp_file, 'w') as f:
+        f.write(content)
+    os.rename(tmp_file, path)
+    hashes[name] = [digest, os.stat(path).st_mtime_ns]
+    return True
+
+
+def _retire_packed(packed, hashes):
+    """转入冷存储的日期删除日期 markdown（需要时用 archive_store.py --render 重新生成）"""
+    for date_str in packed:
+        hashes.pop(f"{date_str}.md", None)
+        try:
+            os.remove(os.path.join(ARCHIVE_DIR, f"{date_str}.md"))
+        except FileNotFoundError:
+            pass
+
+
+def sync_archive_index(store, packed=()):
+    """归档维护命令（archive_store.py --pack / --render）之后：删除已转冷日期的 markdown，增量更新 INDEX.md"""
+    hashes = _load_json_cache(RENDER_CACHE_FILE)
+    _retire_packed(packed, hashes)
+    _update_index(store, hashes)
+    _save_json_cache(RENDER_CACHE_FILE, hashes)
+
+
+def _md_linked(store, date_str):
+    """INDEX.md 中该日期是否链接到日期文件：冷日期的 markdown 已删除，除非用 --render 重新生成过"""
+    return not store.is_cold(date_str) or os.path.exists(os.path.join(ARCHIVE_DIR, f"{date_str}.md"))
+
+
+def _render_index_date(date_str, projects, rollup, all_symbols, linked=True):
+    """渲染一个日期在 INDEX.md 中的片段：汇总行 + 合约地址行（linked=False 时不链接日期文件，标 🧊）"""
+
+    def _idx_name(p):
+        tag = "🤖" if p.get('is_ai_mining') else ""
+        sym = p['symbol']
+        if all_symbols.get(sym, 1) > 1:
+            sym = f"{sym}({p['address'][:6]})"
+        return tag + sym
+    names = [_idx_name(p) for p in projects]
+    names_str = ", ".join(names[:8])
+    if len(names) > 8:
+        names_str += f" +{len(names)-8}"
+
+    addr_rows = []
+    for p in projects:
+        ai = "🤖" if p.get('is_ai_mining') else ""
+        sym = p['symbol']
+        if all_symbols.get(sym, 1) > 1:
+            sym = f"{sym} ({p['address'][:6]})"
+        addr_rows.append(f"| {date_str} | {sym} | `{p['address']}` | {ai} |")
+
+    day = f"[{date_str}]({date_str}.md)" if linked else f"{date_str} 🧊"
+    return {
+        'count': rollup['count'],
+        'symbols': rollup['symbols'],
+        'linked': linked,
+        'row': f"| {day} | {rollup['count']} | {rollup['ai']} | {names_str} |",
+        'addr_rows': addr_rows,
+    }
+
+
+def _update_index(store, hashes, loaded=None):
+    """
+    增量更新 INDEX.md：同名计数和合计来自各日期汇总（rollup），
+    只加载并重新渲染项目数变化的日期，以及因全局同名状态变化（1 个 <-> 多个）
+    而需要加地址后缀的日期、以及转入冷存储（日期文件被删除）的日期，其余日期复用缓存片段。
+    loaded 为调用方已读出的 {日期: 全部项目}，这些日期不再读分区。
+    """
+    cache = _load_json_cache(INDEX_CACHE_FILE)
+    dates = cache.setdefault('dates', {})
+    all_symbols = Counter(cache.get('symbols', {}))
+    loaded = dict(loaded or {})
+
+    def _day(date_str):
+        if date_str not in loaded:
+            loaded[date_str] = store.load(date_str)
+        return _day_order(loaded[date_str])
+
+    # 删除已不存在的日期
+    removed = [d for d in dates if d not in store]
+    for date_str in removed:
+        all_symbols.subtract(dates.pop(date_str)['symbols'])
+
+    # 项目数变化的日期：更新全局同名计数
+    dirty = {d for d in store.dates() if d not in dates or dates[d]['count'] != store.count(d)}
+    relink = {d for d in store.dates() if d not in dirty and dates[d].get('linked', True) != _md_linked(store, d)}
+    before = {}
+    for date_str in dirty:
+        old = dates.get(date_str, {}).get('symbols', {})
+        new = Counter(store.rollup(date_str)['symbols'])
+        for sym in set(old) | set(new):
+            before.setdefault(sym, all_symbols.get(sym, 0))
+        all_symbols.subtract(old)
+        all_symbols.update(new)
+
+    # 同名状态翻转的代币所在日期也要重新渲染
+    flipped = {sym for sym, n in before.items() if (n > 1) != (all_symbols.get(sym, 0) > 1)}
+    if flipped:
+        dirty |= {d for d, frag in dates.items() if flipped.intersection(frag['symbols'])}
+
+    dirty |= relink
+    for date_str in dirty:
+        dates[date_str] = _render_index_date(date_str, _day(date_str), store.rollup(date_str), all_symbols,
+                                             _md_linked(store, date_str))
+    cache['symbols'] = {sym: n for sym, n in all_symbols.items() if n > 0}
+    if not dirty and not removed and 'INDEX.md' in hashes:
+        return
+    _save_json_cache(INDEX_CACHE_FILE, cache)
+    _write_if_changed(hashes, "INDEX.md", *_index_content(dates, store.summary()))
+
+
+def _index_content(dates, totals):
+    """由各日期片段拼出 INDEX.md，返回 (内容, 不含更新时间行的哈希文本)"""
+    order = sorted(dates, reverse=True)
+    total, total_ai = totals['count'], totals['ai']
+    head = ["# 链上项目归档索引", ""]
+    body = ["",
+            "| 日期 | 项目数 | AI挖矿 | 项目列表 |",
+            "|------|--------|---------|----------|"]
+    body += [dates[d]['row'] for d in order]
+    body += ["", f"**总计: {total} 个项目 | AI挖矿: {total_ai}**", ""]
+    if any(not frag.get('linked', True) for frag in dates.values()):
+        body += ["🧊 已转入冷存储，日期文件需要时用 `python3 scripts/archive_store.py --render YYYY-MM-DD` 重新生成", ""]
 
     # 合约地址索引
-    lines += ["## 合约地址索引", "",
-              "| 日期 | 项目 | 合约地址 | AI |",
-              "|------|------|----------|-----|"]
-    for date_str in sorted(db.keys(), reverse=True):
-        for p in db[date_str]:
-            ai = "🤖" if p.get('is_ai_mining') else ""
-            sym = p['symbol']
-            if _all_symbols.get(sym, 1) > 1:
-                sym = f"{sym} ({p['address'][:6]})"
-            lines.append(f"| {date_str} | {sym} | `{p['address']}` | {ai} |")
-    lines.append("")
-    with open(INDEX_FILE, 'w') as f:
-        f.write("\n".join(lines))
-
-
-def archive_and_report(state):
-    """归档过期项目 + 生成48h报告。从 state 中获取所有已知项目。"""
-    os.makedirs(ARCHIVE_DIR, exist_ok=True)
-    now = int(time.time())
-    cutoff = now - 48 * 3600
+    body += ["## 合约地址索引", "",
+             "| 日期 | 项目 | 合约地址 | AI |",
+             "|------|------|----------|-----|"]
+    for d in order:
+        body += dates[d]['addr_rows']
+    body.append("")
+
+    stamp = [f"更新时间: {datetime.fromtimestamp(clock()).strftime('%Y-%m-%d %H:%M')}"]
+    return "\n".join(head + stamp + body), "\n".join(head + body)
 
-    # 收集 state 中所有已通知项目的完整数据
+
+def _age_hours(p, now):
+    """按 now 从开盘时间计算 age（不写回项目），没有开盘时间时取已存的 age_hours"""
+    open_ts = p.get('open_timestamp', 0)
+    return round((now - open_ts) / 3600, 1) if open_ts else (p.get('age_hours') or 0)
+
+
+def _collect_notified(state, now, keep=None):
+    """state 中仍在 notified_tokens 里的已通知项目（按当前时间重新计算 age），keep 不为 None 时只取 keep(项目) 为真的"""
     all_projects = []
-    for addr, ts in state.get('notified_tokens', {}).items():
-        # 从 notified_full 获取完整数据
-        full = state.get('notified_full', {}).get(addr)
-        if full:
-            # 重新计算 age
-            open_ts = full.get('open_timestamp', 0)
-            if open_ts:
-                full['age_hours'] = round((now - open_ts) / 3600, 1)
+    notified_tokens = state.get('notified_tokens', {})
+    for addr, full in state.get('notified_full', {}).items():
+        # 遍历 notified_full（冷存储流式读取），只取仍在 notified_tokens 中的
+        if full and addr in notified_tokens and (keep is None or keep(full)):
+            # age 放在副本上：不改存储的项目，冷存储不会因此每轮逐行写回
+            if full.get('open_timestamp'):
+                full = dict(full, age_hours=_age_hours(full, now))
             all_projects.append(full)
+    return all_projects
 
-    if not all_projects:
-        return
 
-    # 分为活跃和过期
-    active = [p for p in all_projects if p.get('open_timestamp', 0) >= cutoff]
-    expired = [p for p in all_projects if p.get('open_timestamp', 0) < cutoff]
-
-    # 生成48h报告
-    active.sort(key=lambda x: (not x.get('is_ai_mining', False), -x.get('open_timestamp', 0)))
-    ai_count = sum(1 for p in active if p.get('is_ai_mining'))
+def _render_report(active, notified_full):
+    """渲染 REPORT_48H.md，返回行列表（第 3 行为生成时间）"""
+    active = sorted(active, key=lambda x: (not x.get('is_ai_mining', False), -x.get('open_timestamp', 0)))
     # 同名检测：当批 + 历史 notified_full 合并
     _sc = Counter(p['symbol'] for p in active)
     active_addrs = {p['address'] for p in active}
-    for _addr, _hp in state.get('notified_full', {}).items():
+    for _addr, _hp in notified_full.items():
         if _addr not in active_addrs:
             _sym = _hp.get('symbol', '')
             if _sym:
                 _sc[_sym] += 1
 
-    # 疑似假市值判断
-    def _is_fake_mc(p):
-        liq = p.get('liquidity', 0)
-        mc = p.get('market_cap', 0)
-        return liq > 0 and mc / liq > 1000
-
-    ai_list = [p for p in active if p.get('is_ai_mining') and not _is_fake_mc(p)]
-    normal_list = [p for p in active if not p.get('is_ai_mining') and not _is_fake_mc(p)]
-    fake_mc_list = [p for p in active if _is_fake_mc(p)]
+    ai_list = [p for p in active if p.get('is_ai_mining') and not is_fake_mc(p)]
+    normal_list = [p for p in active if not p.get('is_ai_mining') and not is_fake_mc(p)]
+    fake_mc_list = [p for p in active if is_fake_mc(p)]
 
     lines = [
         f"# 链上项目监控 - 48小时报告", "",
-        f"生成时间: {datetime.now().strftime('%Y-%m-%d %H:%M')}",
+        f"生成时间: {datetime.fromtimestamp(clock()).strftime('%Y-%m-%d %H:%M')}",
         f"项目总数: {len(active)} | AI挖矿: {len(ai_list)} | 其他: {len(normal_list)} | 疑似假市值: {len(fake_mc_list)}", "",
     ]
     if ai_list:
         lines += [f"## 🤖 AI 挖矿项目 ({len(ai_list)})", ""]
         for i, p in enumerate(ai_list, 1):
-            lines += [_fmt_project_md(p, i, _sc), "---", ""]
+            lines += [render_markdown(p, i, _sc), "---", ""]
     if normal_list:
         lines += [f"## 📊 其他项目 ({len(normal_list)})", ""]
         for i, p in enumerate(normal_list, len(ai_list) + 1):
-            lines += [_fmt_project_md(p, i, _sc), "---", ""]
+            lines += [render_markdown(p, i, _sc), "---", ""]
     if fake_mc_list:
         lines += [f"## ⚠️ 疑似假市值 ({len(fake_mc_list)})", ""]
         for i, p in enumerate(fake_mc_list, len(ai_list) + len(normal_list) + 1):
-            lines += [_fmt_project_md(p, i, _sc), "---", ""]
-    with open(REPORT_FILE, 'w') as f:
-        f.write("\n".join(lines))
-    log(f"[归档] 48h报告: {len(active)} 个活跃项目")
+            lines += [render_markdown(p, i, _sc), "---", ""]
+    return lines
+
+
+def archive_and_report(state, report=True, search=None):
+    """
+    归档过期项目 + 生成48h报告。从 state 中获取所有已知项目。report=False 时只归档不生成报告。
+    search 为扫描循环持有的 SearchIndex，新归档的项目在其中标记为已归档（None 时跳过）。
+    """
+    os.makedirs(ARCHIVE_DIR, exist_ok=True)
+    now = int(clock())
+    cutoff = now - 48 * 3600
+
+    # 已归档的地址记在 state['archived']（不写进项目本身），不再重复读取归档分区；
+    # 只保留仍在 notified_tokens 中的地址，随 72 小时过期一起清理
+    notified_tokens = state.get('notified_tokens', {})
+    if not notified_tokens:
+        return
+    archived = {a for a in state.get('archived', []) if a in notified_tokens}
+
+    def _needed(p):
+        # 已归档的过期项目用不到；不生成报告时活跃项目也用不到，这些都不复制
+        if p.get('open_timestamp', 0) >= cutoff:
+            return report
+        return p['address'] not in archived
+
+    # 收集 state 中已通知项目的完整数据，分为活跃和（未归档的）过期
+    all_projects = _collect_notified(state, now, _needed)
+    active = [p for p in all_projects if p.get('open_timestamp', 0) >= cutoff]
+    expired = [p for p in all_projects if p.get('open_timestamp', 0) < cutoff]
+
+    # 生成48h报告
+    hashes = _load_json_cache(RENDER_CACHE_FILE)
+    if report:
+        lines = _render_report(active, state.get('notified_full', {}))
+        # 生成时间行不计入哈希，内容未变时不重写
+        if _write_if_changed(hashes, os.path.basename(REPORT_FILE), "\n".join(lines),
+                             "\n".join(lines[:2] + lines[3:])):
+            log(f"[归档] 48h报告: {len(active)} 个活跃项目")
 
     # 归档过期项目
     if expired:
-        db = _load_archive_db()
+        store = ArchiveStore(ARCHIVE_DB_DIR)
         new_count = 0
         by_date = {}
+        days = {}  # 本轮读过的日期，索引更新直接复用
         for p in expired:
             ts = p.get('open_timestamp', 0)
             date_str = datetime.fromtimestamp(ts).strftime('%Y-%m-%d') if ts else "unknown"
             by_date.setdefault(date_str, []).append(p)
 
+        touched = {}
         for date_str, dps in sorted(by_date.items()):
-            existing_addrs = {p['address'] for p in db.get(date_str, [])}
+            # 只读取涉及到的日期分区
+            existing = _load_day(store, date_str)
+            existing_addrs = {p['address'] for p in existing}
             new_ps = [p for p in dps if p['address'] not in existing_addrs]
             if not new_ps:
+                _cache_day(store, date_str, existing, touched)
                 continue
-            db.setdefault(date_str, []).extend(new_ps)
+            store.append(date_str, new_ps)
             new_count += len(new_ps)
 
-            # 写日期归档文件
-            all_day = db[date_str]
-            all_day.sort(key=lambda x: (not x.get('is_ai_mining', False), -x.get('open_timestamp', 0)))
-            day_ai = sum(1 for p in all_day if p.get('is_ai_mining'))
-            day_sc = Counter(p['symbol'] for p in all_day)
-            dl = [f"# 链上项目归档 - {date_str}", "",
-                  f"项目总数: {len(all_day)} | AI挖矿: {day_ai}", ""]
-            for i, p in enumerate(all_day, 1):
-                dl += [_fmt_project_md(p, i, day_sc), "---", ""]
-            with open(os.path.join(ARCHIVE_DIR, f"{date_str}.md"), 'w') as f:
-                f.write("\n".join(dl))
+            # 写日期归档文件；缓存里放副本，state 中的项目之后被更新也不影响已归档的内容
+            all_day = days[date_str] = existing + new_ps
+            _cache_day(store, date_str, existing + [dict(p) for p in new_ps], touched)
+            _write_if_changed(hashes, f"{date_str}.md", _render_day(date_str, all_day))
             log(f"[归档] {date_str}: {len(all_day)} 个项目 (新增 {len(new_ps)})")
 
-        _save_archive_db(db)
-        _update_index(db)
-        log(f"[归档] 完成，新增 {new_count} 个过期项目")
+        # 只缓存本轮归档涉及的日期
+        _day_cache.clear()
+        _day_cache.update(touched)
+
+        if new_count:
+            _update_index(store, hashes, days)
+            # 搜索索引中标记为已归档（复用扫描循环的连接，不另开一个写连接）
+            if search is not None:
+                try:
+                    search.add([p for ps in by_date.values() for p in ps], archived=True)
+                except Exception as e:
+                    log(f"[搜索] Error: {e}")
+            log(f"[归档] 完成，新增 {new_count} 个过期项目")
+
+        archived.update(p['address'] for p in expired)
+    state['archived'] = sorted(archived)
+
+    # 超过 COLD_AFTER_DAYS 的日期压缩进冷存储，markdown 需要时用 archive_store.py --render 重新生成，
+    # INDEX.md 中这些日期改为不带链接的 🧊 行
+    try:
+        cold_store = ArchiveStore(ARCHIVE_DB_DIR)
+        packed = cold_store.pack_expired(now=datetime.fromtimestamp(now))
+        _retire_packed(packed, hashes)
+        if packed:
+            _update_index(cold_store, hashes)
+            log(f"[归档] {len(packed)} 天转入冷存储")
+    except Exception as e:
+        log(f"[冷存储] Error: {e}")
+
+    _save_json_cache(RENDER_CACHE_FILE, hashes)
 
 
 def cleanup_low_score_duplicates(state):
     """定期清理：1.同名代币中评分过低的仿盘(48h后) 2.流动性极低超过24h的项目"""
     notified_full = state.get('notified_full', {})
     notified_tokens = state.get('notified_tokens', {})
+    now = clock()
 
     removed = []
+    drop = []  # 遍历结束后再删除：notified_full 可能是普通 dict（窗口回放）
 
-    # 规则1: 同名代币中低分仿盘48h后清除
+    # 规则1: 同名代币中低分仿盘48h后清除（age 每个项目只算一次，规则2 复用）
     symbol_groups = defaultdict(list)
-    for addr, p in list(notified_full.items()):
+    ages = {}
+    for addr, p in notified_full.items():
+        ages[addr] = _age_hours(p, now)
         sym = p.get('symbol', '').upper()
         if sym:
-            symbol_groups[sym].append((addr, p))
+            # 只保留评分所需字段 (地址, 评分, 标注)，冷存储项目不必整条驻留内存
+            symbol_groups[sym].append((addr, p.get('trust_score') or 0, p.get('trust_rank') or ''))
 
     for sym, group in symbol_groups.items():
         if len(group) < 2:
             continue
-        max_score = max(p.get('trust_score', 0) for _, p in group)
+        max_score = max(score for _, score, _ in group)
         if max_score == 0:
             continue
-        for addr, p in group:
-            score = p.get('trust_score', 0)
-            rank = p.get('trust_rank', '')
-            if '仿盘' in rank and score <= max_score / 3 and p.get('age_hours', 0) > 48:
+        for addr, score, rank in group:
+            if '仿盘' in rank and score <= max_score / 3 and ages[addr] > 48:
                 removed.append((sym, addr[:10], score, '低分仿盘'))
-                notified_full.pop(addr, None)
-                notified_tokens.pop(addr, None)
+                drop.append(addr)
+    dropped = set(drop)
 
     # 规则2: 流动性极低(<$10K)且年龄超过24h的项目清除（AI挖矿/有社交链接的豁免）
-    for addr, p in list(notified_full.items()):
+    for addr, p in notified_full.items():
+        if addr in dropped:
+            continue
         liq = p.get('liquidity', 0) or 0
-        age = p.get('age_hours', 0) or 0
-        if liq < 10000 and age > 24:
+        if liq < 10000 and ages[addr] > 24:
             # 豁免：AI挖矿项目或有社交链接的项目
             if p.get('is_ai_mining'):
                 continue
             if p.get('twitter') or p.get('website'):
                 continue
             removed.append((p.get('symbol', '?'), addr[:10], liq, '流动性极低>24h'))
-            notified_full.pop(addr, None)
-            notified_tokens.pop(addr, None)
+            drop.append(addr)
 
+    for addr in drop:
+        notified_full.pop(addr, None)
+        notified_tokens.pop(addr, None)
     if removed:
         log(f"[清理] 移除 {len(removed)} 个项目: {', '.join(f'{s}({a},{r})' for s,a,_,r in removed)}")
     return len(removed)
@@ -1025,7 +1288,7 @@ def cleanup_low_score_duplicates(state):
 def fetch_honeypot_check(address):
     """通过 Honeypot.is API 检测蜜罐和税率"""
     try:
-        resp = requests.get(
+        resp = http_client.get(
             f'https://api.honeypot.is/v2/IsHoneypot?address={address}&chainID=8453',
             timeout=10
         )
@@ -1045,7 +1308,7 @@ def fetch_honeypot_check(address):
 def fetch_token_latest(address):
     """通过 DexScreener API 获取单个代币最新数据"""
     try:
-        resp = requests.get(
+        resp = http_client.get(
             f'https://api.dexscreener.com/latest/dex/tokens/{address}',
             timeout=10
         )
@@ -1075,7 +1338,7 @@ def update_key_projects(state, merged):
     merged_by_addr = {t['address']: t for t in merged}
     updated = 0
     api_fetched = 0
-    now = time.time()
+    now = clock()
     update_keys = ['price', 'market_cap', 'liquidity', 'holders', 'price_change_1h',
                    'volume_1h', 'swaps', 'buys', 'sells', 'smart_buy_24h', 'smart_sell_24h',
                    'is_honeypot', 'buy_tax', 'sell_tax', 'renounced']
@@ -1097,7 +1360,7 @@ def update_key_projects(state, merged):
             if new:
                 api_fetched += 1
                 old['_last_api_update'] = now
-                time.sleep(0.3)  # 防限流
+                http_client.sleep(0.3)  # 防限流
 
         if not new:
             continue
@@ -1111,7 +1374,7 @@ def update_key_projects(state, merged):
         # 更新年龄
         ots = old.get('open_timestamp', 0)
         if ots and ots > 1000000000:
-            old['age_hours'] = round((time.time() - ots) / 3600, 1)
+            old['age_hours'] = round((clock() - ots) / 3600, 1)
         updated += 1
 
     if updated:
@@ -1120,7 +1383,7 @@ def update_key_projects(state, merged):
     # 蜜罐检测：每3轮做一次
     scan_count = state.get('_scan_count', 0)
     if scan_count % 3 == 0:
-        hp_checked = 0
+        hp_checked = hp_tried = 0
         for addr, old in state.get('notified_full', {}).items():
             is_key = bool(old.get('website')) or bool(old.get('twitter')) or '真品' in old.get('trust_rank', '')
             if not is_key:
@@ -1135,8 +1398,10 @@ def update_key_projects(state, merged):
             # 未检测过的，1小时冷却
             if last_hp > 0 and now - last_hp < 3600:
                 continue
-            if hp_checked >= 10:
+            # 每轮最多请求 10 次（失败也计数）：接口不可用时不会把全部重点项目挨个重试一遍
+            if hp_tried >= 10:
                 break
+            hp_tried += 1
             hp = fetch_honeypot_check(addr)
             if hp:
                 old['is_honeypot'] = hp['is_honeypot']
@@ -1144,157 +1409,186 @@ def update_key_projects(state, merged):
                 old['sell_tax'] = hp['sell_tax']
                 old['_last_hp_check'] = now
                 hp_checked += 1
-                time.sleep(0.3)
+                http_client.sleep(0.3)
 
         if hp_checked:
             log(f"[安全] 蜜罐检测了 {hp_checked} 个重点项目")
 
 
 def check_alerts(state, merged):
-    """检测AI挖矿项目涨幅异常 + 收藏项目重大变化"""
-    alerts = []
-    merged_by_addr = {t['address']: t for t in merged}
+    """本轮扫描数据送入流式告警引擎（规则见 alert_engine.RULES），有新告警时写入发件箱并唤醒"""
+    notified = state['notified_tokens']
+    full = state.get('notified_full', {})
+    peek = getattr(full, 'peek', full.get)  # 冷项目只读，不提升到内存
 
-    # 加载收藏列表
-    favs = []
-    if os.path.exists(FAV_FILE):
-        with open(FAV_FILE) as f:
-            favs = json.load(f)
-    favs_set = set(favs)
+    def lookup(addr):
+        return peek(addr) if addr in notified else None
 
-    for addr, old in state.get('notified_full', {}).items():
-        new = merged_by_addr.get(addr)
-        if not new:
-            continue
+    alerts = alert_engine.update(merged, lookup, set(load_favs()), clock())
+
+    if alerts:
+        payload = {'time': datetime.fromtimestamp(clock()).strftime('%Y-%m-%d %H:%M:%S'), 'alerts': alerts}
+        seq = Outbox(OUTBOX_DIR).append('alert', payload, ts=clock())
+        publish('alert', payload, seq)
+        log(f"🚨 生成 {len(alerts)} 条告警 (#{seq})")
+        # 唤醒 AI
+        waker(f"链上告警: {len(alerts)} 条 (#{seq})")
 
-        # 读取当前和新数据用于告警判断（不在此处更新 state，由 update_key_projects 统一处理）
-        old_price = float(old.get('price', 0) or 0)
-        new_price = float(new.get('price', 0) or 0)
-        old_liq = float(old.get('liquidity', 0) or 0)
-        new_liq = float(new.get('liquidity', 0) or 0)
-        old_mc = float(old.get('market_cap', 0) or 0)
-        new_mc = float(new.get('market_cap', 0) or 0)
 
+def scan_once(state, history, seen, search, persist=True):
+    """
+    一轮扫描：获取 → 通知 → 告警 → 更新重点项目 → 归档 → 清理 → 保存 state / 快照。
+    run() 每 SCAN_INTERVAL 调用一次；回放回测（backtest_window.py）用模拟时钟逐轮调用，
+    persist=False 时不写 state / 已见地址 / 快照文件、不生成 48h 报告（由调用方在结束时保存）。
+    """
+    notified_set = set(state['notified_tokens'].keys())
+    new_projects, merged = process_all(notified_set, state, seen)
+
+    # 记录本轮所有项目的指标时序
+    try:
+        history.record(merged, clock())
+        history.flush()
+    except Exception as e:
+        log(f"[时序] Error: {e}")
+
+    if new_projects:
+        log(f"✅ 发现 {len(new_projects)} 个新项目!")
+        ai_count = sum(1 for p in new_projects if p['is_ai_mining'])
+        if ai_count:
+            log(f"🤖 其中 {ai_count} 个 AI 挖矿项目!")
+
+        # 同名代币评分
         try:
-            chg_1h = float(new.get('price_change_1h', 0) or 0)
-        except:
-            chg_1h = 0
-
-        # 规则1: AI挖矿项目1h涨幅>500%
-        if old.get('is_ai_mining') and chg_1h > 500:
-            alerts.append({
-                'type': 'surge',
-                'symbol': old['symbol'],
-                'address': addr,
-                'change_1h': chg_1h,
-                'market_cap': new_mc,
-                'liquidity': new_liq,
-                'holders': new.get('holders', 0),
-            })
-
-        # 规则2: 收藏项目价格变化>50% 或 流动性变化>50%
-        if addr in favs_set and old_price > 0 and new_price > 0:
-            price_change = abs(new_price - old_price) / old_price
-            liq_change = abs(new_liq - old_liq) / old_liq if old_liq > 0 else 0
-            if price_change > 0.5 or liq_change > 0.5:
-                alerts.append({
-                    'type': 'fav_change',
-                    'symbol': old['symbol'],
-                    'address': addr,
-                    'price_old': old_price,
-                    'price_new': new_price,
-                    'price_change_pct': price_change * 100,
-                    'liq_old': old_liq,
-                    'liq_new': new_liq,
-                    'liq_change_pct': liq_change * 100,
-                })
+            new_projects = detect_and_score_duplicates(new_projects, state)
+        except Exception as e:
+            log(f"[评分] Error: {e}")
+
+        now = int(clock())
+        for p in new_projects:
+            p['notified_at'] = now
+            state['notified_tokens'][p['address']] = now
+            state['notified_full'][p['address']] = p
+            seen.add(p['address'])
+
+        notify(new_projects)
 
-    if alerts:
-        with open(ALERT_FILE, 'w') as f:
-            json.dump({'time': datetime.now().strftime('%Y-%m-%d %H:%M:%S'), 'alerts': alerts}, f, ensure_ascii=False)
-        log(f"🚨 生成 {len(alerts)} 条告警")
-        # 唤醒 AI
         try:
-            text = f"链上告警: {len(alerts)} 条"
-            subprocess.Popen([
-                'openclaw', 'system', 'event', '--text', text, '--mode', 'now'
-            ], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
-        except:
-            pass
+            search.add(new_projects)
+        except Exception as e:
+            log(f"[搜索] Error: {e}")
+
+        for p in new_projects[:15]:
+            tag = "🤖" if p['is_ai_mining'] else "📊"
+            src = p.get('source', '?')[:3]
+            log(f"  {tag} {p['symbol']} | MC: ${p['market_cap']:,.0f} | "
+                f"Liq: ${p['liquidity']:,.0f} | Holders: {p['holders']} | "
+                f"Age: {p['age_hours']}h | Src: {src}")
+    else:
+        log("📭 本轮无新项目")
 
+    # 检测告警（流式告警引擎，规则见 alert_engine.RULES）
+    try:
+        check_alerts(state, merged)
+    except Exception as e:
+        log(f"[告警] Error: {e}")
 
-def run():
-    state = load_state()
-    # 确保 notified_full 字段存在
-    if 'notified_full' not in state:
-        state['notified_full'] = {}
+    # 更新重点项目实时数据
+    try:
+        update_key_projects(state, merged)
+    except Exception as e:
+        log(f"[更新] Error: {e}")
 
-    log(f"🔍 GMGN Monitor v2 started. Chain: {CHAIN}, Interval: {SCAN_INTERVAL}s")
-    log(f"   数据源: GMGN-rank + GMGN-pairs + DexScreener")
-    log(f"   过滤: 流动性>=${MIN_LIQUIDITY} 持有人>={MIN_HOLDERS} 年龄<={MAX_AGE_HOURS}h")
-    log(f"   归档: {ARCHIVE_DIR}")
+    # 每轮扫描后执行归档
+    try:
+        archive_and_report(state, report=persist, search=search)
+    except Exception as e:
+        log(f"[归档] Error: {e}")
 
-    while True:
+    # 清理低分仿盘
+    try:
+        cleanup_low_score_duplicates(state)
+    except Exception as e:
+        log(f"[清理] Error: {e}")
+
+    # 压缩发件箱：删除所有消费者都已确认的批次
+    try:
+        dropped = Outbox(OUTBOX_DIR).compact()
+        if dropped:
+            log(f"[发件箱] 压缩 {dropped} 批已确认通知")
+    except Exception as e:
+        log(f"[发件箱] Error: {e}")
+
+    state['last_scan'] = int(clock())
+    state['_scan_count'] = state.get('_scan_count', 0) + 1
+    save_state(state, write=persist)
+    if not persist:
+        return
+    if seen.dirty:
         try:
-            notified_set = set(state['notified_tokens'].keys())
-            new_projects, merged = process_all(notified_set, state)
+            seen.save()
+        except Exception as e:
+            log(f"[已见] Error: {e}")
 
-            if new_projects:
-                log(f"✅ 发现 {len(new_projects)} 个新项目!")
-                ai_count = sum(1 for p in new_projects if p['is_ai_mining'])
-                if ai_count:
-                    log(f"🤖 其中 {ai_count} 个 AI 挖矿项目!")
+    # 发布只读快照供看板/API 进程 mmap 读取
+    try:
+        state_snapshot.publish(state)
+    except Exception as e:
+        log(f"[快照] Error: {e}")
 
-                # 同名代币评分
-                try:
-                    new_projects = detect_and_score_duplicates(new_projects, state)
-                except Exception as e:
-                    log(f"[评分] Error: {e}")
+    # 本轮上游响应写入录制文件，清理过期录制（回放时跳过）
+    if http_client.mode() != 'replay':
+        try:
+            http_client.flush()
+            http_client.prune()
+        except Exception as e:
+            log(f"[录制] Error: {e}")
 
-                now = int(time.time())
-                for p in new_projects:
-                    state['notified_tokens'][p['address']] = now
-                    state['notified_full'][p['address']] = p
 
-                notify(new_projects)
+def run():
+    state = load_state()
+    # notified_full 使用分层存储：热项目在内存，其余在磁盘
+    state['notified_full'] = NotifiedStore(state.get('notified_full', {}))
+    state['notified_full'].retain(state['notified_tokens'])
 
-                for p in new_projects[:15]:
-                    tag = "🤖" if p['is_ai_mining'] else "📊"
-                    src = p.get('source', '?')[:3]
-                    log(f"  {tag} {p['symbol']} | MC: ${p['market_cap']:,.0f} | "
-                        f"Liq: ${p['liquidity']:,.0f} | Holders: {p['holders']} | "
-                        f"Age: {p['age_hours']}h | Src: {src}")
-            else:
-                log("📭 本轮无新项目")
+    log(f"🔍 GMGN Monitor v2 started. Chain: {CHAIN}, Interval: {SCAN_INTERVAL}s")
+    log(f"   数据源: GMGN-rank + GMGN-pairs + DexScreener")
+    log(f"   过滤: 流动性>=${MIN_LIQUIDITY} 持有人>={MIN_HOLDERS} 年龄<={MAX_AGE_HOURS}h")
+    log(f"   归档: {ARCHIVE_DIR}")
 
-            # 检测告警（涨幅异常 + 收藏变化）— 必须在 update_key_projects 之前，否则 old_price 已被更新
-            try:
-                check_alerts(state, merged)
-            except Exception as e:
-                log(f"[告警] Error: {e}")
+    http_client.configure(HTTP_MODE)
+    log(f"   响应录制: {HTTP_MODE} ({http_client.CASSETTE_DIR})")
 
-            # 更新重点项目实时数据
-            try:
-                update_key_projects(state, merged)
-            except Exception as e:
-                log(f"[更新] Error: {e}")
+    history = TokenHistory()
+    start_compactor()
 
-            # 每轮扫描后执行归档
-            try:
-                archive_and_report(state)
-            except Exception as e:
-                log(f"[归档] Error: {e}")
+    # 长期"见过"地址集合，启动时补入当前 notified_tokens
+    seen = SeenFilter.load()
+    seen.update(state['notified_tokens'])
+    log(f"   已见地址: {len(seen)} 个")
 
-            # 清理低分仿盘
-            try:
-                cleanup_low_score_duplicates(state)
-            except Exception as e:
-                log(f"[清理] Error: {e}")
+    os.makedirs(ARCHIVE_DIR, exist_ok=True)
+    # 旧版 archive_db.json 只由写入方迁移（看板 / API 只读，不迁移）
+    try:
+        ArchiveStore(ARCHIVE_DB_DIR).migrate()
+    except Exception as e:
+        log(f"[归档] 迁移 Error: {e}")
+    search = SearchIndex(SEARCH_DB_FILE)
 
-            state['last_scan'] = int(time.time())
-            state['_scan_count'] = state.get('_scan_count', 0) + 1
-            save_state(state)
+    # 唤醒交给常驻通知器：合并突发事件，不再每次 fork 进程
+    global waker, publish
+    notifier = start_notifier()
+    waker = notifier.submit
+    log(f"   唤醒通道: {WAKE_URL or 'openclaw CLI'}（合并窗口 {notifier.window}s）")
+
+    # Webhook 推送在后台事件循环中进行，不阻塞扫描
+    endpoints = load_endpoints()
+    if endpoints:
+        publish = start_fanout(endpoints).publish
+        log(f"   Webhook: {', '.join(ep['name'] for ep in endpoints)}")
 
+    while True:
+        try:
+            scan_once(state, history, seen, search)
         except Exception as e:
             log(f"❌ Error: {e}")
 
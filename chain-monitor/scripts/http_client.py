@@ -0,0 +1,331 @@
+#!/usr/bin/env python3
+"""
+链上项目监控 - 共享 HTTP 客户端（录制 / 回放）
+
+所有上游 API（GMGN、DexScreener、Honeypot.is）请求都经过 get()：
+  - off     直接请求
+  - record  照常请求，原始响应连同时间戳写入录制文件（cassette）
+  - replay  不联网，按请求 URL 从录制文件取回响应；sleep() 变为空操作
+
+录制文件：CASSETTE_DIR/YYYY-MM-DD-HH.jsonl.gz，每行一个响应
+  {"ts": 时间戳, "method": "GET", "url": "含参数的完整 URL", "status": 200, "body": "..."}
+每次 flush 追加一个 gzip member，追加后的文件仍是合法 gzip。
+
+回放时同一 URL 有多次录制，返回时间戳不晚于回放时钟（set_clock）的最后一次，未设置时钟时返回最新一次；
+找不到时抛出 CassetteMiss（requests ConnectionError 的子类），调用方按请求失败处理。
+长时间回放用 replay_records() 按时间顺序逐轮喂入录制，每个 URL 只保留最新一条，内存不随时长增长。
+
+模式由环境变量 GMGN_HTTP_MODE、GMGN_CASSETTE_DIR 或 configure() 设置。
+set_rate_limit() 可按域名限制请求速率（多线程共享，回放时不生效）。
+
+用法：
+  python3 http_client.py --stats       # 查看录制文件
+"""
+
+import argparse
+import atexit
+import bisect
+import glob
+import gzip
+import json
+import os
+import threading
+import time
+import zlib
+from datetime import datetime
+from functools import lru_cache
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+import requests
+
+CASSETTE_DIR = os.environ.get('GMGN_CASSETTE_DIR', "/tmp/gmgn_cassettes")
+CASSETTE_KEEP_DAYS = 7   # 录制文件保留天数
+FLUSH_EVERY = 200        # 录制缓冲条数，超过即写盘
+SCAN_GAP = 120           # 相邻响应间隔超过此秒数视为新一轮扫描
+CANONICAL_CACHE_SIZE = 50000  # 规范化 URL 缓存条数
+MODES = ('off', 'record', 'replay')
+
+
+class CassetteMiss(requests.exceptions.ConnectionError):
+    """回放时没有对应的录制"""
+
+
+_mode = os.environ.get('GMGN_HTTP_MODE', 'off')
+_dir = CASSETTE_DIR
+_clock = None
+_buffer = []
+_lock = threading.Lock()
+_replay = None   # (method, url) -> ([ts], [记录])
+_misses = 0      # 回放时没有录制的请求数
+_rate_limits = {}   # 域名 -> [最小间隔秒, 下次可请求的 monotonic 时间]
+_rate_lock = threading.Lock()
+
+
+def configure(mode=None, cassette_dir=None):
+    global _mode, _dir, _replay, _misses
+    if mode is not None:
+        if mode not in MODES:
+            raise ValueError(f"unknown http mode: {mode}")
+        flush()
+        _mode = mode
+    if cassette_dir is not None:
+        _dir = cassette_dir
+    _replay = None
+    _misses = 0
+
+
+def mode():
+    return _mode
+
+
+def parse_time(s):
+    """命令行时间参数：时间戳、'YYYY-MM-DD HH:MM' 或 'YYYY-MM-DD'（本地时间）；None 原样返回，可直接作 argparse type"""
+    if s is None:
+        return None
+    try:
+        return float(s)
+    except ValueError:
+        pass
+    for fmt in ('%Y-%m-%d %H:%M', '%Y-%m-%d'):
+        try:
+            return datetime.strptime(s, fmt).timestamp()
+        except ValueError:
+            pass
+    raise ValueError(f"无法解析时间: {s}")
+
+
+def set_clock(ts):
+    """回放时钟：只返回在此时间之前录制的响应（None 表示最新）"""
+    global _clock
+    _clock = ts
+
+
+def set_rate_limit(host, per_second):
+    """限制对 host 的请求不超过每秒 per_second 次（None / 0 取消限制）"""
+    with _rate_lock:
+        if per_second:
+            _rate_limits[host] = [1.0 / per_second, 0.0]
+        else:
+            _rate_limits.pop(host, None)
+
+
+def _throttle(url):
+    """按域名排队：每个请求预约下一个时间槽，到点再发"""
+    if _mode == 'replay' or not _rate_limits:
+        return
+    slot = _rate_limits.get(urlsplit(url).hostname)
+    if slot is None:
+        return
+    with _rate_lock:
+        now = time.monotonic()
+        start = max(now, slot[1])
+        slot[1] = start + slot[0]
+    if start > now:
+        time.sleep(start - now)
+
+
+def _canonical(method, url, params):
+    """含参数的完整 URL，参数按名称排序，参数写在 URL 里还是 params 里都得到同一个键"""
+    if params:
+        params = tuple((k, str(v)) for k, v in (params.items() if isinstance(params, dict) else params))
+    return _canonical_url(url, params or ())
+
+
+@lru_cache(maxsize=CANONICAL_CACHE_SIZE)
+def _canonical_url(url, params):
+    # 同一批 URL 每轮扫描都会重复请求，回放时这里是热点
+    parts = urlsplit(url)
+    query = parse_qsl(parts.query, keep_blank_values=True) + list(params)
+    return urlunsplit(parts._replace(query=urlencode(sorted(query))))
+
+
+def get(url, params=None, headers=None, timeout=10, **kwargs):
+    full = _canonical('GET', url, params)
+    if _mode == 'replay':
+        return _serve('GET', full)
+    _throttle(url)
+    resp = requests.get(url, params=params, headers=headers, timeout=timeout, **kwargs)
+    if _mode == 'record':
+        _record('GET', full, resp)
+    return resp
+
+
+def sleep(seconds):
+    """限流等待；回放时跳过"""
+    if _mode != 'replay':
+        time.sleep(seconds)
+
+
+# ============================================================
+# 录制
+# ============================================================
+def _record(method, url, resp):
+    with _lock:
+        _buffer.append({'ts': round(time.time(), 3), 'method': method, 'url': url,
+                        'status': resp.status_code, 'body': resp.text})
+        if len(_buffer) >= FLUSH_EVERY:
+            _flush_locked()
+
+
+def _flush_locked():
+    if not _buffer:
+        return
+    os.makedirs(_dir, exist_ok=True)
+    by_hour = {}
+    for r in _buffer:
+        by_hour.setdefault(datetime.fromtimestamp(r['ts']).strftime('%Y-%m-%d-%H'), []).append(r)
+    for hour, records in by_hour.items():
+        with gzip.open(os.path.join(_dir, f"{hour}.jsonl.gz"), 'at', encoding='utf-8') as f:
+            f.write("".join(json.dumps(r, ensure_ascii=False) + "\n" for r in records))
+    _buffer.clear()
+
+
+def flush():
+    """缓冲中的录制写盘（监控每轮扫描结束调用，进程退出时自动调用）"""
+    with _lock:
+        _flush_locked()
+
+
+atexit.register(flush)
+
+
+def prune(keep_days=CASSETTE_KEEP_DAYS, now=None):
+    """删除超过 keep_days 天的录制文件，返回删除个数"""
+    cutoff = datetime.fromtimestamp((now or time.time()) - keep_days * 86400).strftime('%Y-%m-%d-%H')
+    removed = 0
+    for path in glob.glob(os.path.join(_dir, "*.jsonl.gz")):
+        if os.path.basename(path)[:13] < cutoff:
+            os.remove(path)
+            removed += 1
+    return removed
+
+
+# ============================================================
+# 回放
+# ============================================================
+def _hour_start(path):
+    try:
+        return datetime.strptime(os.path.basename(path)[:13], '%Y-%m-%d-%H').timestamp()
+    except ValueError:
+        return None
+
+
+def iter_records(cassette_dir=None, start=None, end=None):
+    """按时间顺序读取录制记录，start / end 为时间戳范围（含两端）"""
+    for path in sorted(glob.glob(os.path.join(cassette_dir or _dir, "*.jsonl.gz"))):
+        hour = _hour_start(path)
+        if hour is not None and ((start is not None and hour + 3600 <= start) or (end is not None and hour > end)):
+            continue
+        try:
+            with gzip.open(path, 'rt', encoding='utf-8') as f:
+                for line in f:
+                    r = json.loads(line)
+                    if (start is None or r['ts'] >= start) and (end is None or r['ts'] <= end):
+                        yield r
+        except (EOFError, OSError, zlib.error, ValueError):
+            # 进程中途退出留下的残缺 member：保留之前读到的记录
+            continue
+
+
+def _load_replay():
+    global _replay
+    index = {}
+    for r in iter_records(_dir):
+        index.setdefault((r['method'], r['url']), []).append(r)
+    _replay = {}
+    for key, records in index.items():
+        records.sort(key=lambda r: r['ts'])
+        _replay[key] = ([r['ts'] for r in records], records)
+
+
+def iter_scans(records, gap=SCAN_GAP):
+    """按时间间隔把录制切分为一轮轮扫描，逐轮产出记录列表"""
+    scan = []
+    for r in records:
+        if scan and r['ts'] - scan[-1]['ts'] > gap:
+            yield scan
+            scan = []
+        scan.append(r)
+    if scan:
+        yield scan
+
+
+def replay_records(records):
+    """流式回放：把记录加入回放索引（同一 URL 只保留最新一条），不再整体加载录制目录"""
+    global _replay
+    if _replay is None:
+        _replay = {}
+    for r in records:
+        _replay[(r['method'], r['url'])] = ([r['ts']], [r])
+
+
+def _response(r):
+    resp = requests.models.Response()
+    resp.status_code = r['status']
+    resp._content = r['body'].encode('utf-8')
+    resp.encoding = 'utf-8'
+    resp.url = r['url']
+    return resp
+
+
+def misses():
+    """本次回放中没有录制的请求数"""
+    return _misses
+
+
+def _serve(method, url):
+    global _misses
+    if _replay is None:
+        _load_replay()
+    entry = _replay.get((method, url))
+    if entry:
+        tss, records = entry
+        i = len(records) if _clock is None else bisect.bisect_right(tss, _clock)
+        if i:
+            return _response(records[i - 1])
+    with _lock:
+        _misses += 1
+    raise CassetteMiss(f"no recording for {method} {url}")
+
+
+def recorded_range(cassette_dir=None):
+    """录制文件覆盖的 (最早, 最晚) 时间戳；没有录制时返回 (None, None)"""
+    if cassette_dir is None and _mode == 'replay':
+        if _replay is None:
+            _load_replay()
+        tss = [t for ts_list, _ in _replay.values() for t in (ts_list[0], ts_list[-1])]
+    else:
+        tss = [r['ts'] for r in iter_records(cassette_dir)]
+    return (min(tss), max(tss)) if tss else (None, None)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="上游 API 录制文件")
+    parser.add_argument('--dir', default=CASSETTE_DIR)
+    parser.add_argument('--stats', action='store_true', help="录制文件 / 条数 / 时间范围")
+    parser.add_argument('--prune', type=int, metavar='DAYS', help="删除超过 DAYS 天的录制文件")
+    args = parser.parse_args()
+
+    configure(cassette_dir=args.dir)
+    if args.prune is not None:
+        print(f"🗑️ 删除 {prune(args.prune)} 个录制文件")
+    if args.stats:
+        files = sorted(glob.glob(os.path.join(args.dir, "*.jsonl.gz")))
+        hosts = {}
+        n, lo, hi = 0, None, None
+        for r in iter_records(args.dir):
+            n += 1
+            host = r['url'].split('/')[2]
+            hosts[host] = hosts.get(host, 0) + 1
+            lo = r['ts'] if lo is None else min(lo, r['ts'])
+            hi = r['ts'] if hi is None else max(hi, r['ts'])
+        size = sum(os.path.getsize(p) for p in files)
+        print(f"文件: {len(files)} | 响应: {n} | 占用: {size/1e6:.2f}MB")
+        if n:
+            print(f"时间: {datetime.fromtimestamp(lo):%Y-%m-%d %H:%M} ~ {datetime.fromtimestamp(hi):%Y-%m-%d %H:%M}")
+            for host, c in sorted(hosts.items(), key=lambda x: -x[1]):
+                print(f"  {host}: {c}")
+
+
+if __name__ == '__main__':
+    main()
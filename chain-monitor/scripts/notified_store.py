@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+"""
+链上项目监控 - notified_full 分层存储
+
+热数据（重点项目、收藏、1小时内新项目）常驻内存，其余项目溢出到 SQLite 冷存储，
+按需加载。对调用方表现为普通 dict（MutableMapping）：
+  - 取单个冷项目（store[addr] / store.get(addr)）会提升到内存，调用方可以直接修改；
+    冷存储中的那一行先保留，直到 state 文件写入内存副本后 persisted() 才删除，
+    所以提升本身不提交事务，进程在保存前崩溃也不会丢项目。只读访问用 peek()，不提升
+  - 遍历（items / values）对冷数据分批流式读取，遍历中被修改的冷项目会自动写回
+  - rebalance() 按优先级把超出预算的项目写回冷存储，常驻内存条数不超过 hot_limit
+
+state 文件只保存内存部分，完整数据 = state 文件的 notified_full + 冷存储。
+不经过 NotifiedStore 读取 state 文件的离线工具必须用 dump_all(hot=...) 合并冷存储。
+"""
+
+import json
+import os
+import sqlite3
+from collections.abc import MutableMapping
+
+COLD_DB_FILE = "/tmp/gmgn_notified_cold.db"
+HOT_LIMIT = 3000        # 常驻内存的项目数上限
+BATCH_SIZE = 500        # 遍历冷数据时每批读取条数
+
+
+def _dumps(p):
+    return json.dumps(p, ensure_ascii=False, separators=(',', ':'))
+
+
+class NotifiedStore(MutableMapping):
+    """内存 + SQLite 两级的 {address: project} 映射"""
+
+    def __init__(self, hot=None, path=COLD_DB_FILE, hot_limit=HOT_LIMIT):
+        self.hot = dict(hot or {})
+        self.hot_limit = hot_limit
+        self._shadow = set()  # 已提升到内存、冷存储中仍保留旧行的地址
+        self.path = path
+        self._db = sqlite3.connect(path)
+        self._db.execute("CREATE TABLE IF NOT EXISTS cold (address TEXT PRIMARY KEY, data TEXT NOT NULL)")
+        self._db.commit()
+        # 内存中已有的地址以内存为准
+        if self.hot:
+            self._delete_cold(list(self.hot))
+
+    # ---------- 冷存储 ----------
+    def _load_cold(self, addr):
+        row = self._db.execute("SELECT data FROM cold WHERE address = ?", (addr,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def _delete_cold(self, addrs):
+        for i in range(0, len(addrs), BATCH_SIZE):
+            chunk = addrs[i:i + BATCH_SIZE]
+            self._db.execute(f"DELETE FROM cold WHERE address IN ({','.join('?' * len(chunk))})", chunk)
+        self._db.commit()
+
+    def cold_count(self):
+        return self._db.execute("SELECT COUNT(*) FROM cold").fetchone()[0]
+
+    def _iter_cold(self):
+        """分批流式遍历冷数据，上一批中被修改的项目在读下一批前写回"""
+        last = 0
+        while True:
+            rows = self._db.execute(
+                "SELECT rowid, address, data FROM cold WHERE rowid > ? ORDER BY rowid LIMIT ?",
+                (last, BATCH_SIZE)).fetchall()
+            if not rows:
+                return
+            pending = []
+            try:
+                for rowid, addr, data in rows:
+                    last = rowid
+                    if addr in self.hot:
+                        continue  # 遍历期间被提升到内存
+                    p = json.loads(data)
+                    pending.append((addr, p, data))
+                    yield addr, p
+            finally:
+                changed = [(_dumps(p), addr) for addr, p, data in pending
+                           if addr not in self.hot and _dumps(p) != data]
+                if changed:
+                    self._db.executemany("UPDATE cold SET data = ? WHERE address = ?", changed)
+                    self._db.commit()
+
+    # ---------- MutableMapping ----------
+    def __getitem__(self, addr):
+        p = self.hot.get(addr)
+        if p is not None:
+            return p
+        p = self._load_cold(addr)
+        if p is None:
+            raise KeyError(addr)
+        # 提升到内存，调用方的修改直接生效；冷存储的行留到 persisted()，下次 rebalance 时再决定去留
+        self.hot[addr] = p
+        self._shadow.add(addr)
+        return p
+
+    def peek(self, addr):
+        """只读取单个项目，冷项目不提升到内存（修改不会写回），不存在返回 None"""
+        p = self.hot.get(addr)
+        return p if p is not None else self._load_cold(addr)
+
+    def __setitem__(self, addr, p):
+        if addr not in self.hot:
+            self._shadow.add(addr)  # 冷存储里可能有旧行，内存副本优先
+        self.hot[addr] = p
+
+    def __delitem__(self, addr):
+        if addr in self.hot:
+            del self.hot[addr]
+            if addr not in self._shadow:
+                return
+            self._shadow.discard(addr)
+            self._delete_cold([addr])
+            return
+        cur = self._db.execute("DELETE FROM cold WHERE address = ?", (addr,))
+        self._db.commit()
+        if not cur.rowcount:
+            raise KeyError(addr)
+
+    def __contains__(self, addr):
+        if addr in self.hot:
+            return True
+        return self._db.execute("SELECT 1 FROM cold WHERE address = ?", (addr,)).fetchone() is not None
+
+    def __iter__(self):
+        for addr, _ in self.items():
+            yield addr
+
+    def __len__(self):
+        return len(self.hot) + self.cold_count() - self._shadowed()
+
+    def _shadowed(self):
+        """冷存储中被内存副本覆盖的行数"""
+        addrs = list(self._shadow)
+        n = 0
+        for i in range(0, len(addrs), BATCH_SIZE):
+            chunk = addrs[i:i + BATCH_SIZE]
+            n += self._db.execute(f"SELECT COUNT(*) FROM cold WHERE address IN ({','.join('?' * len(chunk))})",
+                                  chunk).fetchone()[0]
+        return n
+
+    def items(self):
+        yield from list(self.hot.items())
+        yield from self._iter_cold()
+
+    def values(self):
+        for _, p in self.items():
+            yield p
+
+    def keys(self):
+        keys = list(self.hot)
+        keys += [r[0] for r in self._db.execute("SELECT address FROM cold") if r[0] not in self.hot]
+        return keys
+
+    # ---------- 分层 ----------
+    def rebalance(self, priority):
+        """
+        按 priority(addr, p) 把内存控制在 hot_limit 以内。
+        priority 返回 None 表示冷数据，否则返回可排序的值（越小越热）。
+        返回写回冷存储的条数。
+        """
+        ranked, spill = [], []
+        for addr, p in self.hot.items():
+            pr = priority(addr, p)
+            if pr is None:
+                spill.append(addr)
+            else:
+                ranked.append((pr, addr))
+        if len(ranked) > self.hot_limit:
+            ranked.sort()
+            spill += [addr for _, addr in ranked[self.hot_limit:]]
+        if not spill:
+            return 0
+        self._db.executemany("INSERT OR REPLACE INTO cold (address, data) VALUES (?, ?)",
+                             [(addr, _dumps(self.hot[addr])) for addr in spill])
+        self._db.commit()
+        for addr in spill:
+            del self.hot[addr]
+            self._shadow.discard(addr)
+        return len(spill)
+
+    def persisted(self):
+        """state 文件已写入内存部分：删除被内存副本覆盖的冷存储旧行（一次提交）"""
+        stale = [addr for addr in self._shadow if addr in self.hot]
+        self._shadow.clear()
+        if stale:
+            self._delete_cold(stale)
+
+    def retain(self, addrs):
+        """删除冷存储中不在 addrs 里的项目（启动时清理上次残留），返回删除条数"""
+        keep = set(addrs)
+        stale = [r[0] for r in self._db.execute("SELECT address FROM cold") if r[0] not in keep]
+        if stale:
+            self._delete_cold(stale)
+        return len(stale)
+
+    def close(self):
+        self._db.close()
+
+
+def dump_all(path=COLD_DB_FILE, hot=None):
+    """导出全部项目（内存 + 冷存储）为普通 dict，供离线工具使用"""
+    out = dict(hot or {})
+    if os.path.exists(path):
+        db = sqlite3.connect(path)
+        try:
+            for addr, data in db.execute("SELECT address, data FROM cold"):
+                out.setdefault(addr, json.loads(data))
+        finally:
+            db.close()
+    return out
@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+"""
+链上项目监控 - 常驻唤醒通知器
+
+notify / check_alerts 不再每次 fork 一个 `openclaw system event` 进程，
+而是把唤醒文本放进进程内队列，由常驻后台线程统一投递：
+  - 合并：第一条事件到达后等待 COALESCE_WINDOW 秒，窗口内的事件合并为一次唤醒
+  - 通道：设置了 GMGN_WAKE_URL（可加 GMGN_WAKE_TOKEN）时用保持连接的 HTTP 会话 POST {text, mode}，
+    否则调用 openclaw CLI（每个窗口最多一个进程）
+  - 投递失败按 RETRY_DELAYS 重试；仍失败只记日志，通知内容已在发件箱（outbox.py）里，
+    心跳按消费者游标照常读取未确认的批次
+  - 记录入队到投递完成的延迟，每次投递写一行日志，stats() 返回汇总
+"""
+
+import atexit
+import os
+import queue
+import subprocess
+import threading
+import time
+from collections import deque
+from datetime import datetime
+
+import requests
+
+COALESCE_WINDOW = 5       # 合并窗口（秒）
+WAKE_URL = os.environ.get('GMGN_WAKE_URL', '')        # 例如 http://127.0.0.1:18789/hooks/wake
+WAKE_TOKEN = os.environ.get('GMGN_WAKE_TOKEN', '')
+WAKE_TIMEOUT = 10         # 单次投递超时（秒）
+RETRY_DELAYS = (1, 5)     # 失败后的重试间隔（秒）
+LATENCY_SAMPLES = 500     # 延迟统计保留的样本数
+OPENCLAW_CMD = ['openclaw', 'system', 'event', '--mode', 'now', '--text']
+
+_notifier = None
+
+
+def log(msg):
+    ts = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    print(f'[{ts}] {msg}', flush=True)
+
+
+# ============================================================
+# 投递通道
+# ============================================================
+def spawn_wake(text):
+    """不经过通知器直接唤醒（一次性脚本用），不等待进程结束"""
+    try:
+        subprocess.Popen(OPENCLAW_CMD + [text], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    except Exception:
+        pass
+
+
+def cli_channel():
+    def deliver(text):
+        subprocess.run(OPENCLAW_CMD + [text], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+                       timeout=WAKE_TIMEOUT, check=True)
+    return deliver
+
+
+def http_channel(url, token=''):
+    """保持连接的 HTTP 通道，连接在多次唤醒间复用"""
+    session = requests.Session()
+    if token:
+        session.headers['Authorization'] = f'Bearer {token}'
+
+    def deliver(text):
+        session.post(url, json={'text': text, 'mode': 'now'}, timeout=WAKE_TIMEOUT).raise_for_status()
+    return deliver
+
+
+def default_channel():
+    return http_channel(WAKE_URL, WAKE_TOKEN) if WAKE_URL else cli_channel()
+
+
+def merge_texts(texts):
+    """窗口内的唤醒文本去重后合并"""
+    return "；".join(dict.fromkeys(texts))
+
+
+# ============================================================
+# 通知器
+# ============================================================
+class Notifier:
+    """进程内队列 + 后台投递线程"""
+
+    def __init__(self, deliver=None, window=COALESCE_WINDOW):
+        self.deliver = deliver or default_channel()
+        self.window = window
+        self._queue = queue.Queue()
+        self._thread = None
+        self._latency = deque(maxlen=LATENCY_SAMPLES)
+        self._stats = {'events': 0, 'wakes': 0, 'failures': 0}
+
+    def start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._loop, name='wake-notifier', daemon=True)
+            self._thread.start()
+        return self
+
+    def submit(self, text):
+        """入队一条唤醒文本，立即返回"""
+        self._queue.put((time.time(), text))
+
+    def close(self, timeout=WAKE_TIMEOUT):
+        """投递完队列中已有的事件后停止"""
+        if self._thread is not None and self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join(timeout)
+
+    def _collect(self):
+        """阻塞到第一条事件，再收集合并窗口内的其余事件；收到停止信号返回 None"""
+        first = self._queue.get()
+        if first is None:
+            return None
+        batch = [first]
+        deadline = time.monotonic() + self.window
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if item is None:
+                self._queue.put(None)  # 先投递当前批次，下一轮再停止
+                break
+            batch.append(item)
+        return batch
+
+    def _loop(self):
+        while True:
+            batch = self._collect()
+            if batch is None:
+                return
+            self._send(batch)
+
+    def _send(self, batch):
+        text = merge_texts([t for _, t in batch])
+        error = None
+        for delay in (0,) + RETRY_DELAYS:
+            time.sleep(delay)
+            sent = time.time()
+            try:
+                self.deliver(text)
+                error = None
+                break
+            except Exception as e:
+                error = e
+        if error is not None:
+            self._stats['failures'] += 1
+            log(f"[唤醒] 投递失败（{len(batch)} 条事件）: {error}")
+            return
+        now = time.time()
+        latency = [now - ts for ts, _ in batch]
+        self._latency.extend(latency)
+        self._stats['events'] += len(batch)
+        self._stats['wakes'] += 1
+        log(f"[唤醒] {len(batch)} 条事件合并为 1 次唤醒，延迟 {max(latency):.1f}s（投递 {now - sent:.2f}s）")
+
+    def stats(self):
+        """投递统计：事件数、唤醒次数、失败次数、排队中条数、近期延迟（秒）"""
+        lat = sorted(self._latency)
+        out = dict(self._stats, pending=self._queue.qsize())
+        if lat:
+            out.update(latency_avg=round(sum(lat) / len(lat), 2),
+                       latency_p95=round(lat[int(len(lat) * 0.95)], 2),
+                       latency_max=round(lat[-1], 2))
+        return out
+
+
+def start_notifier(deliver=None, window=COALESCE_WINDOW):
+    """启动常驻通知器（进程内只启动一个），退出时投递完剩余事件"""
+    global _notifier
+    if _notifier is None:
+        _notifier = Notifier(deliver, window)
+        atexit.register(_notifier.close)
+    return _notifier.start()
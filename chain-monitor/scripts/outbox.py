@@ -0,0 +1,226 @@
+#!/usr/bin/env python3
+"""
+链上项目监控 - 通知发件箱
+
+替代每次覆盖写的 /tmp/gmgn_notify.json / /tmp/gmgn_alert.json，上一批没被读走也不会丢：
+  /tmp/gmgn_outbox/outbox.jsonl   只追加，一行一批 {"seq", "kind", "ts", "time", "payload"}
+  /tmp/gmgn_outbox/CURSORS.json   {"consumers": {消费者: 已确认 seq}, "base_seq": 压缩掉的最大 seq}
+
+  - seq 单调递增，压缩后也不回退（从 base_seq 续上）
+  - 消费者按游标读取 seq 之后的全部批次，处理完再 ack；ack 之前崩溃会重新读到（至少一次）
+  - 压缩只删除所有消费者都已确认的批次，未确认的批次永不删除；
+    新发件箱默认登记 DEFAULT_CONSUMER（heartbeat，游标 0），全部消费者都注销后也不再压缩
+  - 追加先截掉崩溃留下的半行，写入后 fsync
+
+用法（Heartbeat）：
+  python3 outbox.py --consumer heartbeat              # 输出未确认的批次（JSON）
+  python3 outbox.py --consumer heartbeat --ack 42     # 处理完后确认到 seq 42
+  python3 outbox.py --stats
+"""
+
+import argparse
+import contextlib
+import fcntl
+import json
+import os
+import time
+from datetime import datetime
+
+OUTBOX_DIR = "/tmp/gmgn_outbox"
+LOG_FILE = "outbox.jsonl"
+CURSOR_FILE = "CURSORS.json"
+DEFAULT_CONSUMER = "heartbeat"   # 新发件箱默认登记的消费者
+TAIL_CHUNK = 65536
+
+
+@contextlib.contextmanager
+def _locked(root):
+    """发件箱目录级文件锁，监控进程和消费者互斥"""
+    os.makedirs(root, exist_ok=True)
+    with open(os.path.join(root, '.lock'), 'w') as lf:
+        fcntl.flock(lf, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lf, fcntl.LOCK_UN)
+
+
+def _dumps(entry):
+    return json.dumps(entry, ensure_ascii=False, separators=(',', ':'))
+
+
+def _tail(f):
+    """返回 (最后一个完整行, 完整行结束位置)；文件末尾的半行不算"""
+    end = f.seek(0, os.SEEK_END)
+    pos, buf = end, b''
+    while pos > 0:
+        step = min(TAIL_CHUNK, pos)
+        pos -= step
+        f.seek(pos)
+        buf = f.read(step) + buf
+        last_nl = buf.rfind(b'\n')
+        if last_nl < 0:
+            continue
+        prev_nl = buf.rfind(b'\n', 0, last_nl)
+        if prev_nl >= 0 or pos == 0:
+            return buf[prev_nl + 1:last_nl], pos + last_nl + 1
+    return b'', 0
+
+
+class Outbox:
+    """带序号的只追加发件箱"""
+
+    def __init__(self, root=OUTBOX_DIR):
+        self.root = root
+        self.path = os.path.join(root, LOG_FILE)
+
+    # ---------- 游标 ----------
+    def _load_cursors(self):
+        try:
+            with open(os.path.join(self.root, CURSOR_FILE)) as f:
+                m = json.load(f)
+        except (OSError, ValueError):
+            m = {'consumers': {DEFAULT_CONSUMER: 0}}
+        m.setdefault('consumers', {})
+        m.setdefault('base_seq', 0)
+        return m
+
+    def _save_cursors(self, m):
+        path = os.path.join(self.root, CURSOR_FILE)
+        tmp_file = path + '.tmp'
+        with open(tmp_file, 'w') as f:
+            json.dump(m, f, indent=1, sort_keys=True)
+        os.rename(tmp_file, path)
+
+    def cursor(self, consumer):
+        return self._load_cursors()['consumers'].get(consumer, 0)
+
+    # ---------- 写 ----------
+    def append(self, kind, payload, ts=None):
+        """追加一批，返回分配的 seq"""
+        ts = time.time() if ts is None else ts
+        with _locked(self.root):
+            with open(self.path, 'ab+') as f:
+                line, committed = _tail(f)
+                f.truncate(committed)  # 丢弃崩溃留下的半行
+                last = json.loads(line)['seq'] if line else 0
+                seq = max(last, self._load_cursors()['base_seq']) + 1
+                entry = {'seq': seq, 'kind': kind, 'ts': ts,
+                         'time': datetime.fromtimestamp(ts).strftime('%Y-%m-%d %H:%M:%S'),
+                         'payload': payload}
+                f.write((_dumps(entry) + '\n').encode())
+                f.flush()
+                os.fsync(f.fileno())
+        return seq
+
+    # ---------- 读 ----------
+    def read(self, after=0, limit=None):
+        """seq 大于 after 的批次（按 seq 升序），最多 limit 批"""
+        out = []
+        try:
+            f = open(self.path, 'rb')
+        except FileNotFoundError:
+            return out
+        with f:
+            for line in f:
+                if not line.endswith(b'\n'):
+                    break  # 正在写入 / 崩溃留下的半行
+                entry = json.loads(line)
+                if entry['seq'] > after:
+                    out.append(entry)
+                    if limit and len(out) >= limit:
+                        break
+        return out
+
+    def pending(self, consumer, limit=None):
+        """消费者尚未确认的批次"""
+        return self.read(self.cursor(consumer), limit)
+
+    def ack(self, consumer, seq):
+        """确认 seq 及之前的批次已处理（游标只前进不后退），返回当前游标"""
+        with _locked(self.root):
+            m = self._load_cursors()
+            cur = max(m['consumers'].get(consumer, 0), int(seq))
+            m['consumers'][consumer] = cur
+            self._save_cursors(m)
+        return cur
+
+    def drop_consumer(self, consumer):
+        """注销不再使用的消费者，避免它的游标阻止压缩"""
+        with _locked(self.root):
+            m = self._load_cursors()
+            if m['consumers'].pop(consumer, None) is None:
+                return False
+            self._save_cursors(m)
+        return True
+
+    # ---------- 压缩 ----------
+    def compact(self):
+        """删除已被全部消费者确认的批次，返回删除批数；没有消费者时什么都不删"""
+        with _locked(self.root):
+            m = self._load_cursors()
+            if not m['consumers']:
+                return 0
+            acked = min(m['consumers'].values())
+            # 最早的批次都还没被确认时不用读整个文件（消费者长期不确认时发件箱会一直增长）
+            first = self.read(0, 1)
+            if not first or first[0]['seq'] > acked:
+                return 0
+            entries = self.read()
+            keep = [e for e in entries if e['seq'] > acked]
+            dropped = len(entries) - len(keep)
+            if not dropped:
+                return 0
+            # 先记下被压缩的最大 seq，再替换文件，保证 seq 不回退
+            kept = {e['seq'] for e in keep}
+            m['base_seq'] = max(m['base_seq'], max(e['seq'] for e in entries if e['seq'] not in kept))
+            self._save_cursors(m)
+            tmp_file = self.path + '.tmp'
+            with open(tmp_file, 'w') as f:
+                f.write(''.join(_dumps(e) + '\n' for e in keep))
+                f.flush()
+                os.fsync(f.fileno())
+            os.rename(tmp_file, self.path)
+        return dropped
+
+    def stats(self):
+        entries = self.read()
+        m = self._load_cursors()
+        return {
+            'entries': len(entries),
+            'bytes': os.path.getsize(self.path) if os.path.exists(self.path) else 0,
+            'first_seq': entries[0]['seq'] if entries else None,
+            'last_seq': entries[-1]['seq'] if entries else m['base_seq'] or None,
+            'consumers': m['consumers'],
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="通知发件箱")
+    parser.add_argument('--dir', default=OUTBOX_DIR)
+    parser.add_argument('--consumer', help="消费者名（如 heartbeat）")
+    parser.add_argument('--ack', type=int, metavar='SEQ', help="确认到 SEQ（需 --consumer）")
+    parser.add_argument('--limit', type=int, help="最多输出的批次")
+    parser.add_argument('--drop-consumer', metavar='NAME', help="注销消费者")
+    parser.add_argument('--compact', action='store_true', help="立即压缩")
+    parser.add_argument('--stats', action='store_true')
+    args = parser.parse_args()
+
+    box = Outbox(args.dir)
+    if args.drop_consumer:
+        print("✅ 已注销" if box.drop_consumer(args.drop_consumer) else "❌ 没有这个消费者")
+    elif args.compact:
+        print(f"✅ 删除 {box.compact()} 批")
+    elif args.stats or not args.consumer:
+        print(json.dumps(box.stats(), ensure_ascii=False, indent=2))
+    elif args.ack is not None:
+        print(json.dumps({'consumer': args.consumer, 'cursor': box.ack(args.consumer, args.ack)}))
+    else:
+        entries = box.pending(args.consumer, args.limit)
+        print(json.dumps({'consumer': args.consumer, 'cursor': box.cursor(args.consumer),
+                          'last_seq': entries[-1]['seq'] if entries else None,
+                          'entries': entries}, ensure_ascii=False, indent=1))
+
+
+if __name__ == '__main__':
+    main()
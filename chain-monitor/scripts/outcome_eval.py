@@ -0,0 +1,267 @@
+#!/usr/bin/env python3
+"""
+链上项目监控 - 通知项目后续表现评估
+
+把已通知项目（state + 归档）和之后的观测数据对齐，计算通知后 1h / 6h / 24h / 48h 的：
+  - 收益     价格相对通知时的涨跌
+  - 回撤     通知后到该时点流动性相对通知时的最大回撤
+  - 存活     该时点流动性仍高于通知时的 (1 - RUG_LIQ_DROP)，流动性归零（rug）即判定死亡
+再按规则（trust_rank、AI 挖矿、重点项目、高分、假市值、疑似貔貅）和数据源分组，
+给出样本数、覆盖数、存活率、收益中位数、平均回撤和精度（存活且收益 ≥ 0 的比例）。
+
+观测数据：
+  - history/ 指标时序（每轮扫描的 merged 项目）
+  - --cassettes 时额外读取录制的 DexScreener 单币查询（重点项目实时更新），补足离开排行榜后的观测
+
+通知时间取项目的 notified_at，旧数据没有该字段时依次取 notified_tokens 记录、开盘后的首个观测。
+所有项目的序列先排成定长列（array），再逐个时点整列计算。
+
+用法：
+  python3 outcome_eval.py                        # 最近 7 天通知的项目
+  python3 outcome_eval.py --start 2026-01-01 --end 2026-01-07 --cassettes /tmp/gmgn_cassettes
+  python3 outcome_eval.py --days 3 --json /tmp/outcomes.json
+"""
+
+import argparse
+import json
+import math
+import statistics
+import time
+from array import array
+from bisect import bisect_left, bisect_right
+from datetime import datetime
+from urllib.parse import urlsplit
+
+import gmgn_monitor as gm
+import http_client
+from archive_store import ArchiveStore
+from notified_store import dump_all
+from param_sweep import RUG_LIQ_DROP
+from renderer import is_fake_mc, is_featured
+from token_history import TokenHistory
+
+HORIZONS = (1, 6, 24, 48)   # 评估时点（小时）
+ENTRY_SLACK = 600           # 通知前多少秒内的观测可作为入场值（时序在通知前记录）
+HORIZON_SLACK = 0.25        # 时点观测允许的偏差（时点的比例，至少 ENTRY_SLACK）
+MAX_NOTIFY_DELAY = 72 * 3600   # 项目开盘后最晚多久被通知（MAX_AGE_HOURS）
+
+# 规则分组：(名称, 判定函数)
+RULES = [
+    ('✅可能真品', lambda p: '真品' in (p.get('trust_rank') or '')),
+    ('⚠️待验证', lambda p: '待验证' in (p.get('trust_rank') or '')),
+    ('❌可能仿盘', lambda p: '仿盘' in (p.get('trust_rank') or '')),
+    ('AI挖矿', lambda p: bool(p.get('is_ai_mining'))),
+    ('重点项目', is_featured),
+    ('高分≥5', lambda p: (p.get('trust_score') or 0) >= 5),
+    ('假市值', is_fake_mc),
+    ('疑似貔貅', lambda p: bool(p.get('suspect_honeypot'))),
+]
+
+
+# ============================================================
+# 数据加载
+# ============================================================
+def load_notified(start, end):
+    """通知时间在 [start, end] 的项目，返回 {地址: (通知时间或 None, 项目)}"""
+    projects = {}
+    store = ArchiveStore(gm.ARCHIVE_DB_DIR)
+    lo = datetime.fromtimestamp(start - MAX_NOTIFY_DELAY).strftime('%Y-%m-%d')
+    hi = datetime.fromtimestamp(end).strftime('%Y-%m-%d')
+    for day in store.load_range(lo, hi).values():
+        for p in day:
+            projects[p['address']] = (p.get('notified_at'), p)
+    try:
+        with open(gm.STATE_FILE) as f:
+            state = json.load(f)
+    except (OSError, ValueError):
+        state = {}
+    notified_tokens = state.get('notified_tokens', {})
+    for addr, p in dump_all(hot=state.get('notified_full', {})).items():
+        if p:
+            projects[addr] = (p.get('notified_at') or notified_tokens.get(addr), p)
+    return {addr: (t0, p) for addr, (t0, p) in projects.items()
+            if t0 is None or start <= t0 <= end}
+
+
+def _cassette_observations(cassette_dir, start, end, wanted):
+    """录制中的 DexScreener 单币查询，返回 {地址: [(ts, price, liquidity)]}"""
+    obs = {}
+    for r in http_client.iter_records(cassette_dir, start, end):
+        path = urlsplit(r['url']).path
+        if not path.startswith('/latest/dex/tokens/') or r.get('status') != 200:
+            continue
+        addr = path.rsplit('/', 1)[-1].lower()
+        if addr not in wanted:
+            continue
+        try:
+            pairs = json.loads(r['body']).get('pairs') or []
+        except ValueError:
+            continue
+        if pairs:
+            # 与 fetch_token_latest 一致，取第一个池子
+            p = pairs[0]
+            obs.setdefault(addr, []).append((int(r['ts']), float(p.get('priceUsd') or 0),
+                                             float((p.get('liquidity') or {}).get('usd') or 0)))
+    return obs
+
+
+def load_series(addresses, start, end, cassette_dir=None):
+    """通知项目在 [start, end] 的 (时间, 价格, 流动性) 序列，返回 {地址: (ts, price, liq)} 三个 array"""
+    raw = {}
+    for addr, r in TokenHistory().query_range(start, end, addresses).items():
+        raw[addr] = list(zip(r['ts'], r['price'], r['liquidity']))
+    if cassette_dir:
+        for addr, obs in _cassette_observations(cassette_dir, start, end, set(addresses)).items():
+            raw.setdefault(addr, []).extend(obs)
+    series = {}
+    for addr, points in raw.items():
+        points.sort()
+        series[addr] = (array('l', (p[0] for p in points)),
+                        array('d', (p[1] for p in points)),
+                        array('d', (p[2] for p in points)))
+    return series
+
+
+# ============================================================
+# 计算
+# ============================================================
+def evaluate(notified, series, horizons=HORIZONS):
+    """
+    逐时点计算收益 / 回撤 / 存活，返回 (地址列表, 项目列表, {时点: 各列})。
+    列按项目顺序排列：ret / drawdown 为 float（无数据为 nan），alive 为 1 / 0 / -1（无数据）。
+    """
+    addrs, projects, t0s, i0s, p0s, l0s = [], [], array('l'), array('l'), array('d'), array('d')
+    empty = (array('l'), array('d'), array('d'))
+    for addr, (t0, p) in notified.items():
+        ts, price, liq = series.get(addr, empty)
+        if t0 is None:
+            # 旧数据没有通知时间：取开盘后的首个观测
+            i = bisect_left(ts, p.get('open_timestamp') or 0)
+            if i == len(ts):
+                continue
+            t0 = ts[i]
+        i0 = bisect_left(ts, t0 - ENTRY_SLACK)
+        addrs.append(addr)
+        projects.append(p)
+        t0s.append(int(t0))
+        i0s.append(i0)
+        if i0 < len(ts) and ts[i0] <= t0 + ENTRY_SLACK:
+            p0s.append(price[i0])
+            l0s.append(liq[i0])
+        else:
+            p0s.append(float(p.get('price') or 0))
+            l0s.append(float(p.get('liquidity') or 0))
+
+    nan = float('nan')
+    results = {}
+    for h in horizons:
+        sec = h * 3600
+        slack = max(ENTRY_SLACK, sec * HORIZON_SLACK)
+        ret, dd, alive = array('d'), array('d'), array('b')
+        for k, addr in enumerate(addrs):
+            ts, price, liq = series.get(addr, empty)
+            t0, i0, p0, l0 = t0s[k], i0s[k], p0s[k], l0s[k]
+            j = bisect_right(ts, t0 + sec + slack) - 1
+            floor = l0 * (1 - RUG_LIQ_DROP)
+            low = min(liq[i0:j + 1]) if j >= i0 else nan
+            if j >= i0 and ts[j] >= t0 + sec - slack:
+                ret.append(price[j] / p0 - 1 if p0 > 0 else nan)
+                alive.append(1 if liq[j] > floor else 0)
+            else:
+                ret.append(nan)
+                # 观测中断前流动性已归零也算死亡
+                alive.append(0 if j >= i0 and low <= floor and l0 > 0 else -1)
+            dd.append(max(0.0, 1 - low / l0) if l0 > 0 and j >= i0 else nan)
+        results[h] = {'ret': ret, 'drawdown': dd, 'alive': alive}
+    return addrs, projects, results
+
+
+def _groups(projects):
+    """分组名 -> 项目下标"""
+    groups = {'全部': list(range(len(projects)))}
+    for name, rule in RULES:
+        groups[name] = [i for i, p in enumerate(projects) if rule(p)]
+    for i, p in enumerate(projects):
+        groups.setdefault(f"来源:{p.get('source', '?')}", []).append(i)
+    return groups
+
+
+def summarize(projects, results):
+    """按分组汇总各时点指标，返回 {分组: {时点: 指标}}"""
+    report = {}
+    for name, idx in _groups(projects).items():
+        report[name] = {}
+        for h, cols in results.items():
+            alive = [cols['alive'][i] for i in idx if cols['alive'][i] >= 0]
+            rets = [cols['ret'][i] for i in idx if not math.isnan(cols['ret'][i])]
+            dds = [cols['drawdown'][i] for i in idx if not math.isnan(cols['drawdown'][i])]
+            hits = sum(1 for i in idx if cols['alive'][i] == 1 and cols['ret'][i] >= 0)
+            report[name][h] = {
+                'n': len(idx),
+                'covered': len(alive),
+                'survival': sum(alive) / len(alive) if alive else None,
+                'median_return': statistics.median(rets) if rets else None,
+                'mean_drawdown': sum(dds) / len(dds) if dds else None,
+                'precision': hits / len(alive) if alive else None,
+            }
+    return report
+
+
+def _pct(v):
+    return "-" if v is None else f"{v * 100:.1f}%"
+
+
+def print_report(report, horizons=HORIZONS):
+    for h in horizons:
+        print(f"\n⏱ 通知后 {h}h")
+        print(f"{'分组':<18} {'项目':>5} {'覆盖':>5} {'存活率':>7} {'收益中位':>8} {'平均回撤':>8} {'精度':>7}")
+        print("-" * 72)
+        for name, by_h in report.items():
+            s = by_h[h]
+            if not s['n']:
+                continue
+            print(f"{name:<20} {s['n']:>5} {s['covered']:>6} {_pct(s['survival']):>8} "
+                  f"{_pct(s['median_return']):>10} {_pct(s['mean_drawdown']):>10} {_pct(s['precision']):>8}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="评估已通知项目的后续表现")
+    parser.add_argument('--start', type=http_client.parse_time, help="通知时间起（YYYY-MM-DD [HH:MM]）")
+    parser.add_argument('--end', type=http_client.parse_time, help="通知时间止")
+    parser.add_argument('--days', type=float, default=7, help="未指定 --start 时评估最近 N 天（默认 7）")
+    parser.add_argument('--cassettes', help="同时读取该目录的录制数据作为观测")
+    parser.add_argument('--json', help="逐项目结果和分组汇总另存为 JSON")
+    args = parser.parse_args()
+
+    now = int(time.time())
+    end = int(args.end or now)
+    start = int(args.start or end - args.days * 86400)
+    t0 = time.time()
+    notified = load_notified(start, end)
+    if not notified:
+        print("❌ 时间范围内没有已通知项目")
+        return
+    # 旧数据没有通知时间，观测从最早开盘时间取
+    lo = min([start] + [p.get('open_timestamp') or start for t, p in notified.values() if t is None])
+    series = load_series(list(notified), lo - ENTRY_SLACK, min(now, end + max(HORIZONS) * 3600 * 2), args.cassettes)
+    addrs, projects, results = evaluate(notified, series)
+    print(f"{datetime.fromtimestamp(start):%Y-%m-%d %H:%M} ~ {datetime.fromtimestamp(end):%Y-%m-%d %H:%M}："
+          f"{len(notified)} 个已通知项目，{len(series)} 个有观测数据，用时 {time.time() - t0:.1f}s")
+    report = summarize(projects, results)
+    print_report(report)
+
+    if args.json:
+        def _num(v):
+            return None if math.isnan(v) else round(v, 4)
+        rows = [{'address': addr, 'symbol': p.get('symbol'), 'source': p.get('source'),
+                 **{f"{h}h": {'return': _num(results[h]['ret'][k]), 'drawdown': _num(results[h]['drawdown'][k]),
+                              'alive': None if results[h]['alive'][k] < 0 else bool(results[h]['alive'][k])}
+                    for h in HORIZONS}}
+                for k, (addr, p) in enumerate(zip(addrs, projects))]
+        with open(args.json, 'w') as f:
+            json.dump({'groups': report, 'projects': rows}, f, ensure_ascii=False, indent=2)
+        print(f"\n📄 结果已保存到 {args.json}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,264 @@
+#!/usr/bin/env python3
+"""
+链上项目监控 - 过滤 / 评分参数扫描
+
+在录制的上游响应（http_client 录制文件）上按参数网格重放监控的筛选流程，比较不同阈值的效果：
+  - 录制按时间间隔切分为一轮轮扫描，每轮的 rank / new_pairs / DexScreener 搜索结果只解析一次
+  - 每组参数在子进程中独立模拟：逐轮排除已通知 → filter_quality → AI 标记 → score_single_token
+  - 解析后的数据在 fork 前准备好，子进程只读共享，不重复加载
+  - 结果按项目在录制期间是否被标记为貔貅 / rug 统计
+
+貔貅：任一来源 is_honeypot=1 或 Honeypot.is 判定为蜜罐
+Rug：GMGN rug_ratio 超过 RUG_RATIO，或流动性较峰值回撤超过 RUG_LIQ_DROP
+
+用法：
+  python3 param_sweep.py --min-liquidity 3000,5000,10000 --min-holders 10,20 --max-age 24,72
+  python3 param_sweep.py --grid grid.json --start "2026-01-01" --end "2026-01-03 12:00"
+  python3 param_sweep.py --min-liquidity 5000,8000 --json /tmp/sweep.json
+
+grid.json 中每个键是参数候选列表（键同命令行参数，另可扫描 AI 关键词和评分分值）：
+  {"min_liquidity": [3000, 5000], "ai_keywords": [null, ["mine", "agent"]],
+   "score_weights": [{}, {"social": 5, "honeypot": 8}]}
+"""
+
+import argparse
+import itertools
+import json
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from urllib.parse import parse_qs, urlsplit
+
+import gmgn_monitor as gm
+import http_client
+
+HIGH_SCORE = 5        # 高分项目阈值（与看板绿色评分一致）
+RUG_RATIO = 0.5       # GMGN rug_ratio 超过此值记为 rug
+RUG_LIQ_DROP = 0.9    # 流动性较峰值回撤超过 90% 记为 rug
+PARAMS = ('min_liquidity', 'min_holders', 'max_age_hours', 'ai_keywords', 'score_weights')
+DEFAULTS = {
+    'min_liquidity': gm.MIN_LIQUIDITY,
+    'min_holders': gm.MIN_HOLDERS,
+    'max_age_hours': gm.MAX_AGE_HOURS,
+    'ai_keywords': None,
+    'score_weights': None,
+}
+
+# fork 前由主进程填充，子进程只读
+_SCANS = []      # [(扫描时间, [合并后的项目])]
+_FLAGS = {}      # 地址 -> {'honeypot': bool, 'rug': bool}
+_CONFIGS = []
+
+
+def _json(r):
+    if r.get('status') != 200:
+        return None
+    try:
+        return json.loads(r['body'])
+    except ValueError:
+        return None
+
+
+class _Outcomes:
+    """逐轮累计每个地址的貔貅 / rug 信号"""
+
+    def __init__(self):
+        self.honeypot = set()
+        self.rug = set()
+        self.peak = {}
+
+    def liquidity(self, addr, liq):
+        peak = self.peak.get(addr, 0)
+        if liq > peak:
+            self.peak[addr] = liq
+        elif peak > 0 and liq <= peak * (1 - RUG_LIQ_DROP):
+            self.rug.add(addr)
+
+    def flags(self):
+        return {addr: {'honeypot': addr in self.honeypot, 'rug': addr in self.rug}
+                for addr in set(self.peak) | self.honeypot | self.rug}
+
+
+def _parse_scan(records, outcomes):
+    """解析一轮扫描的响应，返回 (扫描时间, 合并后的项目)；同一 URL 多次响应取最后一次"""
+    latest = {}
+    for r in records:
+        latest[r['url']] = r
+    ts = records[0]['ts']
+    rank, pairs, dex, creation = [], [], {}, {}
+    for url, r in latest.items():
+        parts = urlsplit(url)
+        path = parts.path
+        data = _json(r)
+        if data is None:
+            continue
+        if path.endswith(f"/rank/{gm.CHAIN}/swaps/1h"):
+            if data.get('code') == 0:
+                for t in data['data']['rank']:
+                    rank.append(gm.parse_gmgn_rank_token(t, now=ts))
+                    if float(t.get('rug_ratio') or 0) > RUG_RATIO:
+                        outcomes.rug.add((t.get('address') or '').lower())
+        elif path.endswith(f"/pairs/{gm.CHAIN}/new_pairs"):
+            if data.get('code') == 0:
+                pairs.extend(gm.parse_gmgn_pair(p, now=ts) for p in data['data'].get('pairs', []))
+        elif path == '/latest/dex/search':
+            for p in data.get('pairs', []):
+                addr = (p.get('baseToken', {}).get('address') or '').lower()
+                if p.get('chainId') == 'base' and addr and addr not in dex:
+                    dex[addr] = gm.parse_dexscreener_pair(p, now=ts)
+        elif path.startswith('/latest/dex/tokens/'):
+            addr = path.rsplit('/', 1)[-1].lower()
+            found = [p.get('pairCreatedAt', 0) for p in data.get('pairs') or [] if p.get('pairCreatedAt', 0) > 0]
+            if found:
+                creation[addr] = min(found)
+            if data.get('pairs'):
+                outcomes.liquidity(addr, float((data['pairs'][0].get('liquidity') or {}).get('usd') or 0))
+        elif path == '/v2/IsHoneypot':
+            addr = (parse_qs(parts.query).get('address') or [''])[0].lower()
+            if (data.get('honeypotResult') or {}).get('isHoneypot'):
+                outcomes.honeypot.add(addr)
+
+    merged = gm.merge_tokens(rank + pairs + list(dex.values()))
+    for t in merged:
+        # 与监控一致：用 DexScreener 最早池子创建时间校正开盘时间
+        dex_ts = creation.get(t['address'])
+        if dex_ts:
+            dex_ts_sec = int(dex_ts / 1000) if dex_ts > 1e12 else int(dex_ts)
+            if not t.get('open_timestamp') or t['open_timestamp'] > dex_ts_sec:
+                t['open_timestamp'] = dex_ts_sec
+                t['age_hours'] = round((ts - dex_ts_sec) / 3600, 1)
+        if t.get('is_honeypot') == 1:
+            outcomes.honeypot.add(t['address'])
+        outcomes.liquidity(t['address'], t['liquidity'])
+    return ts, merged
+
+
+def load_scans(cassette_dir=None, start=None, end=None):
+    """读取录制并解析为多轮扫描，返回 (扫描列表, 结果标记)"""
+    outcomes = _Outcomes()
+    scans = []
+    for records in http_client.iter_scans(http_client.iter_records(cassette_dir, start, end)):
+        ts, merged = _parse_scan(records, outcomes)
+        if merged:
+            scans.append((ts, merged))
+    return scans, outcomes.flags()
+
+
+def _run_config(i):
+    """子进程：按一组参数模拟全部扫描，返回统计"""
+    cfg = _CONFIGS[i]
+    t0 = time.time()
+    notified = {}
+    for _, tokens in _SCANS:
+        new = [t for t in tokens if t['address'] not in notified]
+        for t in gm.filter_quality(new, cfg['min_liquidity'], cfg['min_holders'], cfg['max_age_hours']):
+            # 共享数据只读，打分前复制
+            t = dict(t)
+            gm.enrich_ai_mining([t], cfg['ai_keywords'])
+            gm.score_single_token(t, cfg['score_weights'])
+            notified[t['address']] = t
+
+    stats = {'surfaced': len(notified), 'ai': 0, 'high': 0, 'honeypot': 0, 'rug': 0,
+             'flagged': 0, 'high_flagged': 0}
+    for addr, t in notified.items():
+        flags = _FLAGS.get(addr, {})
+        bad = flags.get('honeypot') or flags.get('rug')
+        high = t['trust_score'] >= HIGH_SCORE
+        stats['ai'] += t['is_ai_mining']
+        stats['high'] += high
+        stats['honeypot'] += bool(flags.get('honeypot'))
+        stats['rug'] += bool(flags.get('rug'))
+        stats['flagged'] += bool(bad)
+        stats['high_flagged'] += bool(bad and high)
+    stats['seconds'] = round(time.time() - t0, 3)
+    return i, stats
+
+
+def build_grid(args):
+    """命令行列表与 grid 文件合并为参数组合（命令行优先）"""
+    grid = {}
+    if args.grid:
+        with open(args.grid) as f:
+            grid = json.load(f)
+        unknown = set(grid) - set(PARAMS)
+        if unknown:
+            raise SystemExit(f"❌ 未知参数: {', '.join(sorted(unknown))}")
+    for key, value in (('min_liquidity', args.min_liquidity), ('min_holders', args.min_holders),
+                       ('max_age_hours', args.max_age)):
+        if value:
+            grid[key] = [float(v) for v in value.split(',')]
+    axes = [grid.get(k) or [DEFAULTS[k]] for k in PARAMS]
+    return [dict(zip(PARAMS, combo)) for combo in itertools.product(*axes)], grid
+
+
+def _label(cfg, grid):
+    parts = [f"liq={cfg['min_liquidity']:g}", f"holders={cfg['min_holders']:g}", f"age={cfg['max_age_hours']:g}"]
+    # 关键词 / 评分分值按在 grid 中的序号标识
+    for key, short in (('ai_keywords', 'kw'), ('score_weights', 'w')):
+        if len(grid.get(key) or []) > 1:
+            parts.append(f"{short}={grid[key].index(cfg[key])}")
+    return " ".join(parts)
+
+
+def _rate(n, total):
+    return f"{n / total * 100:.1f}%" if total else "-"
+
+
+def print_table(rows):
+    print(f"\n{'参数':<34} {'项目':>6} {'AI':>5} {'高分':>5} {'貔貅':>5} {'Rug':>5} {'标记率':>7} {'高分标记率':>9} {'耗时':>7}")
+    print("-" * 100)
+    for label, s in rows:
+        print(f"{label:<36} {s['surfaced']:>6} {s['ai']:>5} {s['high']:>6} {s['honeypot']:>6} {s['rug']:>5} "
+              f"{_rate(s['flagged'], s['surfaced']):>8} {_rate(s['high_flagged'], s['high']):>12} {s['seconds']:>7.2f}s")
+
+
+def main():
+    global _SCANS, _FLAGS, _CONFIGS
+    parser = argparse.ArgumentParser(description="在录制数据上扫描过滤 / 评分参数")
+    parser.add_argument('--cassettes', default=http_client.CASSETTE_DIR, help="录制目录")
+    parser.add_argument('--start', type=http_client.parse_time, help="录制时间范围起（YYYY-MM-DD [HH:MM]）")
+    parser.add_argument('--end', type=http_client.parse_time, help="录制时间范围止")
+    parser.add_argument('--min-liquidity', help="逗号分隔候选值")
+    parser.add_argument('--min-holders', help="逗号分隔候选值")
+    parser.add_argument('--max-age', help="最大年龄（小时），逗号分隔候选值")
+    parser.add_argument('--grid', help="参数网格 JSON 文件")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help="进程数")
+    parser.add_argument('--json', help="结果另存为 JSON")
+    args = parser.parse_args()
+
+    configs, grid = build_grid(args)
+    t0 = time.time()
+    scans, flags = load_scans(args.cassettes, args.start, args.end)
+    if not scans:
+        print("❌ 时间范围内没有录制数据")
+        sys.exit(1)
+    n_tokens = sum(len(tokens) for _, tokens in scans)
+    print(f"录制: {len(scans)} 轮扫描，{n_tokens} 条项目数据，{len(flags)} 个地址 "
+          f"({datetime.fromtimestamp(scans[0][0]):%Y-%m-%d %H:%M} ~ {datetime.fromtimestamp(scans[-1][0]):%Y-%m-%d %H:%M})，"
+          f"解析用时 {time.time() - t0:.1f}s")
+    print(f"参数组合: {len(configs)} 组（{args.workers} 进程）")
+
+    _SCANS, _FLAGS, _CONFIGS = scans, flags, configs
+    results = [None] * len(configs)
+    t0 = time.time()
+    # 显式 fork：子进程继承已解析的数据，无需序列化传输
+    with ProcessPoolExecutor(max_workers=args.workers,
+                             mp_context=multiprocessing.get_context('fork')) as pool:
+        for i, stats in pool.map(_run_config, range(len(configs))):
+            results[i] = stats
+    rows = [(_label(cfg, grid), s) for cfg, s in zip(configs, results)]
+    print_table(rows)
+    print(f"\n✅ 用时 {time.time() - t0:.1f}s")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump([dict(cfg, label=label, **s) for cfg, (label, s) in zip(configs, rows)],
+                      f, ensure_ascii=False, indent=2)
+        print(f"📄 结果已保存到 {args.json}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,376 @@
+#!/usr/bin/env python3
+"""
+链上项目监控 - 项目列表查询索引
+
+/api/projects 不再一次返回全部项目，而是按查询参数过滤、排序、分页。
+索引按快照版本构建一次（只读定长行，不解析项目 JSON），请求只解析返回的那一页：
+  - 位图（Python int，第 i 位 = 快照第 i 行）：每个标签一个，多个条件按位与，命中总数用 bit_count
+  - 时间窗口：快照行本身按 open_timestamp 倒序，窗口就是前 k 行，二分得到 k
+  - 排序：流动性 / 市值 / 评分各一个排好序的行号数组；默认按开盘时间时直接按位遍历
+  - 文本搜索：0x 开头按地址前缀（排序地址表上二分），否则按 symbol 子串（在去重后的 symbol 表上匹配）
+  - 游标带快照版本和生成时间（快照文件重建后版本号会重新计数），最近 INDEX_VERSIONS 个版本的索引保留在内存，翻页过程中快照更新也不会错位
+
+查询参数（均可选）：
+  hours      时间窗口（小时，0 或不填为全部）
+  tags       逗号分隔，全部满足：ai, website, twitter, social, dup, honeypot, suspect, renounced,
+             very-low-liq, low-liq
+  exclude    逗号分隔，都不满足（如 exclude=honeypot）
+  min_liq    最低流动性
+  q          symbol 子串或 0x 地址前缀
+  sort       open_timestamp（默认）/ liquidity / market_cap / trust_score
+  order      desc（默认）/ asc
+  limit      每页条数（默认 DEFAULT_LIMIT，最多 MAX_LIMIT）
+  cursor     上一页返回的 next_cursor
+  fields     逗号分隔的返回字段（可含 age_hours），不填返回完整项目
+  format     card：项目换成 renderer.render_json 的展示字段（忽略 fields），由缓存的 JSON 片段直接拼接
+"""
+
+import bisect
+import json
+import math
+import os
+import threading
+import time
+from array import array
+from collections import OrderedDict
+
+from renderer import render_json
+from state_snapshot import (F_AI, F_HONEYPOT, F_RENOUNCED, F_SUSPECT_HP, F_TRUST_RANK, F_TWITTER,
+                            F_WEBSITE, STATE_FILE, Row, _flags, load_projects)
+
+DEFAULT_LIMIT = 100
+MAX_LIMIT = 1000
+INDEX_VERSIONS = 3        # 内存中保留的快照版本索引数（游标在这些版本内有效）
+SMALL_MATCH_RATIO = 16    # 命中数少于行数的 1/16 时先取命中再排序，否则按排序数组扫描
+MASK_CACHE_SIZE = 64      # 每个版本缓存的搜索词 / 最低流动性位图数
+
+FLAG_TAGS = {
+    'ai': F_AI,
+    'website': F_WEBSITE,
+    'twitter': F_TWITTER,
+    'social': F_WEBSITE | F_TWITTER,
+    'dup': F_TRUST_RANK,
+    'honeypot': F_HONEYPOT,
+    'suspect': F_SUSPECT_HP,
+    'renounced': F_RENOUNCED,
+}
+LIQ_TAGS = {
+    'very-low-liq': (0, 10000),       # 与看板标签一致：<$10K
+    'low-liq': (10000, 20000),        # $10K ~ $20K
+}
+SORT_KEYS = ('open_timestamp', 'liquidity', 'market_cap', 'trust_score')
+FORMATS = ('raw', 'card')
+
+
+class QueryError(ValueError):
+    """查询参数错误（返回 400）"""
+
+
+def _mask(positions, n):
+    """行号集合 -> 位图"""
+    buf = bytearray((n + 7) // 8)
+    for i in positions:
+        buf[i >> 3] |= 1 << (i & 7)
+    return int.from_bytes(buf, 'little')
+
+
+def _iter_bits(mask, reverse=False):
+    """按行号升序（reverse 为降序）遍历位图中的行"""
+    if reverse:
+        while mask:
+            i = mask.bit_length() - 1
+            yield i
+            mask ^= 1 << i
+    else:
+        while mask:
+            low = mask & -mask
+            yield low.bit_length() - 1
+            mask ^= low
+
+
+class ProjectIndex:
+    """一个快照版本的查询索引"""
+
+    def __init__(self, version, rows, project, created=0):
+        """rows: 按 open_timestamp 倒序的 Row 列表；project(i) 返回第 i 行的完整项目；created 为快照生成时间"""
+        self.version = version
+        self.created = created
+        self.key = (version, created)
+        self.project = project
+        n = self.n = len(rows)
+        self.address = [r.address.lower() for r in rows]
+        self.columns = {
+            'open_timestamp': array('I', (r.open_timestamp for r in rows)),
+            'liquidity': array('d', (r.liquidity for r in rows)),
+            'market_cap': array('d', (r.market_cap for r in rows)),
+            'trust_score': array('i', (r.trust_score for r in rows)),
+        }
+        self._neg_ots = array('q', (-t for t in self.columns['open_timestamp']))
+        self.all = (1 << n) - 1
+
+        tag_rows = {tag: [] for tag in list(FLAG_TAGS) + list(LIQ_TAGS)}
+        for i, r in enumerate(rows):
+            for tag, bits in FLAG_TAGS.items():
+                if r.flags & bits:
+                    tag_rows[tag].append(i)
+            for tag, (lo, hi) in LIQ_TAGS.items():
+                if lo <= r.liquidity < hi:
+                    tag_rows[tag].append(i)
+        self.tags = {tag: _mask(pos, n) for tag, pos in tag_rows.items()}
+
+        self._orders = {}         # 排序键 -> 升序行号数组（懒构建）
+        self._addr_sorted = None  # (排序后的地址, 对应行号)
+        self._symbols = None      # symbol（小写）-> 位图
+        self._masks = OrderedDict()
+        self._lock = threading.Lock()
+
+    # ---------- 懒构建的索引 ----------
+    def order(self, key):
+        if key not in self._orders:
+            col = self.columns[key]
+            self._orders[key] = array('I', sorted(range(self.n), key=col.__getitem__))
+        return self._orders[key]
+
+    def _cached_mask(self, key, build):
+        with self._lock:
+            mask = self._masks.get(key)
+            if mask is not None:
+                self._masks.move_to_end(key)
+                return mask
+        mask = build()
+        with self._lock:
+            self._masks[key] = mask
+            if len(self._masks) > MASK_CACHE_SIZE:
+                self._masks.popitem(last=False)
+        return mask
+
+    def window_mask(self, hours, now):
+        """开盘时间在最近 hours 小时内的行（快照前 k 行）"""
+        k = bisect.bisect_right(self._neg_ots, -(now - hours * 3600))
+        return (1 << k) - 1
+
+    def min_liq_mask(self, min_liq):
+        def build():
+            order = self.order('liquidity')
+            col = self.columns['liquidity']
+            start = bisect.bisect_left(order, min_liq, key=col.__getitem__)
+            return _mask(order[start:], self.n)
+        return self._cached_mask(('liq', min_liq), build)
+
+    def search_mask(self, q):
+        q = q.strip().lower()
+        if q.startswith('0x'):
+            def build():
+                if self._addr_sorted is None:
+                    pairs = sorted((a, i) for i, a in enumerate(self.address))
+                    self._addr_sorted = ([a for a, _ in pairs], [i for _, i in pairs])
+                addrs, pos = self._addr_sorted
+                lo = bisect.bisect_left(addrs, q)
+                hi = bisect.bisect_left(addrs, q + '\uffff')
+                return _mask(pos[lo:hi], self.n)
+        else:
+            def build():
+                mask = 0
+                for sym, m in self.symbol_masks().items():
+                    if q in sym:
+                        mask |= m
+                return mask
+        return self._cached_mask(('q', q), build)
+
+    def symbol_masks(self):
+        """symbol（小写）-> 位图，第一次用到时解析全部项目 JSON 构建"""
+        if self._symbols is None:
+            groups = {}
+            for i in range(self.n):
+                groups.setdefault((self.project(i).get('symbol') or '').lower(), []).append(i)
+            self._symbols = {sym: _mask(pos, self.n) for sym, pos in groups.items()}
+        return self._symbols
+
+    def symbol_count(self, symbol):
+        """快照中同名（不分大小写）项目数"""
+        m = self.symbol_masks().get((symbol or '').lower())
+        return m.bit_count() if m else 0
+
+    # ---------- 查询 ----------
+    def match(self, hours=0, tags=(), exclude=(), min_liq=0, q='', now=None):
+        """满足全部条件的行位图"""
+        mask = self.all
+        if hours > 0:
+            mask &= self.window_mask(hours, time.time() if now is None else now)
+        for tag in tags:
+            mask &= self.tags[tag]
+        for tag in exclude:
+            mask &= ~self.tags[tag]
+        if min_liq > 0:
+            mask &= self.min_liq_mask(min_liq)
+        if q:
+            mask &= self.search_mask(q)
+        return mask
+
+    def page(self, mask, sort='open_timestamp', desc=True, start=0, limit=DEFAULT_LIMIT):
+        """按排序取一页行号；start 为上一页返回的位置，返回 (行号列表, 下一页位置或 None)"""
+        if sort == 'open_timestamp':
+            # 行号顺序就是开盘时间倒序，位置 = 下一个可取的行号（升序遍历）或上界（降序遍历）
+            if desc:
+                bits = _iter_bits(mask >> start << start)
+            else:
+                bits = _iter_bits(mask & ((1 << start) - 1) if start else mask, reverse=True)
+            out = []
+            for i in bits:
+                if len(out) == limit:
+                    return out, (out[-1] + 1 if desc else out[-1])
+                out.append(i)
+            return out, None
+
+        total = mask.bit_count()
+        col = self.columns[sort]
+        if total * SMALL_MATCH_RATIO < self.n:
+            # 命中少：取出命中行再排序，位置 = 排序结果中的偏移
+            hits = sorted(_iter_bits(mask), key=col.__getitem__, reverse=desc)
+            out = hits[start:start + limit]
+            return out, (start + limit if start + limit < len(hits) else None)
+
+        # 命中多：沿排序数组扫描，位置 = 排序数组中的偏移
+        order = self.order(sort)
+        bits = mask.to_bytes((self.n + 7) // 8, 'little')
+        out = []
+        pos = start
+        while pos < self.n and len(out) < limit:
+            i = order[self.n - 1 - pos] if desc else order[pos]
+            if bits[i >> 3] >> (i & 7) & 1:
+                out.append(i)
+            pos += 1
+        return out, (pos if pos < self.n and len(out) == limit else None)
+
+
+def project_fields(p, fields, now):
+    """字段投影；age_hours 按 now 计算"""
+    ots = p.get('open_timestamp', 0)
+    if fields is None:
+        return dict(p, age_hours=round((now - ots) / 3600, 1)) if ots else p
+    out = {f: p.get(f) for f in fields if f != 'age_hours'}
+    if 'age_hours' in fields:
+        out['age_hours'] = round((now - ots) / 3600, 1) if ots else p.get('age_hours')
+    return out
+
+
+class ProjectQuery:
+    """按快照版本缓存 ProjectIndex 并执行查询"""
+
+    def __init__(self, reader):
+        self.reader = reader
+        self._indexes = OrderedDict()   # (version, 快照生成时间) -> ProjectIndex
+        self._lock = threading.Lock()
+
+    def current(self):
+        snap = self.reader.get()
+        if snap is not None:
+            # 快照文件被删除重建后版本号从 1 重新开始，键带上生成时间，不会误用旧索引
+            key = (snap.version, snap.created)
+            build = lambda: ProjectIndex(snap.version, list(snap.rows()), snap.project, snap.created)
+        else:
+            # 快照不存在时回退到 state 文件（只用于监控还没发布过快照的时候），
+            # 按 state 文件修改时间缓存，版本取负数，不和快照版本冲突，游标照常可用
+            try:
+                version = -os.stat(STATE_FILE).st_mtime_ns
+            except OSError:
+                version = 0
+            key = (version, 0)
+
+            def build():
+                projects, _ = load_projects(self.reader)
+                rows = [Row(p.get('address') or '', int(p.get('open_timestamp', 0) or 0), _flags(p),
+                            float(p.get('liquidity', 0) or 0), float(p.get('market_cap', 0) or 0),
+                            int(p.get('trust_score', 0) or 0)) for p in projects]
+                return ProjectIndex(version, rows, projects.__getitem__)
+        with self._lock:
+            index = self._indexes.get(key)
+            if index is not None:
+                return index
+        index = build()
+        with self._lock:
+            self._indexes[key] = index
+            while len(self._indexes) > INDEX_VERSIONS:
+                self._indexes.popitem(last=False)
+        return index
+
+    def query(self, args, now=None):
+        """args: {参数: 字符串}；返回响应 dict，参数错误抛 QueryError"""
+        now = time.time() if now is None else now
+        hours = _num(args, 'hours', 0)
+        min_liq = _num(args, 'min_liq', 0)
+        limit = max(1, min(int(_num(args, 'limit', DEFAULT_LIMIT)), MAX_LIMIT))
+        tags = _list(args, 'tags')
+        exclude = _list(args, 'exclude')
+        unknown = [t for t in tags + exclude if t not in FLAG_TAGS and t not in LIQ_TAGS]
+        if unknown:
+            raise QueryError(f"unknown tag: {','.join(unknown)}")
+        sort = args.get('sort') or 'open_timestamp'
+        if sort not in SORT_KEYS:
+            raise QueryError(f"unknown sort: {sort}")
+        order = args.get('order') or 'desc'
+        if order not in ('asc', 'desc'):
+            raise QueryError(f"unknown order: {order}")
+        fields = _list(args, 'fields') or None
+        fmt = args.get('format') or 'raw'
+        if fmt not in FORMATS:
+            raise QueryError(f"unknown format: {fmt}")
+
+        # 游标：快照版本.快照生成时间.位置.第一页的时间（时间窗口翻页时不随时间移动）
+        cursor = args.get('cursor')
+        start = 0
+        if cursor:
+            try:
+                version, created, start, now = (int(x) for x in cursor.split('.'))
+            except ValueError:
+                raise QueryError("bad cursor")
+            with self._lock:
+                index = self._indexes.get((version, created))
+            if index is None:
+                raise QueryError("cursor expired")
+        else:
+            index = self.current()
+
+        mask = index.match(hours, tags, exclude, min_liq, args.get('q', ''), now)
+        rows, next_pos = index.page(mask, sort, order == 'desc', start, limit)
+        if fmt == 'card':
+            # 卡片是 JSON 文本，由 query_json 拼进响应体
+            projects = []
+            for n, i in enumerate(rows, 1):
+                p = index.project(i)
+                projects.append(render_json(p, n, max(1, index.symbol_count(p.get('symbol'))), now))
+        else:
+            projects = [project_fields(index.project(i), fields, now) for i in rows]
+        return {
+            'count': mask.bit_count(),
+            'version': index.version,
+            'as_of': int(now),
+            'next_cursor': f"{index.version}.{index.created}.{next_pos}.{int(now)}" if next_pos is not None else None,
+            'projects': projects,
+        }
+
+    def query_json(self, args, now=None):
+        """query() 的 JSON 响应体；format=card 时卡片片段直接拼接，不再序列化"""
+        result = self.query(args, now)
+        if (args.get('format') or 'raw') != 'card':
+            return json.dumps(result, ensure_ascii=False)
+        projects = result.pop('projects')
+        head = json.dumps(result, ensure_ascii=False)
+        return f'{head[:-1]}, "projects": [{", ".join(projects)}]}}'
+
+
+def _num(args, name, default):
+    value = args.get(name)
+    if value in (None, ''):
+        return default
+    try:
+        number = float(value)
+    except ValueError:
+        raise QueryError(f"bad {name}: {value}")
+    if not math.isfinite(number):
+        raise QueryError(f"bad {name}: {value}")
+    return number
+
+
+def _list(args, name):
+    return [x.strip() for x in (args.get(name) or '').split(',') if x.strip()]
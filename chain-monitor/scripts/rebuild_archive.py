@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""
+链上项目监控 - 归档全量重建
+
+修改格式 / 评分规则后，重新生成全部 archive/YYYY-MM-DD.md、INDEX.md 和 REPORT_48H.md：
+  - 日期分区在进程池中并行渲染，每个文件先写临时文件再 rename
+  - 内容与现有文件相同（忽略时间戳行）时跳过写入，重复运行结果不变
+  - 可以和监控同时运行：渲染后重新检查分区条数，期间被监控追加过的日期会重新渲染；
+    冷存储中的日期默认不生成 markdown（与监控行为一致）
+  - 同时重写监控的索引片段缓存（archive/.index_cache.json），监控下一轮直接沿用新格式
+
+用法：
+  python3 rebuild_archive.py
+  python3 rebuild_archive.py --workers 8
+  python3 rebuild_archive.py --start 2026-01-01 --end 2026-01-31 --no-report
+  python3 rebuild_archive.py --cold          # 冷存储日期也生成 markdown
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+import zlib
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import archive_store
+from archive_store import ArchiveStore
+import gmgn_monitor as gm
+from notified_store import dump_all
+
+RENDER_RETRIES = 3   # 渲染期间分区被追加时的最大重试次数
+
+_store = None
+_all_symbols = None
+
+
+def _write_atomic(path, content, ignore_line=None):
+    """
+    先写临时文件再 rename；与现有文件内容相同时跳过（ignore_line 为不参与比较的行号，如时间戳行）。
+    返回是否写入。
+    """
+    def _cmp(text):
+        lines = text.split("\n")
+        if ignore_line is not None and len(lines) > ignore_line:
+            del lines[ignore_line]
+        return lines
+    try:
+        with open(path) as f:
+            if _cmp(f.read()) == _cmp(content):
+                return False
+    except (OSError, UnicodeDecodeError):
+        pass
+    tmp_file = gm._tmp_path(path)
+    with open(tmp_file, 'w') as f:
+        f.write(content)
+    os.rename(tmp_file, path)
+    return True
+
+
+def _init_worker(root, all_symbols):
+    global _store, _all_symbols
+    _store = ArchiveStore(root)
+    _all_symbols = all_symbols
+
+
+def _rebuild_date(date_str, with_cold):
+    """
+    子进程：渲染一个日期的 markdown 和索引片段。
+    渲染后重读 manifest，条数变化（监控同时追加）则重新渲染，保证最后写入的是最新内容。
+    返回 (日期, 项目数, 是否写入, 索引片段)。
+    """
+    written = False
+    for attempt in range(RENDER_RETRIES):
+        _store.refresh()
+        try:
+            projects = _store.load(date_str)
+        except (OSError, zlib.error):
+            # 读取期间被转入冷存储，下一轮按新 manifest 读取
+            if attempt == RENDER_RETRIES - 1:
+                raise
+            continue
+        if with_cold or not _store.is_cold(date_str):
+            written |= _write_atomic(os.path.join(gm.ARCHIVE_DIR, f"{date_str}.md"),
+                                     gm._render_day(date_str, projects))
+        _store.refresh()
+        if _store.count(date_str) == len(projects):
+            break
+    frag = gm._render_index_date(date_str, gm._day_order(projects),
+                                 archive_store.rollup(projects), _all_symbols, gm._md_linked(_store, date_str))
+    return date_str, len(projects), written, frag
+
+
+def rebuild_dates(store, dates, workers, with_cold=False):
+    """并行重建日期文件，返回 {日期: 索引片段}"""
+    all_symbols = Counter()
+    for date_str in store.dates():
+        all_symbols.update(store.rollup(date_str)['symbols'])
+    all_symbols = dict(all_symbols)
+
+    frags = {}
+    n_written = 0
+    t0 = time.time()
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(store.root, all_symbols)) as pool:
+        futures = [pool.submit(_rebuild_date, d, with_cold) for d in dates]
+        for done, fut in enumerate(as_completed(futures), 1):
+            date_str, count, written, frag = fut.result()
+            frags[date_str] = frag
+            n_written += written
+            state = "已写入" if written else "未变化"
+            print(f"📁 [{done}/{len(dates)}] {date_str}: {count} 个项目 ({state})", flush=True)
+    print(f"✅ 日期文件: {len(dates)} 天，写入 {n_written} 个，用时 {time.time() - t0:.1f}s")
+    return frags, all_symbols
+
+
+def rebuild_index(store, frags, all_symbols):
+    """用新片段重写索引缓存和 INDEX.md；未重建的日期沿用缓存片段"""
+    cache = gm._load_json_cache(gm.INDEX_CACHE_FILE)
+    dates = {d: f for d, f in cache.get('dates', {}).items() if d in store}
+    dates.update(frags)
+    missing = [d for d in store.dates() if d not in dates]
+    for date_str in missing:
+        projects = store.load(date_str)
+        dates[date_str] = gm._render_index_date(date_str, gm._day_order(projects),
+                                                archive_store.rollup(projects), all_symbols,
+                                                gm._md_linked(store, date_str))
+    gm._save_json_cache(gm.INDEX_CACHE_FILE, {
+        'dates': dates, 'symbols': {sym: n for sym, n in all_symbols.items() if n > 0}})
+    content, _ = gm._index_content(dates, store.summary())
+    written = _write_atomic(gm.INDEX_FILE, content, ignore_line=2)
+    print(f"📋 INDEX.md {'已写入' if written else '未变化'}")
+
+
+def rebuild_report():
+    """从监控 state 重新生成 REPORT_48H.md"""
+    try:
+        with open(gm.STATE_FILE) as f:
+            state = json.load(f)
+    except (OSError, ValueError):
+        print("⚠️ 没有监控 state，跳过 48h 报告")
+        return
+    state['notified_full'] = dump_all(hot=state.get('notified_full', {}))
+    now = int(time.time())
+    cutoff = now - 48 * 3600
+    active = [p for p in gm._collect_notified(state, now) if p.get('open_timestamp', 0) >= cutoff]
+    written = _write_atomic(gm.REPORT_FILE, "\n".join(gm._render_report(active, state['notified_full'])),
+                            ignore_line=2)
+    print(f"📋 REPORT_48H.md: {len(active)} 个活跃项目 ({'已写入' if written else '未变化'})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="并行重建归档 markdown / 索引 / 48h 报告")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help="进程数")
+    parser.add_argument('--start', help="日期范围起 YYYY-MM-DD")
+    parser.add_argument('--end', help="日期范围止 YYYY-MM-DD")
+    parser.add_argument('--cold', action='store_true', help="冷存储中的日期也生成 markdown")
+    parser.add_argument('--no-report', action='store_true', help="不重建 REPORT_48H.md")
+    args = parser.parse_args()
+
+    if not os.path.isdir(gm.ARCHIVE_DB_DIR):
+        print("❌ 没有归档数据")
+        sys.exit(1)
+    os.makedirs(gm.ARCHIVE_DIR, exist_ok=True)
+    store = ArchiveStore(gm.ARCHIVE_DB_DIR)
+    store.migrate()
+    dates = [d for d in store.dates()
+             if (not args.start or d >= args.start) and (not args.end or d <= args.end)]
+    print(f"重建 {len(dates)} 天归档（{args.workers} 进程）")
+
+    frags, all_symbols = rebuild_dates(store, dates, args.workers, args.cold)
+    store.refresh()
+    rebuild_index(store, frags, all_symbols)
+    if not args.no_report:
+        rebuild_report()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,456 @@
+#!/usr/bin/env python3
+"""
+链上项目监控 - 统一项目卡片渲染
+
+同一个项目在归档 markdown、回测 / Telegram 文本、看板 HTML 和 API JSON 中的展示都由这里生成：
+  render_markdown   归档 / 48h 报告（archive/*.md）
+  render_text       Telegram / 控制台文本（回测报告）
+  render_html_row   看板表格行
+  render_json       API 展示用字段（/api/projects?format=card），返回 JSON 文本，响应体直接拼接
+
+渲染结果按 (目标, 内容版本, 上下文) 缓存在进程内 LRU 中。
+内容版本是卡片实际读取的字段（CARD_FIELDS，含地址）组成的元组，取键只做字段读取，不序列化整个项目；
+序号和年龄这类每次都变的值在缓存片段中用占位符表示，取出后再替换，
+所以数据没变的项目跨扫描 / 报告 / 页面刷新都不会重新渲染。新卡片读取新字段时要加进 CARD_FIELDS。
+"""
+
+import json
+import time
+from collections import OrderedDict
+
+GMGN_TOKEN_URL = "https://gmgn.ai/base/token/"
+FRAGMENT_CACHE_SIZE = 20000
+# 各卡片读取的项目字段（age_hours 不在其中：用占位符或放进上下文）
+CARD_FIELDS = ('address', 'symbol', 'is_ai_mining', 'ai_keywords', 'market_cap', 'liquidity', 'holders',
+               'price_change_1h', 'source', 'website', 'twitter', 'telegram', 'trust_score', 'trust_rank',
+               'renounced', 'is_open_source', 'is_honeypot', 'suspect_honeypot', 'buy_tax', 'sell_tax',
+               'rug_ratio', 'open_timestamp')
+
+# 片段中的占位符
+_IDX = '\x00idx\x00'
+_AGE = '\x00age\x00'
+
+_cache = OrderedDict()
+_stats = {'hits': 0, 'misses': 0}
+
+
+# ============================================================
+# 缓存
+# ============================================================
+_KW_POS = CARD_FIELDS.index('ai_keywords')
+
+
+def content_version(p):
+    """项目内容版本：卡片读取的字段值元组（关键词列表转成元组以便做键）"""
+    values = list(map(p.get, CARD_FIELDS))
+    if isinstance(values[_KW_POS], list):
+        values[_KW_POS] = tuple(values[_KW_POS])
+    return tuple(values)
+
+
+def _cached(target, p, ctx, build):
+    """
+    返回片段按占位符切开的 (序号前, 序号与年龄之间, 年龄后) 三段，由 _fill 拼接；
+    每种卡片中序号和年龄各出现一次且序号在前，拼接不用在整段片段上 replace
+    """
+    key = (target, content_version(p), ctx)
+    frag = _cache.get(key)
+    if frag is not None:
+        _cache.move_to_end(key)
+        _stats['hits'] += 1
+        return frag
+    _stats['misses'] += 1
+    head, rest = build().split(_IDX)
+    frag = (head, *rest.split(_AGE))
+    _cache[key] = frag
+    if len(_cache) > FRAGMENT_CACHE_SIZE:
+        _cache.popitem(last=False)
+    return frag
+
+
+def _fill(frag, idx, age):
+    head, mid, tail = frag
+    return f"{head}{idx}{mid}{age}{tail}"
+
+
+def cache_info():
+    return dict(_stats, size=len(_cache))
+
+
+def cache_clear():
+    _cache.clear()
+    _stats.update(hits=0, misses=0)
+
+
+# ============================================================
+# 公共格式化
+# ============================================================
+def fmt_mc(val):
+    if not val:
+        return "$0"
+    if val >= 1_000_000_000:
+        return f"${val/1_000_000_000:.2f}B"
+    elif val >= 1_000_000:
+        return f"${val/1_000_000:.2f}M"
+    elif val >= 1_000:
+        return f"${val/1_000:.0f}K"
+    return f"${val:.0f}"
+
+
+def fmt_liq(val):
+    """流动性格式化，带颜色标记"""
+    formatted = fmt_mc(val)
+    if val < 10000:
+        return f"🔴{formatted}"
+    elif val < 20000:
+        return f"🟡{formatted}"
+    return formatted
+
+
+def is_fake_mc(p):
+    liq = p.get('liquidity', 0)
+    mc = p.get('market_cap', 0)
+    return liq > 0 and mc / liq > 1000
+
+
+def _dup_name(p, dup_count, sep=' '):
+    sym = p['symbol']
+    if dup_count > 1:
+        return f"{sym}{sep}({p['address'][:6]}) [同名×{dup_count}]"
+    return sym
+
+
+def _chg_1h(p):
+    try:
+        return float(p.get('price_change_1h', 0) or 0)
+    except (ValueError, TypeError):
+        return 0
+
+
+def warnings(p):
+    """数据异常 / 安全警告"""
+    warns = []
+    mc = p.get('market_cap', 0)
+    liq = p.get('liquidity', 0)
+    if liq > 0 and mc / liq > 1000:
+        warns.append(f"MC/Liq比={mc/liq:.0f}x，疑似假市值")
+    elif liq > 0 and mc / liq > 100:
+        warns.append(f"MC/Liq比={mc/liq:.0f}x，市值偏高")
+    if p.get('age_hours') == 0 and p.get('source') == 'dexscreener':
+        warns.append("age=0h，可能是新pair非新币")
+    if p.get('holders') == 0 and p.get('source') == 'dexscreener':
+        warns.append("持有人数据缺失")
+    # 貔貅盘检测
+    if p.get('is_honeypot') == 1:
+        warns.append("🚫 貔貅盘（Honeypot）！只能买不能卖")
+    # 买卖税检测
+    buy_tax = p.get('buy_tax')
+    sell_tax = p.get('sell_tax')
+    if buy_tax is not None and float(buy_tax) > 5:
+        warns.append(f"买入税 {float(buy_tax):.1f}%")
+    if sell_tax is not None and float(sell_tax) > 5:
+        warns.append(f"卖出税 {float(sell_tax):.1f}%")
+    if sell_tax is not None and float(sell_tax) > 30:
+        warns.append("🚫 卖出税过高，疑似貔貅")
+    # Rug 风险
+    rug = p.get('rug_ratio')
+    if rug is not None and float(rug) > 0.5:
+        warns.append(f"⛔ Rug风险 {float(rug)*100:.0f}%")
+    elif rug is not None and float(rug) > 0.2:
+        warns.append(f"Rug风险 {float(rug)*100:.0f}%")
+    return warns
+
+
+def security_tags(p):
+    """安全标签（文本）"""
+    tags = []
+    if p.get('renounced') == 1:
+        tags.append("✅弃权")
+    elif p.get('renounced') == 0:
+        tags.append("❌未弃权")
+    if p.get('is_open_source') == 1:
+        tags.append("✅开源")
+    elif p.get('is_open_source') == 0:
+        tags.append("❌未开源")
+    if p.get('is_honeypot') == 1:
+        tags.append("🚫貔貅")
+    elif p.get('is_honeypot') == 0:
+        tags.append("✅非貔貅")
+    buy_tax = p.get('buy_tax')
+    sell_tax = p.get('sell_tax')
+    if buy_tax is not None and sell_tax is not None:
+        tags.append(f"税:{float(buy_tax):.1f}%/{float(sell_tax):.1f}%")
+    return tags
+
+
+def is_featured(p):
+    """重点项目（有网页 / 社交资料）"""
+    return bool(p.get('website') or p.get('twitter') or p.get('telegram'))
+
+
+# ============================================================
+# markdown（归档 / 48h 报告）
+# ============================================================
+def _markdown(p, dup_count):
+    ai_tag = "🤖" if p.get('is_ai_mining') else "📊"
+    mc = p.get('market_cap', 0)
+    liq = p.get('liquidity', 0)
+    mc_liq_ratio = round(mc / liq, 1) if liq > 0 else 0
+    lines = [
+        f"### {ai_tag} #{_IDX} {_dup_name(p, dup_count)}",
+        f"",
+        f"- 合约: `{p['address']}`",
+        f"- MC: {fmt_mc(mc)} | 流动性: {fmt_liq(liq)} | MC/Liq: {mc_liq_ratio}x",
+    ]
+    if p.get('holders'):
+        lines.append(f"- 持有人: {p['holders']:,}")
+    lines.append(f"- 年龄: {_AGE}h | 来源: {p.get('source', '?')}")
+    if p.get('website'):
+        lines.append(f"- 🌐 {p['website']}")
+    if p.get('twitter'):
+        lines.append(f"- 🐦 @{p['twitter']}")
+    if p.get('telegram'):
+        lines.append(f"- 💬 {p['telegram']}")
+    lines.append(f"- 🔗 [GMGN]({GMGN_TOKEN_URL}{p['address']})")
+    if p.get('ai_keywords'):
+        lines.append(f"- 关键词: {', '.join(p['ai_keywords'])}")
+    if p.get('trust_rank'):
+        lines.append(f"- 可信度: {p['trust_rank']} (评分: {p.get('trust_score', 0)}/15)")
+    lines.append("")
+    return "\n".join(lines)
+
+
+def render_markdown(p, idx, symbol_counts=None):
+    """归档 markdown 卡片；symbol_counts 为同名计数（Counter / dict）"""
+    dup_count = symbol_counts.get(p['symbol'], 1) if symbol_counts else 1
+    frag = _cached('md', p, (dup_count,), lambda: _markdown(p, dup_count))
+    return _fill(frag, idx, p.get('age_hours', 0))
+
+
+# ============================================================
+# Telegram / 控制台文本（回测报告）
+# ============================================================
+def _text(p, dup_count, show_kw, indent, title_indent):
+    warns = warnings(p)
+    featured = is_featured(p)
+    prefix = ""
+    if featured and warns:
+        prefix = "⭐⚠️ "
+    elif featured:
+        prefix = "⭐ "
+    elif warns:
+        prefix = "⚠️ "
+    suffix = " — 有网页资料" if featured else ""
+    lines = [f"{title_indent}{prefix}#{_IDX} {_dup_name(p, dup_count)}{suffix}",
+             f"合约: {p['address']}",
+             f"MC: {fmt_mc(p.get('market_cap', 0))} | 流动性: {fmt_mc(p.get('liquidity', 0))} | "
+             f"持有人: {p.get('holders', 0):,}"]
+    chg = _chg_1h(p)
+    chg_str = f"+{chg:.1f}%" if chg > 0 else f"{chg:.1f}%"
+    lines.append(f"年龄: {_AGE}h | 1h: {chg_str} | 来源: {p.get('source', '?')}")
+    sec = security_tags(p)
+    if sec:
+        lines.append(f"🔒 {' | '.join(sec)}")
+    if show_kw and p.get('ai_keywords'):
+        lines.append(f"关键词: {', '.join(p['ai_keywords'])}")
+    if p.get('website'):
+        lines.append(f"🌐 {p['website']}")
+    if p.get('twitter'):
+        lines.append(f"🐦 @{p['twitter']}")
+    if p.get('telegram'):
+        lines.append(f"💬 {p['telegram']}")
+    lines.append(f"🔗 gmgn.ai/base/token/{p['address']}")
+    for w in warns:
+        lines.append(f"⚠️ {w}")
+    return "\n".join([lines[0]] + [indent + line for line in lines[1:]])
+
+
+def render_text(p, idx, dup_count=1, show_kw=False, indent='', title_indent=''):
+    """Telegram 文本卡片；indent / title_indent 用于控制台缩进输出"""
+    # "age=0h" 警告依赖易变字段，放进上下文
+    frag = _cached('text', p, (dup_count, show_kw, indent, title_indent, p.get('age_hours') == 0),
+                   lambda: _text(p, dup_count, show_kw, indent, title_indent))
+    return _fill(frag, idx, p.get('age_hours', 0))
+
+
+# ============================================================
+# HTML（看板表格行）
+# ============================================================
+def _security_tags_html(p):
+    tags = []
+    if p.get('renounced') == 1: tags.append('<span class="tag-ok">✅弃权</span>')
+    elif p.get('renounced') == 0: tags.append('<span class="tag-warn">❌未弃权</span>')
+    if p.get('is_open_source') == 1 or p.get('is_open_source') is None: tags.append('<span class="tag-ok">✅开源</span>')
+    if p.get('is_honeypot') == 0: tags.append('<span class="tag-ok">✅非貔貅</span>')
+    elif p.get('is_honeypot') == 1: tags.append('<span class="tag-bad">🚫貔貅</span>')
+    if p.get('suspect_honeypot'): tags.append('<span class="tag-bad">⚠️疑似貔貅(买卖比异常)</span>')
+    bt = p.get('buy_tax'); st = p.get('sell_tax')
+    if bt is not None and st is not None:
+        tags.append(f"税:{float(bt):.1f}%/{float(st):.1f}%")
+    return " | ".join(tags)
+
+
+def _html_age(p, now=None):
+    age_h = p.get('age_hours', 0)
+    ots = p.get('open_timestamp', 0)
+    if ots and ots > 1000000000:
+        age_h = ((now or time.time()) - ots) / 3600
+    if age_h <= 0 and (not ots or ots < 1000000000):
+        return "未知"
+    elif age_h >= 24:
+        return f"{age_h/24:.0f}d"
+    return f"{age_h:.1f}h"
+
+
+def _html_row(p, dup_count, is_fav, show_kw, show_ai_tag):
+    sym = p['symbol']
+    name = f"{sym} ({p['address'][:6]}) <span class='dup'>同名×{dup_count}</span>" if dup_count > 1 else sym
+    icon = ""
+    if p.get('liquidity', 0) < 10000:
+        icon = '<span class="icon-warn">🚨</span>'
+    elif p.get('liquidity', 0) < 20000:
+        icon = '<span class="icon-warn">⚠️</span>'
+    elif p.get('website'):
+        icon = '<span class="icon-star">⭐</span>'
+    mc = fmt_mc(p.get('market_cap', 0))
+    liq_val = p.get('liquidity', 0)
+    mc_val = p.get('market_cap', 0)
+    if mc_val >= 1000000:
+        mc = f'<span style="color:#3fb950">{mc}</span>'
+    elif mc_val >= 300000:
+        mc = f'<span style="color:#58a6ff">{mc}</span>'
+    liq = fmt_mc(liq_val)
+    if liq_val < 10000:
+        liq = f'<span class="liq-red">{liq}</span>'
+    elif liq_val < 20000:
+        liq = f'<span class="liq-yellow">{liq}</span>'
+    mc_liq_ratio = f"{mc_val / liq_val:.1f}x" if liq_val > 0 else "N/A"
+    holders = f"{p.get('holders', 0):,}"
+    chg = _chg_1h(p)
+    chg_cls = "up" if chg > 0 else "down" if chg < 0 else ""
+    chg_str = f"+{chg:.1f}%" if chg > 0 else f"{chg:.1f}%"
+
+    # 可信度评分
+    trust_score = p.get('trust_score', 0) or 0
+    trust_rank = p.get('trust_rank', '')
+    if trust_rank:
+        if '真品' in trust_rank:
+            trust_cls = 'trust-good'
+        elif '待验证' in trust_rank:
+            trust_cls = 'trust-warn'
+        elif '仿盘' in trust_rank:
+            trust_cls = 'trust-bad'
+        else:
+            trust_cls = 'trust-none'
+        trust_html = f'<span style="color:#8b949e;font-size:0.85em">{trust_score}/15</span> <span class="{trust_cls}">{trust_rank}</span>'
+    elif trust_score != 0:
+        # 无同名但有基础分
+        score_color = '#3fb950' if trust_score >= 5 else '#d29922' if trust_score >= 2 else '#f85149'
+        trust_html = f'<span style="color:{score_color};font-size:0.85em">{trust_score}/15</span>'
+    else:
+        trust_html = '<span class="trust-none">-</span>'
+
+    src = p.get('source', '?')
+    sec = _security_tags_html(p)
+    addr = p['address']
+    gmgn = f"{GMGN_TOKEN_URL}{addr}"
+    fav_cls = "fav-btn faved" if is_fav else "fav-btn"
+    fav_star = "★" if is_fav else "☆"
+
+    extra = ""
+    if show_kw and p.get('ai_keywords'):
+        extra += f"<div class='kw'>关键词: {', '.join(p['ai_keywords'])}</div>"
+    if p.get('website'):
+        extra += f"<div>🌐 <a href='{p['website']}' target='_blank'>{p['website']}</a></div>"
+    if p.get('twitter'):
+        tw = p['twitter']
+        if not tw.startswith('http'): tw = f"https://x.com/{tw}"
+        extra += f"<div>🐦 <a href='{tw}' target='_blank'>@{p['twitter']}</a></div>"
+
+    warns = []
+    if liq_val > 0 and mc_val / liq_val > 1000:
+        warns.append(f"MC/Liq比={mc_val/liq_val:.0f}x，疑似假市值")
+    warn_html = "".join(f"<div class='warn'>⚠️ {w}</div>" for w in warns)
+
+    tag_list = []
+    tags = ""
+    if show_ai_tag and p.get('is_ai_mining'):
+        tags += '<span class="ai-tag">🤖AI挖矿</span> '
+        tag_list.append('ai-mining')
+    if p.get('liquidity', 0) < 10000:
+        tags += '<span class="very-low-liq-tag">💧流动性极低</span>'
+        tag_list.append('very-low-liq')
+    elif p.get('liquidity', 0) < 20000:
+        tags += '<span class="low-liq-tag">💧流动性过低</span>'
+        tag_list.append('low-liq')
+    if p.get('website'):
+        tag_list.append('has-website')
+    if p.get('twitter'):
+        tag_list.append('has-twitter')
+    if p.get('renounced') == 1:
+        tag_list.append('renounced')
+    if p.get('is_honeypot') == 1:
+        tag_list.append('honeypot')
+
+    is_ai = 'true' if p.get('is_ai_mining') else 'false'
+    tags_data = ','.join(tag_list)
+    ots_val = p.get('open_timestamp', 0) or 0
+    return f"""<tr data-ai="{is_ai}" data-tags="{tags_data}" data-ots="{ots_val}">
+<td>{_IDX}</td>
+<td class="icon">{icon}</td>
+<td class="name">{name}{warn_html}</td>
+<td class="addr"><a href="{gmgn}" target="_blank">{addr}</a><button class="copy-btn" onclick="copyAddr(this,'{addr}')">📋</button><button class="{fav_cls}" onclick="toggleFav(this,'{addr}')">{fav_star}</button><button class="hide-btn" onclick="toggleHide('{addr}')">🙈</button></td>
+<td>{mc}</td>
+<td>{liq}</td>
+<td>{mc_liq_ratio}</td>
+<td>{holders}</td>
+<td>{_AGE}</td>
+<td class="{chg_cls}">{chg_str}</td>
+<td>{trust_html}</td>
+<td>{src}</td>
+<td class="sec">{sec}</td>
+<td>{extra}</td>
+<td>{tags}</td>
+</tr>"""
+
+
+def render_html_row(p, idx, dup_count=1, is_fav=False, show_kw=False, show_ai_tag=False, now=None):
+    """看板表格行；年龄按当前时间实时计算"""
+    frag = _cached('html', p, (dup_count, is_fav, show_kw, show_ai_tag),
+                   lambda: _html_row(p, dup_count, is_fav, show_kw, show_ai_tag))
+    return _fill(frag, idx, _html_age(p, now))
+
+
+# ============================================================
+# JSON（API）
+# ============================================================
+def _json(p, dup_count):
+    mc = p.get('market_cap', 0)
+    liq = p.get('liquidity', 0)
+    body = json.dumps({
+        'address': p['address'],
+        'name': _dup_name(p, dup_count),
+        'is_ai_mining': bool(p.get('is_ai_mining')),
+        'market_cap': fmt_mc(mc),
+        'liquidity': fmt_mc(liq),
+        'mc_liq_ratio': round(mc / liq, 1) if liq > 0 else None,
+        'holders': p.get('holders', 0),
+        'price_change_1h': _chg_1h(p),
+        'source': p.get('source', '?'),
+        'trust': {'score': p.get('trust_score', 0) or 0, 'rank': p.get('trust_rank', '')},
+        'security': security_tags(p),
+        'warnings': warnings(p),
+        'links': {k: v for k, v in (('gmgn', f"{GMGN_TOKEN_URL}{p['address']}"),
+                                    ('website', p.get('website')), ('twitter', p.get('twitter')),
+                                    ('telegram', p.get('telegram'))) if v},
+        'ai_keywords': p.get('ai_keywords') or [],
+    }, ensure_ascii=False)
+    # 序号在最前、年龄在最后，占位符在 JSON 之外拼接（json.dumps 会转义占位符中的 \x00）
+    return f'{{"idx": {_IDX}, {body[1:-1]}, "age": "{_AGE}"}}'
+
+
+def render_json(p, idx, dup_count=1, now=None):
+    """展示用字段（格式化数值、同名名称、安全标签、警告、链接）的 JSON 文本；年龄按 now 计算"""
+    # "age=0h" 警告依赖易变字段，放进上下文
+    frag = _cached('json', p, (dup_count, p.get('age_hours') == 0), lambda: _json(p, dup_count))
+    return _fill(frag, idx, _html_age(p, now))
@@ -6,18 +6,32 @@
 1. 生成48小时内活跃项目报告
 2. 过期项目按日期归档到 archive/YYYY-MM-DD.md
 3. 维护索引文件 archive/INDEX.md（日期、项目名、合约地址）
+
+用法：
+  python3 report_archive.py                 # 一次性读入 enriched 文件
+  python3 report_archive.py --stream        # 流式解析，内存只保留 48h 项目和单日分区
+  python3 report_archive.py --stream --input /path/to/enriched.json
 """
 
+import argparse
 import json
 import os
+import tempfile
 import time
+from collections import Counter
 from datetime import datetime, timedelta
 
+from archive_store import ArchiveStore
+import renderer
+from renderer import is_fake_mc, render_markdown
+
 ARCHIVE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "archive")
 INDEX_FILE = os.path.join(ARCHIVE_DIR, "INDEX.md")
 REPORT_FILE = os.path.join(ARCHIVE_DIR, "REPORT_48H.md")
 ENRICHED_FILE = "/tmp/backtest_48h_enriched.json"
 STATE_FILE = "/tmp/gmgn_monitor_state.json"
+STREAM_CHUNK_SIZE = 1 << 20      # 流式解析每次读取的字符数
+SPOOL_MAX_OPEN = 64              # 流式归档时同时打开的日期暂存文件上限
 
 os.makedirs(ARCHIVE_DIR, exist_ok=True)
 
@@ -25,67 +39,56 @@ NOW = int(time.time())
 CUTOFF_48H = NOW - 48 * 3600
 
 
-def load_projects():
+def load_projects(path=ENRICHED_FILE):
     """加载所有已知项目（enriched + state 中的历史记录）"""
     projects = []
     # 从 enriched 文件加载
-    if os.path.exists(ENRICHED_FILE):
-        with open(ENRICHED_FILE) as f:
+    if os.path.exists(path):
+        with open(path) as f:
             projects = json.load(f)
     return projects
 
 
-def load_archive_db():
-    """加载已归档项目数据库"""
-    db_file = os.path.join(ARCHIVE_DIR, "archive_db.json")
-    if os.path.exists(db_file):
-        with open(db_file) as f:
-            return json.load(f)
-    return {}
-
-
-def save_archive_db(db):
-    db_file = os.path.join(ARCHIVE_DIR, "archive_db.json")
-    with open(db_file, 'w') as f:
-        json.dump(db, f, ensure_ascii=False, indent=2)
-
-
-def format_mc(val):
-    if val >= 1_000_000_000:
-        return f"${val/1_000_000_000:.2f}B"
-    elif val >= 1_000_000:
-        return f"${val/1_000_000:.2f}M"
-    elif val >= 1_000:
-        return f"${val/1_000:.0f}K"
-    return f"${val:.0f}"
-
-
-def format_project_block(p, idx, symbol_counts=None):
-    """格式化单个项目为 markdown 块"""
-    lines = []
-    ai_tag = "🤖" if p.get('is_ai_mining') else "📊"
-    sym = p['symbol']
-    cnt = symbol_counts.get(sym, 1) if symbol_counts else 1
-    if cnt > 1:
-        sym = f"{sym} ({p['address'][:6]}) [同名×{cnt}]"
-    lines.append(f"### {ai_tag} #{idx} {sym}")
-    lines.append(f"")
-    lines.append(f"- 合约: `{p['address']}`")
-    lines.append(f"- MC: {format_mc(p.get('market_cap', 0))} | 流动性: {format_mc(p.get('liquidity', 0))}")
-    if p.get('holders'):
-        lines.append(f"- 持有人: {p['holders']:,}")
-    lines.append(f"- 年龄: {p.get('age_hours', 0)}h | 来源: {p.get('source', '?')}")
-    if p.get('website'):
-        lines.append(f"- 🌐 {p['website']}")
-    if p.get('twitter'):
-        lines.append(f"- 🐦 @{p['twitter']}")
-    if p.get('telegram'):
-        lines.append(f"- 💬 {p['telegram']}")
-    lines.append(f"- 🔗 [GMGN](https://gmgn.ai/base/token/{p['address']})")
-    if p.get('ai_keywords'):
-        lines.append(f"- 关键词: {', '.join(p['ai_keywords'])}")
-    lines.append("")
-    return "\n".join(lines)
+def iter_projects(path, chunk_size=STREAM_CHUNK_SIZE):
+    """增量解析 JSON 数组文件，逐个产出项目，不把整个文件读入内存"""
+    decoder = json.JSONDecoder()
+    with open(path) as f:
+        buf = f.read(chunk_size)
+        pos = 0
+        started = False
+        eof = not buf
+        while True:
+            # 跳过空白、逗号和数组起始符
+            while pos < len(buf) and (buf[pos].isspace() or buf[pos] == ',' or (buf[pos] == '[' and not started)):
+                started = started or buf[pos] == '['
+                pos += 1
+            if pos < len(buf) and buf[pos] == ']':
+                return
+            if pos < len(buf):
+                try:
+                    obj, end = decoder.raw_decode(buf, pos)
+                except ValueError:
+                    if eof:
+                        raise
+                else:
+                    # 对象恰好在块尾结束时，数字等值可能被截断，多读一块再确认
+                    if end < len(buf) or eof:
+                        yield obj
+                        pos = end
+                        continue
+            if eof:
+                return
+            chunk = f.read(chunk_size)
+            eof = not chunk
+            buf = buf[pos:] + chunk
+            pos = 0
+
+
+def open_archive_db():
+    """打开按日期分区的归档存储（archive/db/），有旧版 archive_db.json 时先迁移"""
+    store = ArchiveStore(os.path.join(ARCHIVE_DIR, "db"))
+    store.migrate()
+    return store
 
 
 def generate_48h_report(projects):
@@ -99,15 +102,9 @@ def generate_48h_report(projects):
     from collections import Counter
     _sc = Counter(p['symbol'] for p in active)
 
-    # 疑似假市值判断
-    def _is_fake_mc(p):
-        liq = p.get('liquidity', 0)
-        mc = p.get('market_cap', 0)
-        return liq > 0 and mc / liq > 1000
-
-    ai_projects = [p for p in active if p.get('is_ai_mining') and not _is_fake_mc(p)]
-    normal = [p for p in active if not p.get('is_ai_mining') and not _is_fake_mc(p)]
-    fake_mc = [p for p in active if _is_fake_mc(p)]
+    ai_projects = [p for p in active if p.get('is_ai_mining') and not is_fake_mc(p)]
+    normal = [p for p in active if not p.get('is_ai_mining') and not is_fake_mc(p)]
+    fake_mc = [p for p in active if is_fake_mc(p)]
 
     lines = []
     lines.append(f"# 链上项目监控 - 48小时报告")
@@ -121,7 +118,7 @@ def generate_48h_report(projects):
         lines.append(f"## 🤖 AI 挖矿项目 ({len(ai_projects)})")
         lines.append("")
         for i, p in enumerate(ai_projects, 1):
-            lines.append(format_project_block(p, i, _sc))
+            lines.append(render_markdown(p, i, _sc))
             lines.append("---")
             lines.append("")
 
@@ -130,7 +127,7 @@ def generate_48h_report(projects):
         lines.append(f"## 📊 其他项目 ({len(normal)})")
         lines.append("")
         for i, p in enumerate(normal, len(ai_projects) + 1):
-            lines.append(format_project_block(p, i, _sc))
+            lines.append(render_markdown(p, i, _sc))
             lines.append("---")
             lines.append("")
 
@@ -139,7 +136,7 @@ def generate_48h_report(projects):
         lines.append(f"## ⚠️ 疑似假市值 ({len(fake_mc)})")
         lines.append("")
         for i, p in enumerate(fake_mc, len(ai_projects) + len(normal) + 1):
-            lines.append(format_project_block(p, i, _sc))
+            lines.append(render_markdown(p, i, _sc))
             lines.append("---")
             lines.append("")
 
@@ -158,17 +155,13 @@ def archive_expired(projects):
         return
 
     # 加载已有归档数据库
-    db = load_archive_db()
+    store = open_archive_db()
+    db = store.load_range()
 
     # 按开盘日期分组
     by_date = {}
     for p in expired:
-        ts = p.get('open_timestamp', 0)
-        if ts:
-            date_str = datetime.fromtimestamp(ts).strftime('%Y-%m-%d')
-        else:
-            date_str = "unknown"
-        by_date.setdefault(date_str, []).append(p)
+        by_date.setdefault(_project_date(p), []).append(p)
 
     new_archived = 0
     for date_str, date_projects in sorted(by_date.items()):
@@ -181,111 +174,244 @@ def archive_expired(projects):
         if not new_projects:
             continue
 
-        # 合并到数据库
+        # 追加到当天分区并合并到内存
+        store.append(date_str, new_projects)
         if date_str not in db:
             db[date_str] = []
         db[date_str].extend(new_projects)
         new_archived += len(new_projects)
 
         # 生成/更新日期归档文件
-        archive_file = os.path.join(ARCHIVE_DIR, f"{date_str}.md")
-        all_day_projects = db[date_str]
-        all_day_projects.sort(key=lambda x: (not x.get('is_ai_mining', False), -x.get('open_timestamp', 0)))
-
-        ai_count = sum(1 for p in all_day_projects if p.get('is_ai_mining'))
-        day_sc = Counter(p['symbol'] for p in all_day_projects)
-        lines = []
-        lines.append(f"# 链上项目归档 - {date_str}")
-        lines.append(f"")
-        lines.append(f"项目总数: {len(all_day_projects)} | AI挖矿: {ai_count}")
-        lines.append(f"")
-
-        for i, p in enumerate(all_day_projects, 1):
-            lines.append(format_project_block(p, i, day_sc))
-            lines.append("---")
-            lines.append("")
+        write_day_file(date_str, db[date_str])
+        print(f"📁 归档 {date_str}: {len(db[date_str])} 个项目 (新增 {len(new_projects)})")
 
-        with open(archive_file, 'w') as f:
-            f.write("\n".join(lines))
-        print(f"📁 归档 {date_str}: {len(all_day_projects)} 个项目 (新增 {len(new_projects)})")
+    update_index(db, store)
+    print(f"✅ 归档完成，新增 {new_archived} 个项目")
+
+
+def _day_sort(projects):
+    projects.sort(key=lambda x: (not x.get('is_ai_mining', False), -x.get('open_timestamp', 0)))
+
+
+def write_day_file(date_str, all_day_projects):
+    """写 archive/YYYY-MM-DD.md（原地排序 all_day_projects）"""
+    archive_file = os.path.join(ARCHIVE_DIR, f"{date_str}.md")
+    _day_sort(all_day_projects)
+
+    ai_count = sum(1 for p in all_day_projects if p.get('is_ai_mining'))
+    day_sc = Counter(p['symbol'] for p in all_day_projects)
+    lines = []
+    lines.append(f"# 链上项目归档 - {date_str}")
+    lines.append(f"")
+    lines.append(f"项目总数: {len(all_day_projects)} | AI挖矿: {ai_count}")
+    lines.append(f"")
+
+    for i, p in enumerate(all_day_projects, 1):
+        lines.append(render_markdown(p, i, day_sc))
+        lines.append("---")
+        lines.append("")
+
+    with open(archive_file, 'w') as f:
+        f.write("\n".join(lines))
 
-    save_archive_db(db)
-    update_index(db)
+
+def _project_date(p):
+    ts = p.get('open_timestamp', 0)
+    return datetime.fromtimestamp(ts).strftime('%Y-%m-%d') if ts else "unknown"
+
+
+def archive_expired_stream(path):
+    """
+    流式归档：边解析边把 48h 内项目留给报告、过期项目按日期写入临时分片，
+    然后逐日去重、追加、渲染。内存只保留 48h 项目和一天的分区。
+    返回 48h 内项目列表（供 generate_48h_report 使用）。
+    """
+    active = []
+    with tempfile.TemporaryDirectory(prefix="report_archive_") as spool_dir:
+        spool = {}      # date -> 打开的暂存文件
+        spooled = set()
+        for p in iter_projects(path):
+            if p.get('age_hours', 999) <= 48:
+                active.append(p)
+            if not p.get('age_hours', 0) > 48:
+                continue
+            date_str = _project_date(p)
+            f = spool.get(date_str)
+            if f is None:
+                if len(spool) >= SPOOL_MAX_OPEN:
+                    for g in spool.values():
+                        g.close()
+                    spool.clear()
+                f = spool[date_str] = open(os.path.join(spool_dir, date_str), 'a')
+                spooled.add(date_str)
+            f.write(json.dumps(p, ensure_ascii=False) + "\n")
+        for f in spool.values():
+            f.close()
+
+        if not spooled:
+            print("📭 没有过期项目需要归档")
+            return active
+
+        store = open_archive_db()
+        changed = set()
+        new_archived = 0
+        for date_str in sorted(spooled):
+            with open(os.path.join(spool_dir, date_str)) as f:
+                date_projects = [json.loads(line) for line in f]
+            existing = store.load(date_str)
+            existing_addrs = {p['address'] for p in existing}
+            new_projects = [p for p in date_projects if p['address'] not in existing_addrs]
+            if not new_projects:
+                continue
+            store.append(date_str, new_projects)
+            existing.extend(new_projects)
+            new_archived += len(new_projects)
+            changed.add(date_str)
+            write_day_file(date_str, existing)
+            print(f"📁 归档 {date_str}: {len(existing)} 个项目 (新增 {len(new_projects)})")
+            # 一次性批处理不会重复渲染同一项目，按日释放片段缓存
+            renderer.cache_clear()
+
+    update_index_stream(store, changed)
     print(f"✅ 归档完成，新增 {new_archived} 个项目")
+    return active
 
 
-def update_index(db):
-    """更新索引文件"""
-    from collections import Counter
+def _md_linked(store):
+    """索引中日期是否链接日期文件：冷存储中的日期没有 markdown（除非用 --render 重新生成过）"""
+    return lambda date_str: not store.is_cold(date_str) or \
+        os.path.exists(os.path.join(ARCHIVE_DIR, f"{date_str}.md"))
+
+
+def update_index(db, store=None):
+    """更新索引文件；给出 store 时冷存储日期标 🧊"""
     # 全局同名检测
     _all_symbols = Counter()
     for projects in db.values():
         for p in projects:
             _all_symbols[p['symbol']] += 1
+    _write_index(sorted(db.keys(), reverse=True), db.__getitem__, _all_symbols,
+                 _md_linked(store) if store is not None else None)
 
-    lines = []
-    lines.append("# 链上项目归档索引")
-    lines.append("")
-    lines.append(f"更新时间: {datetime.now().strftime('%Y-%m-%d %H:%M')}")
-    lines.append("")
 
-    total = 0
-    total_ai = 0
+def update_index_stream(store, changed=()):
+    """
+    按日期逐个读取分区更新索引，输出与 update_index(store.load_range()) 一致。
+    changed 中的日期在本次归档中被重新排序过，读取后按同样规则排序。
+    """
+    _all_symbols = Counter()
+    for date_str in store.dates():
+        _all_symbols.update(store.rollup(date_str).get('symbols', {}))
 
-    lines.append("| 日期 | 项目数 | AI挖矿 | 项目列表 |")
-    lines.append("|------|--------|---------|----------|")
+    def load(date_str):
+        projects = store.load(date_str)
+        if date_str in changed:
+            _day_sort(projects)
+        return projects
+    _write_index(sorted(store.dates(), reverse=True), load, _all_symbols, _md_linked(store))
 
-    for date_str in sorted(db.keys(), reverse=True):
-        projects = db[date_str]
-        ai_count = sum(1 for p in projects if p.get('is_ai_mining'))
-        total += len(projects)
-        total_ai += ai_count
 
-        # 项目简要列表（同名加合约前缀）
-        names = []
-        for p in projects:
-            tag = "🤖" if p.get('is_ai_mining') else ""
-            sym = p['symbol']
-            if _all_symbols.get(sym, 1) > 1:
-                sym = f"{sym}({p['address'][:6]})"
-            names.append(f"{tag}{sym}")
-        names_str = ", ".join(names[:8])
-        if len(names) > 8:
-            names_str += f" +{len(names)-8}"
-
-        lines.append(f"| [{date_str}]({date_str}.md) | {len(projects)} | {ai_count} | {names_str} |")
-
-    lines.append("")
-    lines.append(f"**总计: {total} 个项目 | AI挖矿: {total_ai}**")
-    lines.append("")
-
-    # 完整合约地址索引
-    lines.append("## 合约地址索引")
-    lines.append("")
-    lines.append("| 日期 | 项目 | 合约地址 | AI |")
-    lines.append("|------|------|----------|-----|")
-
-    for date_str in sorted(db.keys(), reverse=True):
-        for p in db[date_str]:
-            ai = "🤖" if p.get('is_ai_mining') else ""
-            sym = p['symbol']
-            if _all_symbols.get(sym, 1) > 1:
-                sym = f"{sym} ({p['address'][:6]})"
-            lines.append(f"| {date_str} | {sym} | `{p['address']}` | {ai} |")
-
-    lines.append("")
-
-    with open(INDEX_FILE, 'w') as f:
-        f.write("\n".join(lines))
+class _LineWriter:
+    """lines.append 直接写文件，写出结果与 "\\n".join(lines + [""]) 相同"""
+
+    def __init__(self, f):
+        self.f = f
+
+    def append(self, line):
+        self.f.write(line + "\n")
+
+
+def _write_index(dates, load, _all_symbols, linked=None):
+    """
+    dates 为倒序日期，load(date) 返回当天项目；逐行写入，每次只持有一天的项目。
+    linked(date) 为 False 的日期（冷存储，日期文件已删除）不加链接，标 🧊
+    """
+    tmp_file = INDEX_FILE + '.tmp'
+    with open(tmp_file, 'w') as f:
+        lines = _LineWriter(f)
+        lines.append("# 链上项目归档索引")
+        lines.append("")
+        lines.append(f"更新时间: {datetime.now().strftime('%Y-%m-%d %H:%M')}")
+        lines.append("")
+
+        total = 0
+        total_ai = 0
+        has_cold = False
+
+        lines.append("| 日期 | 项目数 | AI挖矿 | 项目列表 |")
+        lines.append("|------|--------|---------|----------|")
+
+        for date_str in dates:
+            projects = load(date_str)
+            ai_count = sum(1 for p in projects if p.get('is_ai_mining'))
+            total += len(projects)
+            total_ai += ai_count
+
+            # 项目简要列表（同名加合约前缀）
+            names = []
+            for p in projects:
+                tag = "🤖" if p.get('is_ai_mining') else ""
+                sym = p['symbol']
+                if _all_symbols.get(sym, 1) > 1:
+                    sym = f"{sym}({p['address'][:6]})"
+                names.append(f"{tag}{sym}")
+            names_str = ", ".join(names[:8])
+            if len(names) > 8:
+                names_str += f" +{len(names)-8}"
+
+            if linked is None or linked(date_str):
+                day = f"[{date_str}]({date_str}.md)"
+            else:
+                day = f"{date_str} 🧊"
+                has_cold = True
+            lines.append(f"| {day} | {len(projects)} | {ai_count} | {names_str} |")
+
+        lines.append("")
+        lines.append(f"**总计: {total} 个项目 | AI挖矿: {total_ai}**")
+        lines.append("")
+        if has_cold:
+            lines.append("🧊 已转入冷存储，日期文件需要时用 `python3 scripts/archive_store.py --render YYYY-MM-DD` 重新生成")
+            lines.append("")
+
+        # 完整合约地址索引
+        lines.append("## 合约地址索引")
+        lines.append("")
+        lines.append("| 日期 | 项目 | 合约地址 | AI |")
+        lines.append("|------|------|----------|-----|")
+
+        for date_str in dates:
+            for p in load(date_str):
+                ai = "🤖" if p.get('is_ai_mining') else ""
+                sym = p['symbol']
+                if _all_symbols.get(sym, 1) > 1:
+                    sym = f"{sym} ({p['address'][:6]})"
+                lines.append(f"| {date_str} | {sym} | `{p['address']}` | {ai} |")
+
+    os.replace(tmp_file, INDEX_FILE)
     print(f"📋 索引已更新: {INDEX_FILE}")
 
 
 def main():
+    parser = argparse.ArgumentParser(description="生成48小时报告并归档过期项目")
+    parser.add_argument('--stream', action='store_true', help="流式解析输入，适合多日 / 多链的大文件")
+    parser.add_argument('--input', default=ENRICHED_FILE, help="enriched 项目 JSON 数组文件")
+    args = parser.parse_args()
+
     print("=" * 50)
     print("链上项目监控 - 报告生成与归档")
     print("=" * 50)
 
-    projects = load_projects()
+    if args.stream:
+        if not os.path.exists(args.input):
+            print("❌ 没有项目数据，请先运行回测或等待监控收集数据")
+            return
+        # 先归档再出报告：48h 项目在解析过程中收集
+        active = archive_expired_stream(args.input)
+        generate_48h_report(active)
+        print("\n✅ 全部完成")
+        return
+
+    projects = load_projects(args.input)
     if not projects:
         print("❌ 没有项目数据，请先运行回测或等待监控收集数据")
         return
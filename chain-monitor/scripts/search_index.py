@@ -0,0 +1,262 @@
+#!/usr/bin/env python3
+"""
+链上项目监控 - 项目搜索索引
+
+SQLite 倒排索引（archive/search.db），覆盖已归档和在监控中的项目：
+  - symbol      代币符号（精确 / 前缀）
+  - address     合约地址前缀
+  - keyword     AI 挖矿关键词
+  - domain      官网域名（去掉 www.）
+  - twitter     推特账号
+所有条件可以组合，并按开盘日期（YYYY-MM-DD）过滤。
+监控通知新项目、归档过期项目时增量写入；--rebuild 从归档分区 + 当前 state 全量重建。
+
+用法：
+  python3 search_index.py --symbol PEPE
+  python3 search_index.py --symbol PE --prefix --start 2026-01-01 --end 2026-01-31
+  python3 search_index.py --address 0xab12 --ai
+  python3 search_index.py --domain example.com
+  python3 search_index.py --rebuild
+"""
+
+import argparse
+import json
+import os
+import sqlite3
+from datetime import datetime, timedelta
+from urllib.parse import urlsplit
+
+from archive_store import ARCHIVE_DIR, DB_DIR, ArchiveStore
+from notified_store import dump_all
+from state_snapshot import STATE_FILE
+
+SEARCH_DB_FILE = os.path.join(ARCHIVE_DIR, "search.db")
+DEFAULT_LIMIT = 50
+ADDRESS_DRIVER_MIN_LEN = 3   # 地址前缀（含 0x）达到此长度时按地址驱动查询
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS projects (
+    address TEXT PRIMARY KEY,
+    date TEXT NOT NULL,
+    symbol TEXT NOT NULL,
+    is_ai INTEGER NOT NULL,
+    archived INTEGER NOT NULL,
+    open_timestamp INTEGER NOT NULL,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS projects_ots ON projects (open_timestamp);
+CREATE TABLE IF NOT EXISTS terms (
+    field TEXT NOT NULL,
+    term TEXT NOT NULL,
+    open_timestamp INTEGER NOT NULL,
+    address TEXT NOT NULL,
+    PRIMARY KEY (field, term, open_timestamp, address)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS terms_address ON terms (address, field, term);
+"""
+
+
+def project_date(p):
+    """项目所属日期（与归档分区一致：开盘时间的本地日期）"""
+    ts = p.get('open_timestamp', 0)
+    return datetime.fromtimestamp(ts).strftime('%Y-%m-%d') if ts else "unknown"
+
+
+def _domain(website):
+    if not website:
+        return ''
+    host = urlsplit(website if '//' in website else '//' + website).hostname or ''
+    return host[4:] if host.startswith('www.') else host
+
+
+def _twitter(handle):
+    handle = (handle or '').strip().rstrip('/')
+    if '/' in handle:
+        handle = handle.split('/')[-1]
+    return handle.split('?')[0].lstrip('@').lower()
+
+
+def _terms(p):
+    """项目 -> [(field, term)]"""
+    terms = [('symbol', (p.get('symbol') or '').lower())]
+    for kw in p.get('ai_keywords') or []:
+        terms.append(('keyword', kw.lower()))
+    domain = _domain(p.get('website'))
+    if domain:
+        terms.append(('domain', domain))
+    handle = _twitter(p.get('twitter'))
+    if handle:
+        terms.append(('twitter', handle))
+    return terms
+
+
+def _date_bounds(start, end):
+    """开盘日期范围 [start, end]（本地日期，含两端）-> open_timestamp 区间 [lo, hi)"""
+    lo = int(datetime.strptime(start, '%Y-%m-%d').timestamp()) if start else -1
+    hi = int((datetime.strptime(end, '%Y-%m-%d') + timedelta(days=1)).timestamp()) if end else 1 << 62
+    return lo, hi
+
+
+def _prefix_end(prefix):
+    """前缀区间上界：prefix <= term < prefix_end"""
+    return prefix + '\U0010ffff'
+
+
+class SearchIndex:
+    def __init__(self, path=SEARCH_DB_FILE, durable=True):
+        self.path = path
+        self._db = sqlite3.connect(path)
+        if not durable:
+            # 临时库（回放回测输出）：提交不等待落盘
+            self._db.execute("PRAGMA synchronous = OFF")
+        self._db.executescript(SCHEMA)
+
+    def add(self, projects, archived=False):
+        """
+        写入 / 更新项目。已归档的项目不会被在监控中的版本覆盖为未归档。
+        返回写入条数。
+        """
+        n = 0
+        for p in projects:
+            addr = (p.get('address') or '').lower()
+            if not addr:
+                continue
+            row = self._db.execute("SELECT archived FROM projects WHERE address = ?", (addr,)).fetchone()
+            is_archived = int(archived or bool(row and row[0]))
+            self._db.execute("DELETE FROM terms WHERE address = ?", (addr,))
+            self._db.execute(
+                "INSERT OR REPLACE INTO projects VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (addr, project_date(p), (p.get('symbol') or '').lower(), int(bool(p.get('is_ai_mining'))),
+                 is_archived, int(p.get('open_timestamp', 0) or 0),
+                 json.dumps(p, ensure_ascii=False, separators=(',', ':'))))
+            ots = int(p.get('open_timestamp', 0) or 0)
+            self._db.executemany("INSERT OR IGNORE INTO terms VALUES (?, ?, ?, ?)",
+                                 [(field, term, ots, addr) for field, term in _terms(p) if term])
+            n += 1
+        self._db.commit()
+        return n
+
+    def search(self, symbol=None, prefix=False, address=None, keyword=None, domain=None, twitter=None,
+               start=None, end=None, ai=None, archived=None, limit=DEFAULT_LIMIT):
+        """
+        组合查询，条件之间为 AND。prefix=True 时 symbol 按前缀匹配；address 总是按前缀匹配。
+        start / end 为开盘日期范围（含两端）。结果按开盘时间倒序。
+        """
+        conds = []
+        if symbol:
+            conds.append(('symbol', symbol.lower(), prefix))
+        if keyword:
+            conds.append(('keyword', keyword.lower(), False))
+        if domain:
+            conds.append(('domain', _domain(domain), False))
+        if twitter:
+            conds.append(('twitter', _twitter(twitter), False))
+        # 精确条件优先作为驱动：按 (field, term, open_timestamp) 索引倒序扫描，凑够 limit 即停
+        conds.sort(key=lambda c: c[2])
+
+        lo, hi = _date_bounds(start, end)
+        where, args = [], []
+        if address and len(address) >= ADDRESS_DRIVER_MIN_LEN:
+            # 足够长的地址前缀选择性最高：走主键区间，结果少，直接排序
+            sql = "SELECT p.date, p.archived, p.data FROM projects p"
+            where.append("+p.open_timestamp >= ? AND +p.open_timestamp < ?")
+            args.extend([lo, hi])
+            order = "+p.open_timestamp DESC"
+        elif conds and not conds[0][2]:
+            field, term, _ = conds.pop(0)
+            sql = "SELECT p.date, p.archived, p.data FROM terms t JOIN projects p ON p.address = t.address"
+            where.append("t.field = ? AND t.term = ? AND t.open_timestamp >= ? AND t.open_timestamp < ?")
+            args.extend([field, term, lo, hi])
+            order = "t.open_timestamp DESC"
+        else:
+            sql = "SELECT p.date, p.archived, p.data FROM projects p"
+            where.append("p.open_timestamp >= ? AND p.open_timestamp < ?")
+            args.extend([lo, hi])
+            order = "p.open_timestamp DESC"
+
+        for field, term, is_prefix in conds:
+            if is_prefix:
+                where.append("EXISTS (SELECT 1 FROM terms x WHERE x.address = p.address AND x.field = ? "
+                             "AND x.term >= ? AND x.term < ?)")
+                args.extend([field, term, _prefix_end(term)])
+            else:
+                where.append("EXISTS (SELECT 1 FROM terms x WHERE x.address = p.address AND x.field = ? AND x.term = ?)")
+                args.extend([field, term])
+        if address:
+            address = address.lower()
+            where.append("p.address >= ? AND p.address < ?")
+            args.extend([address, _prefix_end(address)])
+        if ai is not None:
+            where.append("p.is_ai = ?")
+            args.append(int(bool(ai)))
+        if archived is not None:
+            where.append("p.archived = ?")
+            args.append(int(bool(archived)))
+
+        sql += " WHERE " + " AND ".join(where) + f" ORDER BY {order} LIMIT ?"
+        args.append(int(limit))
+        return [dict(json.loads(data), date=date, archived=bool(arch))
+                for date, arch, data in self._db.execute(sql, args)]
+
+    def count(self):
+        return self._db.execute("SELECT COUNT(*) FROM projects").fetchone()[0]
+
+    def rebuild(self, store):
+        """清空并从归档分区全量重建，返回写入条数"""
+        self._db.execute("DELETE FROM terms")
+        self._db.execute("DELETE FROM projects")
+        self._db.commit()
+        n = 0
+        for date_str in store.dates():
+            n += self.add(store.load(date_str), archived=True)
+        return n
+
+    def close(self):
+        self._db.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="搜索已归档 / 监控中的项目")
+    parser.add_argument('--symbol', help="代币符号")
+    parser.add_argument('--prefix', action='store_true', help="符号按前缀匹配")
+    parser.add_argument('--address', help="合约地址前缀")
+    parser.add_argument('--keyword', help="AI 挖矿关键词")
+    parser.add_argument('--domain', help="官网域名")
+    parser.add_argument('--twitter', help="推特账号")
+    parser.add_argument('--start', help="开盘日期起 YYYY-MM-DD")
+    parser.add_argument('--end', help="开盘日期止 YYYY-MM-DD")
+    parser.add_argument('--ai', action='store_true', help="只看 AI 挖矿项目")
+    parser.add_argument('--limit', type=int, default=DEFAULT_LIMIT)
+    parser.add_argument('--json', action='store_true', help="输出 JSON")
+    parser.add_argument('--rebuild', action='store_true', help="从归档分区全量重建索引")
+    args = parser.parse_args()
+
+    index = SearchIndex()
+    if args.rebuild:
+        n = index.rebuild(ArchiveStore(DB_DIR))
+        try:
+            with open(STATE_FILE) as f:
+                state = json.load(f)
+            live = dump_all(hot=state.get('notified_full', {}))
+            index.add(live.values())
+        except (OSError, ValueError):
+            live = {}
+        print(f"✅ 索引已重建: 归档 {n} 个 + 监控中 {len(live)} 个，共 {index.count()} 个项目")
+        return
+
+    results = index.search(symbol=args.symbol, prefix=args.prefix, address=args.address,
+                           keyword=args.keyword, domain=args.domain, twitter=args.twitter,
+                           start=args.start, end=args.end, ai=True if args.ai else None, limit=args.limit)
+    if args.json:
+        print(json.dumps(results, ensure_ascii=False, indent=2))
+        return
+    for p in results:
+        tag = "🤖" if p.get('is_ai_mining') else "📊"
+        state = "归档" if p['archived'] else "监控中"
+        extra = " ".join(x for x in (p.get('website'), f"@{p['twitter']}" if p.get('twitter') else '') if x)
+        print(f"{p['date']} {tag} {p.get('symbol', '?'):<12} {p['address']} [{state}] {extra}")
+    print(f"共 {len(results)} 条")
+
+
+if __name__ == '__main__':
+    main()
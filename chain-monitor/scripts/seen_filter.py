@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+链上项目监控 - 长期"见过"地址集合
+
+notified_tokens 只保留72小时，过期后同一地址会被当成新项目重新通知。
+这里用可扩容 Bloom filter 记录所有通知过的地址：
+  - 误判率可配置（SEEN_FP_RATE），只会误判"见过"，不会漏判
+  - 每层按容量和误判率计算位数与哈希数，写满后追加一层（误判率减半），总误判率有上界
+  - 百万级地址约占 2-3MB，查询 O(k)
+  - 原子写入 SEEN_FILE，重启后继续使用
+"""
+
+import hashlib
+import math
+import os
+import struct
+
+SEEN_FILE = "/tmp/gmgn_seen.bloom"
+SEEN_CAPACITY = 1_000_000   # 首层容量
+SEEN_FP_RATE = 0.0001       # 目标误判率
+
+FILE_MAGIC = b'SEEN'
+FILE_VERSION = 1
+FILE_HEADER = struct.Struct('<4sHHd')    # magic, version, n_layers, fp_rate
+LAYER_HEADER = struct.Struct('<QQHQ')    # capacity, count, k, n_bits
+
+
+def _hashes(address):
+    """地址 -> 两个 64 位哈希（双重哈希法派生 k 个位置）"""
+    d = hashlib.blake2b(address.lower().encode(), digest_size=16).digest()
+    return struct.unpack('<QQ', d)
+
+
+class _Layer:
+    def __init__(self, capacity, fp_rate, count=0, k=None, n_bits=None, bits=None):
+        self.capacity = capacity
+        self.count = count
+        if n_bits is None:
+            n_bits = max(64, int(math.ceil(-capacity * math.log(fp_rate) / (math.log(2) ** 2))))
+            k = max(1, int(round(n_bits / capacity * math.log(2))))
+        self.k = k
+        self.n_bits = n_bits
+        self.bits = bits if bits is not None else bytearray((n_bits + 7) // 8)
+
+    def _positions(self, h1, h2):
+        n = self.n_bits
+        return ((h1 + i * h2) % n for i in range(self.k))
+
+    def contains(self, h1, h2):
+        bits = self.bits
+        return all(bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(h1, h2))
+
+    def add(self, h1, h2):
+        bits = self.bits
+        for pos in self._positions(h1, h2):
+            bits[pos >> 3] |= 1 << (pos & 7)
+        self.count += 1
+
+
+class SeenFilter:
+    """可扩容 Bloom filter：address in seen / seen.add(address)"""
+
+    def __init__(self, capacity=SEEN_CAPACITY, fp_rate=SEEN_FP_RATE):
+        self.capacity = capacity
+        self.fp_rate = fp_rate
+        self.layers = []
+        self.dirty = False
+
+    def _layer_fp(self, i):
+        # 各层误判率按 1/2, 1/4, ... 分配，总误判率不超过 fp_rate
+        return self.fp_rate / (2 ** (i + 1))
+
+    def __contains__(self, address):
+        h1, h2 = _hashes(address)
+        return any(layer.contains(h1, h2) for layer in self.layers)
+
+    def __len__(self):
+        return sum(layer.count for layer in self.layers)
+
+    def add(self, address):
+        """加入地址，返回之前是否（可能）已存在"""
+        h1, h2 = _hashes(address)
+        if any(layer.contains(h1, h2) for layer in self.layers):
+            return True
+        if not self.layers or self.layers[-1].count >= self.layers[-1].capacity:
+            i = len(self.layers)
+            self.layers.append(_Layer(self.capacity * (2 ** i), self._layer_fp(i)))
+        self.layers[-1].add(h1, h2)
+        self.dirty = True
+        return False
+
+    def update(self, addresses):
+        added = 0
+        for addr in addresses:
+            if not self.add(addr):
+                added += 1
+        return added
+
+    def save(self, path=SEEN_FILE):
+        tmp_file = path + '.tmp'
+        with open(tmp_file, 'wb') as f:
+            f.write(FILE_HEADER.pack(FILE_MAGIC, FILE_VERSION, len(self.layers), self.fp_rate))
+            for layer in self.layers:
+                f.write(LAYER_HEADER.pack(layer.capacity, layer.count, layer.k, layer.n_bits))
+                f.write(layer.bits)
+        os.rename(tmp_file, path)
+        self.dirty = False
+
+    @classmethod
+    def load(cls, path=SEEN_FILE, capacity=SEEN_CAPACITY, fp_rate=SEEN_FP_RATE):
+        """读取持久化的过滤器；文件不存在或损坏时返回空过滤器"""
+        seen = cls(capacity, fp_rate)
+        try:
+            with open(path, 'rb') as f:
+                magic, version, n_layers, saved_fp = FILE_HEADER.unpack(f.read(FILE_HEADER.size))
+                if magic != FILE_MAGIC or version != FILE_VERSION:
+                    return seen
+                layers = []
+                for _ in range(n_layers):
+                    cap, count, k, n_bits = LAYER_HEADER.unpack(f.read(LAYER_HEADER.size))
+                    bits = bytearray(f.read((n_bits + 7) // 8))
+                    if len(bits) != (n_bits + 7) // 8:
+                        return seen
+                    layers.append(_Layer(cap, saved_fp, count, k, n_bits, bits))
+        except (OSError, struct.error):
+            return seen
+        seen.layers = layers
+        return seen
@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+"""
+链上项目监控 - 只读状态快照
+
+监控每轮扫描后发布一个带版本号的二进制快照，看板 / API 进程 mmap 读取，
+版本不变时直接复用已解析的数据，不再每个请求 json.load 整个 state 文件。
+
+文件格式（SNAPSHOT_FILE，先写临时文件再 rename，读者永远看不到半写状态）：
+  header   <4sHHQIIIII  magic, fmt, reserved, version, created, last_scan, n_rows, meta_off, meta_len
+  rows     n_rows × <20sIBffhII  地址, open_timestamp, flags, liquidity, market_cap, trust_score, blob_off, blob_len
+           按 open_timestamp 倒序
+  blobs    每个项目一段紧凑 JSON（utf-8）
+  meta     state 中除 notified_full / notified_tokens / archived 外的字段（JSON）
+"""
+
+import json
+import mmap
+import os
+import struct
+import time
+from collections import namedtuple
+
+from notified_store import dump_all
+
+SNAPSHOT_FILE = "/tmp/gmgn_monitor_state.snap"
+STATE_FILE = "/tmp/gmgn_monitor_state.json"
+
+SNAP_MAGIC = b'GMSS'
+SNAP_FORMAT = 1
+HEADER = struct.Struct('<4sHHQIIIII')
+ROW = struct.Struct('<20sIBffhII')
+
+# rows.flags 位
+F_AI = 1
+F_WEBSITE = 2
+F_TWITTER = 4
+F_HONEYPOT = 8
+F_RENOUNCED = 16
+F_TRUST_RANK = 32
+F_SUSPECT_HP = 64
+
+Row = namedtuple('Row', 'address open_timestamp flags liquidity market_cap trust_score')
+
+
+def _flags(p):
+    f = 0
+    if p.get('is_ai_mining'):
+        f |= F_AI
+    if p.get('website'):
+        f |= F_WEBSITE
+    if p.get('twitter'):
+        f |= F_TWITTER
+    if p.get('is_honeypot') == 1:
+        f |= F_HONEYPOT
+    if p.get('renounced') == 1:
+        f |= F_RENOUNCED
+    if p.get('trust_rank'):
+        f |= F_TRUST_RANK
+    if p.get('suspect_honeypot'):
+        f |= F_SUSPECT_HP
+    return f
+
+
+def _addr_bytes(address):
+    try:
+        raw = bytes.fromhex((address or '')[2:])
+    except ValueError:
+        raw = b''
+    return raw if len(raw) == 20 else (address or '').encode()[:20].ljust(20, b'\0')
+
+
+def _read_version(path):
+    try:
+        with open(path, 'rb') as f:
+            head = f.read(HEADER.size)
+        magic, _, _, version = HEADER.unpack(head)[:4]
+        return version if magic == SNAP_MAGIC else 0
+    except (OSError, struct.error):
+        return 0
+
+
+def publish(state, path=SNAPSHOT_FILE):
+    """根据 state 发布新快照，返回新版本号"""
+    # 边遍历边编码，notified_full 为分层存储时不会把冷项目整条留在内存
+    encoded = []
+    for p in state.get('notified_full', {}).values():
+        if not p:
+            continue
+        try:
+            trust = max(-32768, min(32767, int(p.get('trust_score', 0) or 0)))
+        except (ValueError, TypeError):
+            trust = 0
+        ots = max(0, int(p.get('open_timestamp', 0) or 0)) & 0xFFFFFFFF
+        encoded.append((ots, _addr_bytes(p.get('address')), _flags(p),
+                        float(p.get('liquidity', 0) or 0), float(p.get('market_cap', 0) or 0), trust,
+                        json.dumps(p, ensure_ascii=False, separators=(',', ':')).encode()))
+    encoded.sort(key=lambda e: -e[0])
+
+    rows, blobs, off = [], [], 0
+    for ots, addr, flags, liq, mc, trust, blob in encoded:
+        rows.append(ROW.pack(addr, ots, flags, liq, mc, trust, off, len(blob)))
+        blobs.append(blob)
+        off += len(blob)
+
+    meta = {k: v for k, v in state.items() if k not in ('notified_full', 'notified_tokens', 'archived')}
+    meta['notified_count'] = len(state.get('notified_tokens', {}))
+    meta_bytes = json.dumps(meta, ensure_ascii=False).encode()
+    blobs_start = HEADER.size + ROW.size * len(rows)
+    meta_off = blobs_start + off
+
+    version = _read_version(path) + 1
+    tmp_file = path + '.tmp'
+    with open(tmp_file, 'wb') as f:
+        f.write(HEADER.pack(SNAP_MAGIC, SNAP_FORMAT, 0, version, int(time.time()),
+                            int(state.get('last_scan', 0) or 0), len(rows), meta_off, len(meta_bytes)))
+        f.writelines(rows)
+        f.writelines(blobs)
+        f.write(meta_bytes)
+    os.rename(tmp_file, path)
+    return version
+
+
+class Snapshot:
+    """一个已 mmap 的快照版本（不可变）"""
+
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        (magic, fmt, _, self.version, self.created, self.last_scan,
+         self.n_rows, self._meta_off, self._meta_len) = HEADER.unpack_from(self._mm, 0)
+        if magic != SNAP_MAGIC or fmt != SNAP_FORMAT:
+            self._mm.close()
+            raise ValueError(f"bad snapshot file: {path}")
+        self._blobs_start = HEADER.size + ROW.size * self.n_rows
+        self._meta = None
+        self._projects = None
+
+    def __len__(self):
+        return self.n_rows
+
+    @property
+    def meta(self):
+        if self._meta is None:
+            self._meta = json.loads(self._mm[self._meta_off:self._meta_off + self._meta_len])
+        return self._meta
+
+    def _raw_row(self, i):
+        return ROW.unpack_from(self._mm, HEADER.size + ROW.size * i)
+
+    def row(self, i):
+        """第 i 行的定长字段（不解析 JSON）"""
+        addr, ots, flags, liq, mc, trust, _, _ = self._raw_row(i)
+        return Row('0x' + addr.hex(), ots, flags, liq, mc, trust)
+
+    def rows(self):
+        for i in range(self.n_rows):
+            yield self.row(i)
+
+    def project(self, i):
+        """解析第 i 个项目的完整数据"""
+        off, length = self._raw_row(i)[6:]
+        start = self._blobs_start + off
+        return json.loads(self._mm[start:start + length])
+
+    def projects(self):
+        """全部项目（按 open_timestamp 倒序），同一版本只解析一次；调用方不要修改返回的 dict"""
+        if self._projects is None:
+            self._projects = [self.project(i) for i in range(self.n_rows)]
+        return self._projects
+
+
+class SnapshotReader:
+    """按版本缓存的快照读取器：每次 get() 只做一次 stat，文件变化时才重新 mmap"""
+
+    def __init__(self, path=SNAPSHOT_FILE):
+        self.path = path
+        self._key = None
+        self._snap = None
+
+    def get(self):
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        key = (st.st_ino, st.st_mtime_ns, st.st_size)
+        if key != self._key:
+            try:
+                self._snap = Snapshot(self.path)
+                self._key = key
+            except (OSError, ValueError, struct.error):
+                return self._snap
+        return self._snap
+
+
+def load_projects(reader):
+    """读取快照中的项目列表；快照不存在时回退到 state 文件"""
+    snap = reader.get()
+    if snap is not None:
+        return snap.projects(), snap.meta
+    try:
+        with open(STATE_FILE) as f:
+            state = json.load(f)
+    except (OSError, ValueError):
+        return [], {}
+    # state 文件只有常驻内存的部分，合并冷存储才是完整列表
+    full = dump_all(hot=state.get('notified_full', {}))
+    projects = sorted(full.values(), key=lambda p: -(p.get('open_timestamp', 0) or 0))
+    return projects, state
@@ -0,0 +1,707 @@
+#!/usr/bin/env python3
+"""
+链上项目监控 - 代币指标时序存储
+
+每轮扫描记录 merged 项目的 price / market_cap / liquidity / holders / buys / sells，
+按日期分区、只追加写入，供告警、回测、图表按时间范围查询。
+
+存储格式（history/YYYY-MM-DD/*.bin，块文件写入后不可变）：
+  header     <4sHHIIIIHH  magic, version, ts_width, n_tokens, n_points, min_ts, max_ts, n_cols, bucket
+  directory  n_tokens × <20sIII  地址(20字节), 起始行, 点数, 首个时间戳
+  ts         n_points 个时间差（相对同一代币上一个点，首点为0），u16 或 u32
+  columns    n_cols 列 float32，每列 n_points 个，按代币连续存放
+
+保留分层（每个日期分区一个层级，记录在 MANIFEST.json）：
+  raw  原始观测，保留 RAW_RETENTION_HOURS
+  m5   5分钟 OHLC，保留 M5_RETENTION_DAYS；原始采样间隔不小于 5 分钟时不聚合，保留原始块
+  h1   1小时 OHLC，永久保留
+rollup 块每个指标存 open/high/low/close 四列（n_cols = 24）。
+压缩按地址流式读写（write_block_stream），内存只与单个代币的数据量有关。
+
+内存占用由写缓冲上限 MAX_BUFFER_POINTS 决定，超过即落盘成块。
+"""
+
+import fcntl
+import json
+import os
+import struct
+import sys
+import threading
+import time
+from array import array
+from collections import OrderedDict
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+HISTORY_DIR = os.path.join(os.path.dirname(SCRIPT_DIR), "history")
+
+COLUMNS = ('price', 'market_cap', 'liquidity', 'holders', 'buys', 'sells')
+OHLC = ('open', 'high', 'low', 'close')
+MAX_BUFFER_POINTS = 200_000     # 写缓冲上限（约 6MB），超过即落盘
+DIR_CACHE_SIZE = 512            # 块目录 LRU 缓存数量
+
+# 保留分层
+RAW_RETENTION_HOURS = 48        # 原始数据保留48小时
+M5_RETENTION_DAYS = 14          # 5分钟 OHLC 保留14天，之后降为1小时
+TIERS = {'raw': 0, 'm5': 300, 'h1': 3600}   # 层级 -> 聚合粒度（秒）
+COMPACT_INTERVAL = 600          # 后台压缩间隔
+COMPACT_STEPS = 4               # 每次压缩最多处理的分区数
+GC_GRACE = 300                  # 被替换的块延迟删除，保证进行中的查询能读完
+
+MANIFEST = "MANIFEST.json"
+BLOCK_MAGIC = b'TSB1'
+BLOCK_VERSION = 2
+HEADER = struct.Struct('<4sHHIIIIHH')
+DIR_ENTRY = struct.Struct('<20sIII')
+
+
+def log(msg):
+    ts = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    print(f'[{ts}] {msg}', flush=True)
+
+
+def date_of(ts):
+    """时间戳所在分区日期（与归档一致，使用本地时间）"""
+    return datetime.fromtimestamp(ts).strftime('%Y-%m-%d')
+
+
+def _day_end(date_str):
+    return int((datetime.strptime(date_str, '%Y-%m-%d') + timedelta(days=1)).timestamp())
+
+
+def _addr_bytes(address):
+    try:
+        raw = bytes.fromhex(address[2:] if address.startswith('0x') else address)
+    except (ValueError, AttributeError):
+        return None
+    return raw if len(raw) == 20 else None
+
+
+def _addr_hex(raw):
+    return '0x' + raw.hex()
+
+
+def _new_series(n_cols=len(COLUMNS)):
+    return {'ts': array('I'), 'cols': [array('f') for _ in range(n_cols)]}
+
+
+# ============================================================
+# 块文件
+# ============================================================
+def write_block(path, series, n_cols=len(COLUMNS), bucket=0):
+    """将 {address: {'ts': array, 'cols': [array...]}} 写成一个块文件（原子写入）"""
+    entries = []
+    ts_deltas = array('I')
+    cols = [array('f') for _ in range(n_cols)]
+    min_ts, max_ts = 0xFFFFFFFF, 0
+    for address in sorted(series):
+        raw = _addr_bytes(address)
+        s = series[address]
+        n = len(s['ts'])
+        if raw is None or n == 0:
+            continue
+        # 按时间排序（同一代币的点通常已有序）
+        order = sorted(range(n), key=s['ts'].__getitem__)
+        ts_sorted = [s['ts'][i] for i in order]
+        entries.append((raw, len(ts_deltas), n, ts_sorted[0]))
+        prev = ts_sorted[0]
+        for t in ts_sorted:
+            ts_deltas.append(t - prev)
+            prev = t
+        for c, col in zip(cols, s['cols']):
+            c.extend(col[i] for i in order)
+        min_ts = min(min_ts, ts_sorted[0])
+        max_ts = max(max_ts, ts_sorted[-1])
+    if not entries:
+        return False
+
+    # 时间差都小于 65536 秒时用 u16 存储
+    ts_width = 2 if max(ts_deltas) < 0x10000 else 4
+    ts_col = array('H', ts_deltas) if ts_width == 2 else ts_deltas
+    if sys.byteorder != 'little':
+        ts_col.byteswap()
+        for c in cols:
+            c.byteswap()
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_file = path + '.tmp'
+    with open(tmp_file, 'wb') as f:
+        f.write(HEADER.pack(BLOCK_MAGIC, BLOCK_VERSION, ts_width, len(entries),
+                            len(ts_deltas), min_ts, max_ts, n_cols, bucket))
+        for raw, start, n, base_ts in entries:
+            f.write(DIR_ENTRY.pack(raw, start, n, base_ts))
+        ts_col.tofile(f)
+        for c in cols:
+            c.tofile(f)
+    os.rename(tmp_file, path)
+    return True
+
+
+def _copy_column(src, dst, typecode, out_typecode=None, chunk=1 << 16):
+    """把暂存文件中的本机字节序数组分块写到 dst（小端），可转换类型"""
+    src.seek(0)
+    while True:
+        a = array(typecode)
+        try:
+            a.fromfile(src, chunk)
+        except EOFError:
+            pass  # 最后一块不足 chunk，已读到的部分仍在 a 中
+        if not a:
+            return
+        if out_typecode:
+            a = array(out_typecode, a)
+        if sys.byteorder != 'little':
+            a.byteswap()
+        a.tofile(dst)
+
+
+def write_block_stream(path, items, n_cols=len(COLUMNS), bucket=0):
+    """
+    流式写块：items 按地址顺序逐个产出 (address, series)，同时只持有一个代币的数据。
+    时间差和各列先追加到暂存文件，最后拼接在目录之后，格式与 write_block 相同（原子写入）
+    """
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_file = path + '.tmp'
+    spill_paths = [f"{tmp_file}.{i}" for i in range(n_cols + 1)]
+    spills = [open(sp, 'wb+') for sp in spill_paths]
+    try:
+        entries = []
+        n_points, max_delta = 0, 0
+        min_ts, max_ts = 0xFFFFFFFF, 0
+        for address, s in items:
+            raw = _addr_bytes(address)
+            n = len(s['ts'])
+            if raw is None or n == 0:
+                continue
+            order = sorted(range(n), key=s['ts'].__getitem__)
+            ts_sorted = [s['ts'][i] for i in order]
+            deltas = array('I', [0])
+            deltas.extend(b - a for a, b in zip(ts_sorted, ts_sorted[1:]))
+            entries.append((raw, n_points, n, ts_sorted[0]))
+            n_points += n
+            max_delta = max(max_delta, max(deltas))
+            min_ts = min(min_ts, ts_sorted[0])
+            max_ts = max(max_ts, ts_sorted[-1])
+            deltas.tofile(spills[0])
+            for sp, col in zip(spills[1:], s['cols']):
+                array('f', (col[i] for i in order)).tofile(sp)
+        if not entries:
+            return False
+
+        ts_width = 2 if max_delta < 0x10000 else 4
+        with open(tmp_file, 'wb') as f:
+            f.write(HEADER.pack(BLOCK_MAGIC, BLOCK_VERSION, ts_width, len(entries),
+                                n_points, min_ts, max_ts, n_cols, bucket))
+            for raw, start, n, base_ts in entries:
+                f.write(DIR_ENTRY.pack(raw, start, n, base_ts))
+            _copy_column(spills[0], f, 'I', 'H' if ts_width == 2 else None)
+            for sp in spills[1:]:
+                _copy_column(sp, f, 'f')
+        os.rename(tmp_file, path)
+        return True
+    finally:
+        for sp, sp_path in zip(spills, spill_paths):
+            sp.close()
+            os.remove(sp_path)
+
+
+class Block:
+    """只读块文件，目录常驻内存，数据按需读取"""
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as f:
+            head = f.read(HEADER.size)
+            if len(head) < HEADER.size:
+                raise ValueError(f"bad block file: {path}")
+            magic, version, ts_width, n_tokens, n_points, min_ts, max_ts, n_cols, bucket = HEADER.unpack(head)
+            if magic != BLOCK_MAGIC or version != BLOCK_VERSION:
+                raise ValueError(f"bad block file: {path}")
+            dir_bytes = f.read(DIR_ENTRY.size * n_tokens)
+        self.ts_width = ts_width
+        self.n_points = n_points
+        self.min_ts = min_ts
+        self.max_ts = max_ts
+        self.n_cols = n_cols
+        self.bucket = bucket
+        self.directory = {}
+        for raw, start, n, base_ts in DIR_ENTRY.iter_unpack(dir_bytes):
+            self.directory[_addr_hex(raw)] = (start, n, base_ts)
+        self._data_offset = HEADER.size + DIR_ENTRY.size * n_tokens
+        self._col_offset = self._data_offset + ts_width * n_points
+
+    def addresses(self):
+        return self.directory.keys()
+
+    def ts_spans(self):
+        """各代币的 (首个时间戳, 最后时间戳, 点数)，只读时间差列"""
+        deltas = array('H' if self.ts_width == 2 else 'I')
+        with open(self.path, 'rb') as f:
+            f.seek(self._data_offset)
+            deltas.frombytes(f.read(self.n_points * self.ts_width))
+        if sys.byteorder != 'little':
+            deltas.byteswap()
+        return {addr: (base_ts, base_ts + sum(deltas[start + 1:start + n]), n)
+                for addr, (start, n, base_ts) in self.directory.items()}
+
+    def read(self, address, f=None):
+        """读取单个代币的完整序列，返回 {'ts': array('I'), 'cols': [array('f')...]}"""
+        entry = self.directory.get(address)
+        if not entry:
+            return None
+        start, n, base_ts = entry
+        own = f is None
+        if own:
+            f = open(self.path, 'rb')
+        try:
+            f.seek(self._data_offset + start * self.ts_width)
+            deltas = array('H' if self.ts_width == 2 else 'I')
+            deltas.frombytes(f.read(n * self.ts_width))
+            cols = []
+            for ci in range(self.n_cols):
+                f.seek(self._col_offset + (ci * self.n_points + start) * 4)
+                c = array('f')
+                c.frombytes(f.read(n * 4))
+                cols.append(c)
+        finally:
+            if own:
+                f.close()
+        if sys.byteorder != 'little':
+            deltas.byteswap()
+            for c in cols:
+                c.byteswap()
+        ts = array('I')
+        acc = base_ts
+        for d in deltas:
+            acc += d
+            ts.append(acc)
+        return {'ts': ts, 'cols': cols}
+
+    def read_ohlc(self, address, f=None):
+        """读取序列并统一为 OHLC 列（raw 块每个值视为 o=h=l=c）"""
+        s = self.read(address, f)
+        if s is None or self.bucket:
+            return s
+        s['cols'] = [s['cols'][ci] for ci in range(len(COLUMNS)) for _ in OHLC]
+        return s
+
+
+# ============================================================
+# 分区清单（MANIFEST.json）
+# ============================================================
+@contextmanager
+def _locked(day_dir):
+    """分区级文件锁，写入落盘和后台压缩互斥（跨进程）"""
+    os.makedirs(day_dir, exist_ok=True)
+    with open(os.path.join(day_dir, '.lock'), 'w') as lf:
+        fcntl.flock(lf, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lf, fcntl.LOCK_UN)
+
+
+def load_manifest(day_dir):
+    """读取分区清单；旧分区没有清单时按目录中的块文件推断"""
+    try:
+        with open(os.path.join(day_dir, MANIFEST)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        pass
+    blocks = sorted(n for n in os.listdir(day_dir) if n.endswith('.bin')) if os.path.isdir(day_dir) else []
+    return {'tier': 'raw', 'blocks': blocks, 'garbage': []}
+
+
+def save_manifest(day_dir, manifest):
+    tmp_file = os.path.join(day_dir, MANIFEST + '.tmp')
+    with open(tmp_file, 'w') as f:
+        json.dump(manifest, f)
+    os.rename(tmp_file, os.path.join(day_dir, MANIFEST))
+
+
+# ============================================================
+# 压缩与降采样
+# ============================================================
+def _iter_by_address(blocks, read):
+    """按地址顺序逐个产出 (address, [各块中的序列])，同时只持有一个代币的数据"""
+    files = [open(b.path, 'rb') for b in blocks]
+    try:
+        for addr in sorted(set().union(*(b.addresses() for b in blocks))):
+            yield addr, [read(b, addr, f) for b, f in zip(blocks, files) if addr in b.directory]
+    finally:
+        for f in files:
+            f.close()
+
+
+def _rollup(blocks, bucket):
+    """把一组块按 bucket 秒聚合为 OHLC，按地址逐个产出 (address, series(24列))"""
+    n_cols = len(COLUMNS) * len(OHLC)
+    for addr, parts in _iter_by_address(blocks, Block.read_ohlc):
+        buckets = {}   # bucket_ts -> [first_ts, last_ts, [o,h,l,c]*6]
+        for s in parts:
+            for i, t in enumerate(s['ts']):
+                key = t - t % bucket
+                row = [c[i] for c in s['cols']]
+                cur = buckets.get(key)
+                if cur is None:
+                    buckets[key] = [t, t, row]
+                    continue
+                first, last, vals = cur
+                for ci in range(0, n_cols, 4):
+                    if t < first:
+                        vals[ci] = row[ci]
+                    vals[ci + 1] = max(vals[ci + 1], row[ci + 1])
+                    vals[ci + 2] = min(vals[ci + 2], row[ci + 2])
+                    if t >= last:
+                        vals[ci + 3] = row[ci + 3]
+                cur[0], cur[1] = min(first, t), max(last, t)
+        s = _new_series(n_cols)
+        for key in sorted(buckets):
+            s['ts'].append(key)
+            for c, v in zip(s['cols'], buckets[key][2]):
+                c.append(v)
+        yield addr, s
+
+
+def _merge_raw(blocks):
+    """合并同一分区的多个 raw 块，按地址逐个产出 (address, series)"""
+    for addr, parts in _iter_by_address(blocks, Block.read):
+        dst = _new_series()
+        for s in parts:
+            dst['ts'].extend(s['ts'])
+            for c, col in zip(dst['cols'], s['cols']):
+                c.extend(col)
+        yield addr, dst
+
+
+def _sample_spacing(blocks):
+    """raw 块中同一代币相邻观测的平均间隔（秒），每个代币只有一个点时为 None"""
+    spans = {}   # address -> [首个时间戳, 最后时间戳, 点数]
+    for b in blocks:
+        for addr, (first, last, n) in b.ts_spans().items():
+            cur = spans.get(addr)
+            if cur is None:
+                spans[addr] = [first, last, n]
+            else:
+                cur[0], cur[1], cur[2] = min(cur[0], first), max(cur[1], last), cur[2] + n
+    gaps = sum(n - 1 for _, _, n in spans.values())
+    return sum(last - first for first, last, _ in spans.values()) / gaps if gaps else None
+
+
+def _target_tier(date_str, now):
+    """分区应处于的层级"""
+    end = _day_end(date_str)
+    if now - end >= M5_RETENTION_DAYS * 86400:
+        return 'h1'
+    if now - end >= RAW_RETENTION_HOURS * 3600:
+        return 'm5'
+    return 'raw'
+
+
+def compact_day(day_dir, now=None):
+    """
+    压缩单个分区，返回是否做了工作：
+      - 过期分区降采样（raw -> m5 -> h1）
+      - 已结束但仍为 raw 的分区，把多个小块合并为一个
+      - 删除超过 GC_GRACE 的被替换块
+    新块先落盘并原子替换清单，旧块延迟删除，进行中的查询不受影响。
+    """
+    now = int(now or time.time())
+    date_str = os.path.basename(day_dir)
+    with _locked(day_dir):
+        m = load_manifest(day_dir)
+        did = False
+
+        # 回收已过宽限期的旧块
+        keep = []
+        for name, ts in m.get('garbage', []):
+            if now - ts >= GC_GRACE:
+                try:
+                    os.remove(os.path.join(day_dir, name))
+                except FileNotFoundError:
+                    pass
+                did = True
+            else:
+                keep.append([name, ts])
+        m['garbage'] = keep
+
+        target = _target_tier(date_str, now)
+        cur = m.get('tier', 'raw')
+        blocks = []
+        for name in m['blocks']:
+            try:
+                blocks.append(Block(os.path.join(day_dir, name)))
+            except (OSError, ValueError):
+                pass
+
+        new_name, items, n_cols, bucket = None, None, len(COLUMNS), 0
+        roll = TIERS[target] > TIERS[cur] and bool(blocks)
+        if roll and target == 'm5':
+            # 原始采样间隔不小于 5 分钟（如默认 600 秒扫描）时 m5 不比原始数据粗，
+            # 降采样只会复制一份，直接标记层级、保留原始块，到 h1 时再聚合
+            spacing = _sample_spacing(blocks)
+            roll = spacing is not None and spacing < TIERS['m5']
+        if roll:
+            bucket = TIERS[target]
+            n_cols = len(COLUMNS) * len(OHLC)
+            items = _rollup(blocks, bucket)
+            new_name = f"{target}-{now}.bin"
+        elif cur == 'raw' and len(blocks) > 1 and now >= _day_end(date_str):
+            items = _merge_raw(blocks)
+            new_name = f"raw-merged-{now}.bin"
+
+        if new_name:
+            if write_block_stream(os.path.join(day_dir, new_name), items, n_cols, bucket):
+                m['blocks'] = [new_name]
+            else:
+                m['blocks'] = []
+            m['garbage'] += [[b_name, now] for b_name in (os.path.basename(b.path) for b in blocks)]
+            did = True
+        if TIERS[target] > TIERS[cur]:
+            m['tier'] = target
+            did = True
+
+        if did:
+            save_manifest(day_dir, m)
+        return did
+
+
+def compact(root=HISTORY_DIR, now=None, max_steps=COMPACT_STEPS):
+    """增量压缩：每次最多处理 max_steps 个分区（从最旧开始）"""
+    if not os.path.isdir(root):
+        return 0
+    steps = 0
+    for date_str in sorted(os.listdir(root)):
+        if steps >= max_steps:
+            break
+        day_dir = os.path.join(root, date_str)
+        if not os.path.isdir(day_dir):
+            continue
+        try:
+            if compact_day(day_dir, now):
+                steps += 1
+        except Exception as e:
+            log(f"[时序] 压缩 {date_str} 失败: {e}")
+    return steps
+
+
+_compactor = None
+
+
+def start_compactor(root=HISTORY_DIR, interval=COMPACT_INTERVAL):
+    """启动后台压缩线程（daemon，进程内只启动一个）"""
+    global _compactor
+    if _compactor is not None and _compactor.is_alive():
+        return _compactor
+
+    def _loop():
+        while True:
+            try:
+                n = compact(root)
+                if n:
+                    log(f"[时序] 压缩了 {n} 个分区")
+            except Exception as e:
+                log(f"[时序] 压缩 Error: {e}")
+            time.sleep(interval)
+    _compactor = threading.Thread(target=_loop, name='history-compactor', daemon=True)
+    _compactor.start()
+    return _compactor
+
+
+# ============================================================
+# 读写接口
+# ============================================================
+class TokenHistory:
+    """按日分区的代币指标时序存储"""
+
+    def __init__(self, root=HISTORY_DIR, max_buffer_points=MAX_BUFFER_POINTS):
+        self.root = root
+        self.max_buffer_points = max_buffer_points
+        self._buffer = {}           # date_str -> {address: series}
+        self._buffered = 0
+        self._seq = 0
+        self._blocks = OrderedDict()  # path -> Block（LRU）
+
+    # ---------- 写入 ----------
+    def append(self, address, ts, values):
+        """追加一个观测点，values 按 COLUMNS 顺序或为 dict"""
+        if isinstance(values, dict):
+            values = [values.get(k) for k in COLUMNS]
+        row = []
+        for v in values:
+            try:
+                row.append(float(v or 0))
+            except (ValueError, TypeError):
+                row.append(0.0)
+        ts = int(ts)
+        day = self._buffer.setdefault(date_of(ts), {})
+        s = day.get(address)
+        if s is None:
+            s = day[address] = _new_series()
+        s['ts'].append(ts)
+        for c, v in zip(s['cols'], row):
+            c.append(v)
+        self._buffered += 1
+        if self._buffered >= self.max_buffer_points:
+            self.flush()
+
+    def record(self, tokens, ts=None):
+        """记录一轮扫描的 merged 项目"""
+        ts = int(ts or time.time())
+        for t in tokens:
+            addr = t.get('address')
+            if addr:
+                self.append(addr, ts, t)
+        return len(tokens)
+
+    def flush(self):
+        """写缓冲落盘，每个日期分区生成一个新块并登记到清单"""
+        written = 0
+        for date_str, series in self._buffer.items():
+            self._seq += 1
+            day_dir = os.path.join(self.root, date_str)
+            name = f"raw-{int(time.time() * 1000)}-{os.getpid()}-{self._seq}.bin"
+            with _locked(day_dir):
+                if write_block(os.path.join(day_dir, name), series):
+                    m = load_manifest(day_dir)
+                    if name not in m['blocks']:
+                        m['blocks'].append(name)
+                    save_manifest(day_dir, m)
+                    written += 1
+        self._buffer = {}
+        self._buffered = 0
+        return written
+
+    # ---------- 查询 ----------
+    def _dates_between(self, start, end):
+        if not os.path.isdir(self.root):
+            return []
+        lo, hi = date_of(start), date_of(end)
+        return sorted(d for d in os.listdir(self.root) if lo <= d <= hi)
+
+    def _block(self, path):
+        b = self._blocks.get(path)
+        if b is None:
+            b = Block(path)
+            self._blocks[path] = b
+            if len(self._blocks) > DIR_CACHE_SIZE:
+                self._blocks.popitem(last=False)
+        else:
+            self._blocks.move_to_end(path)
+        return b
+
+    def _blocks_between(self, start, end):
+        for date_str in self._dates_between(start, end):
+            day_dir = os.path.join(self.root, date_str)
+            # 清单是原子替换的，读到的块列表总是一致的一代
+            for name in load_manifest(day_dir)['blocks']:
+                try:
+                    b = self._block(os.path.join(day_dir, name))
+                except (OSError, ValueError):
+                    continue
+                if b.max_ts >= start and b.min_ts <= end:
+                    yield b
+
+    @staticmethod
+    def _merge_into(out, s, start, end):
+        for i, t in enumerate(s['ts']):
+            if start <= t <= end:
+                out['ts'].append(t)
+                for c, col in zip(out['cols'], s['cols']):
+                    c.append(col[i])
+
+    @staticmethod
+    def _to_result(s, ohlc=False):
+        """按时间排序并转为 {'ts': [...], 'price': [...], ...}；ohlc 时额外给出 price_open/high/low"""
+        order = sorted(range(len(s['ts'])), key=s['ts'].__getitem__)
+        result = {'ts': array('I', (s['ts'][i] for i in order))}
+        for ci, name in enumerate(COLUMNS):
+            if not ohlc:
+                result[name] = array('f', (s['cols'][ci][i] for i in order))
+                continue
+            for oi, part in enumerate(OHLC):
+                col = s['cols'][ci * len(OHLC) + oi]
+                key = name if part == 'close' else f"{name}_{part}"
+                result[key] = array('f', (col[i] for i in order))
+        return result
+
+    def _read(self, block, address, ohlc, f=None):
+        if ohlc:
+            return block.read_ohlc(address, f)
+        s = block.read(address, f)
+        if s is not None and block.bucket:
+            # rollup 块只取 close 列
+            s['cols'] = [s['cols'][ci * len(OHLC) + 3] for ci in range(len(COLUMNS))]
+        return s
+
+    def _buffer_series(self, s, ohlc):
+        if not ohlc:
+            return s
+        return {'ts': s['ts'], 'cols': [c for c in s['cols'] for _ in OHLC]}
+
+    def query(self, address, start, end=None, ohlc=False):
+        """查询单个代币 [start, end] 区间的序列（跨层级时粒度随分区变化）"""
+        end = int(end or time.time())
+        n_cols = len(COLUMNS) * (len(OHLC) if ohlc else 1)
+        out = _new_series(n_cols)
+        for b in self._blocks_between(start, end):
+            s = self._read(b, address, ohlc)
+            if s:
+                self._merge_into(out, s, start, end)
+        for day in self._buffer.values():
+            s = day.get(address)
+            if s:
+                self._merge_into(out, self._buffer_series(s, ohlc), start, end)
+        return self._to_result(out, ohlc)
+
+    def query_range(self, start, end=None, addresses=None, ohlc=False):
+        """查询 [start, end] 区间内多个（默认全部）代币的序列，返回 {address: result}"""
+        end = int(end or time.time())
+        n_cols = len(COLUMNS) * (len(OHLC) if ohlc else 1)
+        wanted = set(addresses) if addresses is not None else None
+        merged = {}
+        for b in self._blocks_between(start, end):
+            keys = b.addresses() if wanted is None else wanted.intersection(b.addresses())
+            try:
+                f = open(b.path, 'rb')
+            except OSError:
+                continue
+            with f:
+                for addr in keys:
+                    s = self._read(b, addr, ohlc, f)
+                    if s:
+                        self._merge_into(merged.setdefault(addr, _new_series(n_cols)), s, start, end)
+        for day in self._buffer.values():
+            for addr, s in day.items():
+                if wanted is None or addr in wanted:
+                    self._merge_into(merged.setdefault(addr, _new_series(n_cols)),
+                                     self._buffer_series(s, ohlc), start, end)
+        return {addr: self._to_result(s, ohlc) for addr, s in merged.items() if len(s['ts'])}
+
+
+def main():
+    import argparse
+    parser = argparse.ArgumentParser(description="查询/压缩代币指标历史")
+    parser.add_argument('address', nargs='?', help="合约地址")
+    parser.add_argument('--hours', type=float, default=24, help="查询最近N小时（默认24）")
+    parser.add_argument('--compact', action='store_true', help="执行一次完整压缩")
+    args = parser.parse_args()
+
+    if args.compact:
+        n = compact(max_steps=10 ** 6)
+        print(f"✅ 压缩完成，处理 {n} 个分区")
+        return
+    if not args.address:
+        parser.error("需要合约地址或 --compact")
+
+    end = int(time.time())
+    r = TokenHistory().query(args.address.lower(), end - int(args.hours * 3600), end)
+    print(f"{args.address}: {len(r['ts'])} 个数据点")
+    for i, t in enumerate(r['ts']):
+        row = " | ".join(f"{k}={r[k][i]:.6g}" for k in COLUMNS)
+        print(f"  {datetime.fromtimestamp(t).strftime('%m-%d %H:%M')} {row}")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,13 +1,21 @@
 #!/usr/bin/env python3
 """链上项目监控 - Web Dashboard"""
 
+import bisect
 import json
 import os
 import time
+from collections import OrderedDict, defaultdict
 from datetime import datetime
 from flask import Flask, Response, request, jsonify
 
+from state_snapshot import SnapshotReader, load_projects
+from search_index import SearchIndex, SEARCH_DB_FILE
+from archive_store import ArchiveStore
+from renderer import is_fake_mc, render_html_row
+
 app = Flask(__name__)
+snapshot_reader = SnapshotReader()
 
 STATE_FILE = "/tmp/gmgn_monitor_state.json"
 FAV_FILE = "/tmp/gmgn_favorites.json"
@@ -35,18 +43,6 @@ def load_hidden():
 def save_hidden(hidden):
     save_json(HIDE_FILE, hidden)
 
-def fmt_mc(val):
-    if not val: return "$0"
-    if val >= 1_000_000_000: return f"${val/1e9:.2f}B"
-    if val >= 1_000_000: return f"${val/1e6:.2f}M"
-    if val >= 1_000: return f"${val/1e3:.0f}K"
-    return f"${val:.0f}"
-
-def is_fake_mc(p):
-    liq = p.get('liquidity', 0)
-    mc = p.get('market_cap', 0)
-    return liq > 0 and mc / liq > 1000
-
 def classify_projects(projects, hist_addrs):
     import time as _time
     now_ts = _time.time()
@@ -81,154 +77,11 @@ def get_symbol_counts(projects, hist):
             sc[hp.get('symbol', '')] -= 1
     return sc
 
-def display_name(p, sc):
-    sym = p['symbol']
-    cnt = sc.get(sym, 1)
-    if cnt > 1:
-        return f"{sym} ({p['address'][:6]}) <span class='dup'>同名×{cnt}</span>"
-    return sym
-
-def security_tags(p):
-    tags = []
-    if p.get('renounced') == 1: tags.append('<span class="tag-ok">✅弃权</span>')
-    elif p.get('renounced') == 0: tags.append('<span class="tag-warn">❌未弃权</span>')
-    if p.get('is_open_source') == 1 or p.get('is_open_source') is None: tags.append('<span class="tag-ok">✅开源</span>')
-    if p.get('is_honeypot') == 0: tags.append('<span class="tag-ok">✅非貔貅</span>')
-    elif p.get('is_honeypot') == 1: tags.append('<span class="tag-bad">🚫貔貅</span>')
-    if p.get('suspect_honeypot'): tags.append('<span class="tag-bad">⚠️疑似貔貅(买卖比异常)</span>')
-    bt = p.get('buy_tax'); st = p.get('sell_tax')
-    if bt is not None and st is not None:
-        tags.append(f"税:{float(bt):.1f}%/{float(st):.1f}%")
-    return " | ".join(tags)
-
-def render_project_row(p, idx, sc, favs_set, show_kw=False, show_ai_tag=False):
-    name = display_name(p, sc)
-    icon = ""
-    if p.get('liquidity', 0) < 10000:
-        icon = '<span class="icon-warn">🚨</span>'
-    elif p.get('liquidity', 0) < 20000:
-        icon = '<span class="icon-warn">⚠️</span>'
-    elif p.get('website'):
-        icon = '<span class="icon-star">⭐</span>'
-    mc = fmt_mc(p.get('market_cap', 0))
-    liq_val = p.get('liquidity', 0)
-    mc_val = p.get('market_cap', 0)
-    if mc_val >= 1000000:
-        mc = f'<span style="color:#3fb950">{mc}</span>'
-    elif mc_val >= 300000:
-        mc = f'<span style="color:#58a6ff">{mc}</span>'
-    liq = fmt_mc(liq_val)
-    if liq_val < 10000:
-        liq = f'<span class="liq-red">{liq}</span>'
-    elif liq_val < 20000:
-        liq = f'<span class="liq-yellow">{liq}</span>'
-    mc_liq_ratio = f"{mc_val / liq_val:.1f}x" if liq_val > 0 else "N/A"
-    holders = f"{p.get('holders', 0):,}"
-    age_h = p.get('age_hours', 0)
-    ots = p.get('open_timestamp', 0)
-    if ots and ots > 1000000000:
-        import time as _t
-        age_h = (_t.time() - ots) / 3600
-    if age_h <= 0 and (not ots or ots < 1000000000):
-        age = "未知"
-    elif age_h >= 24:
-        age = f"{age_h/24:.0f}d"
-    else:
-        age = f"{age_h:.1f}h"
-    try:
-        chg = float(p.get('price_change_1h', 0) or 0)
-    except: chg = 0
-    chg_cls = "up" if chg > 0 else "down" if chg < 0 else ""
-    chg_str = f"+{chg:.1f}%" if chg > 0 else f"{chg:.1f}%"
-
-    # 可信度评分
-    trust_score = p.get('trust_score', 0) or 0
-    trust_rank = p.get('trust_rank', '')
-    if trust_rank:
-        if '真品' in trust_rank:
-            trust_cls = 'trust-good'
-        elif '待验证' in trust_rank:
-            trust_cls = 'trust-warn'
-        elif '仿盘' in trust_rank:
-            trust_cls = 'trust-bad'
-        else:
-            trust_cls = 'trust-none'
-        trust_html = f'<span style="color:#8b949e;font-size:0.85em">{trust_score}/15</span> <span class="{trust_cls}">{trust_rank}</span>'
-    elif trust_score != 0:
-        # 无同名但有基础分
-        score_color = '#3fb950' if trust_score >= 5 else '#d29922' if trust_score >= 2 else '#f85149'
-        trust_html = f'<span style="color:{score_color};font-size:0.85em">{trust_score}/15</span>'
-    else:
-        trust_html = '<span class="trust-none">-</span>'
-
-    src = p.get('source', '?')
-    sec = security_tags(p)
-    addr = p['address']
-    gmgn = f"https://gmgn.ai/base/token/{addr}"
-    is_fav = addr in favs_set
-    fav_cls = "fav-btn faved" if is_fav else "fav-btn"
-    fav_star = "★" if is_fav else "☆"
-
-    extra = ""
-    if show_kw and p.get('ai_keywords'):
-        extra += f"<div class='kw'>关键词: {', '.join(p['ai_keywords'])}</div>"
-    if p.get('website'):
-        extra += f"<div>🌐 <a href='{p['website']}' target='_blank'>{p['website']}</a></div>"
-    if p.get('twitter'):
-        tw = p['twitter']
-        if not tw.startswith('http'): tw = f"https://x.com/{tw}"
-        extra += f"<div>🐦 <a href='{tw}' target='_blank'>@{p['twitter']}</a></div>"
-
-    warns = []
-    mc_val = p.get('market_cap', 0); liq_val = p.get('liquidity', 0)
-    if liq_val > 0 and mc_val / liq_val > 1000:
-        warns.append(f"MC/Liq比={mc_val/liq_val:.0f}x，疑似假市值")
-    warn_html = "".join(f"<div class='warn'>⚠️ {w}</div>" for w in warns)
-
-    tag_list = []
-    tags = ""
-    if show_ai_tag and p.get('is_ai_mining'):
-        tags += '<span class="ai-tag">🤖AI挖矿</span> '
-        tag_list.append('ai-mining')
-    if p.get('liquidity', 0) < 10000:
-        tags += '<span class="very-low-liq-tag">💧流动性极低</span>'
-        tag_list.append('very-low-liq')
-    elif p.get('liquidity', 0) < 20000:
-        tags += '<span class="low-liq-tag">💧流动性过低</span>'
-        tag_list.append('low-liq')
-    if p.get('website'):
-        tag_list.append('has-website')
-    if p.get('twitter'):
-        tag_list.append('has-twitter')
-    if p.get('renounced') == 1:
-        tag_list.append('renounced')
-    if p.get('is_honeypot') == 1:
-        tag_list.append('honeypot')
-
-    is_ai = 'true' if p.get('is_ai_mining') else 'false'
-    tags_data = ','.join(tag_list)
-    ots_val = p.get('open_timestamp', 0) or 0
-    return f"""<tr data-ai="{is_ai}" data-tags="{tags_data}" data-ots="{ots_val}">
-<td>{idx}</td>
-<td class="icon">{icon}</td>
-<td class="name">{name}{warn_html}</td>
-<td class="addr"><a href="{gmgn}" target="_blank">{addr}</a><button class="copy-btn" onclick="copyAddr(this,'{addr}')">📋</button><button class="{fav_cls}" onclick="toggleFav(this,'{addr}')">{fav_star}</button><button class="hide-btn" onclick="toggleHide('{addr}')">🙈</button></td>
-<td>{mc}</td>
-<td>{liq}</td>
-<td>{mc_liq_ratio}</td>
-<td>{holders}</td>
-<td>{age}</td>
-<td class="{chg_cls}">{chg_str}</td>
-<td>{trust_html}</td>
-<td>{src}</td>
-<td class="sec">{sec}</td>
-<td>{extra}</td>
-<td>{tags}</td>
-</tr>"""
-
 def render_section(title, emoji, projects, sc, favs_set, show_kw=False, show_ai_tag=False, section_type=""):
     if not projects: return ""
-    rows = "".join(render_project_row(p, i+1, sc, favs_set, show_kw, show_ai_tag) for i, p in enumerate(projects))
+    now = time.time()
+    rows = "".join(render_html_row(p, i+1, sc.get(p['symbol'], 1), p['address'] in favs_set, show_kw, show_ai_tag, now)
+                   for i, p in enumerate(projects))
     return f"""
 <div class="section" data-section="{section_type}">
 <h2>{emoji} {title} (<span class="section-count">{len(projects)}</span>)</h2>
@@ -277,95 +130,95 @@ def api_hide():
         return jsonify({'ok': True, 'hidden': True})
 
 
-@app.route('/')
-def index():
-    state = load_json(STATE_FILE) or {}
-    hist = state.get('notified_full', {})
-    projects = list(hist.values())
-    projects.sort(key=lambda p: p.get('open_timestamp', 0), reverse=True)
-
-    # 先从全量数据中取收藏和隐藏项目（不受时间过滤）
-    favs = load_favs()
-    favs_set = set(favs)
-    hidden = load_hidden()
-    hidden_set = set(hidden)
-    fav_projects = [p for p in projects if p['address'] in favs_set]
-    hidden_projects = [p for p in projects if p['address'] in hidden_set]
-
-    # 时间范围过滤（URL参数 hours，默认12）
+@app.route('/api/search')
+def api_search():
+    """?symbol=&prefix=1&address=&keyword=&domain=&twitter=&start=&end=&ai=1&limit="""
+    args = request.args
     try:
-        filter_hours = int(request.args.get('hours', 12))
-    except:
-        filter_hours = 12
-    if filter_hours > 0:
-        import time as _ft
-        cutoff = _ft.time() - filter_hours * 3600
-        projects = [p for p in projects if (p.get('open_timestamp', 0) or 0) >= cutoff]
-
-    sc = get_symbol_counts(projects, {})
-
-    # 主列表排除隐藏项目
-    visible_projects = [p for p in projects if p['address'] not in hidden_set]
-    new_10m, new_1h, ai, normal, fake = classify_projects(visible_projects, set())
-
-    now_str = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-    total = len(projects)
-    summary = f"{total} 个项目"
-    new_total = len(new_10m) + len(new_1h)
-    if new_total: summary += f" | 🆕新: {new_total}"
-    summary += f" | 🤖AI挖矿: {len(ai)} | 📊其他: {len(normal)}"
-    if fake: summary += f" | ⚠️可疑: {len(fake)}"
-    if fav_projects: summary += f" | ⭐收藏: {len(fav_projects)}"
-
-    # 重点项目：有网页或X的项目，按优先级排序
-    def key_priority(p):
-        # 主排序：可信度评分从高到低
-        score = -(p.get('trust_score', 0) or 0)
-        # 次排序：有网站+X > 有网站 > 有X > 无
-        has_web = bool(p.get('website'))
-        has_x = bool(p.get('twitter'))
-        if has_web and has_x: social = 0
-        elif has_web: social = 1
-        elif has_x: social = 2
-        else: social = 3
-        return (score, social)
-    # 重点项目也排除隐藏
-    key_projects = [p for p in visible_projects if p.get('website') or p.get('twitter')]
-    key_projects.sort(key=key_priority)
-
-    # 收集所有标签用于动态筛选栏
-    TAG_DEFS = [
-        ('ai-mining', '🤖 AI挖矿'),
-        ('very-low-liq', '🚨 流动性极低'),
-        ('low-liq', '⚠️ 流动性过低'),
-        ('has-website', '🌐 有网站'),
-        ('has-twitter', '🐦 有X'),
-        ('renounced', '✅ 已弃权'),
-        ('honeypot', '🚫 貔貅'),
-    ]
-    all_tags = set()
-    for p in visible_projects:
-        if p.get('is_ai_mining'): all_tags.add('ai-mining')
-        if p.get('liquidity', 0) < 10000: all_tags.add('very-low-liq')
-        elif p.get('liquidity', 0) < 20000: all_tags.add('low-liq')
-        if p.get('website'): all_tags.add('has-website')
-        if p.get('twitter'): all_tags.add('has-twitter')
-        if p.get('renounced') == 1: all_tags.add('renounced')
-        if p.get('is_honeypot') == 1: all_tags.add('honeypot')
-    filter_checkboxes = ""
-    for tag_id, tag_label in TAG_DEFS:
-        if tag_id in all_tags:
-            checked = 'checked' if tag_id == 'ai-mining' else ''
-            filter_checkboxes += f'<label><input type="checkbox" class="tag-filter" data-tag="{tag_id}" {checked} onchange="applyTagFilter()"> {tag_label}</label>\n'
-
-    # 时间按钮，根据当前 filter_hours 设置 active
-    time_buttons = ""
-    for h, label in [(0,'全部'),(1,'1h'),(3,'3h'),(12,'12h'),(24,'24h'),(48,'48h'),(72,'3d'),(168,'7d')]:
-        active = ' active' if h == filter_hours else ''
-        time_buttons += f'<button class="time-btn{active}" data-hours="{h}" onclick="setTimeFilter(this,{h})">{label}</button>\n'
-
-    # 重点观察：有网站或X的项目，但同名组里低分的踢到项目列表
-    from collections import defaultdict
+        limit = max(1, min(int(args.get('limit', 50)), 500))
+    except ValueError:
+        limit = 50
+    for key in ('start', 'end'):
+        if args.get(key):
+            try:
+                datetime.strptime(args[key], '%Y-%m-%d')
+            except ValueError:
+                return jsonify({'error': f'{key} 需要 YYYY-MM-DD 格式'}), 400
+    if not os.path.exists(SEARCH_DB_FILE):
+        return jsonify({'count': 0, 'results': []})
+    index = SearchIndex()
+    try:
+        results = index.search(symbol=args.get('symbol'), prefix=args.get('prefix') == '1',
+                               address=args.get('address'), keyword=args.get('keyword'),
+                               domain=args.get('domain'), twitter=args.get('twitter'),
+                               start=args.get('start'), end=args.get('end'),
+                               ai=True if args.get('ai') == '1' else None, limit=limit)
+    finally:
+        index.close()
+    return jsonify({'count': len(results), 'results': results})
+
+
+# ============================================================
+# 视图模型缓存
+# ============================================================
+VIEW_MAX_AGE = 60     # 窗口视图最长复用时间（秒），时间窗口边界和新项目分类随之前移
+VIEW_CACHE_SIZE = 16  # 缓存的时间窗口视图数（LRU）
+
+TAG_DEFS = [
+    ('ai-mining', '🤖 AI挖矿'),
+    ('very-low-liq', '🚨 流动性极低'),
+    ('low-liq', '⚠️ 流动性过低'),
+    ('has-website', '🌐 有网站'),
+    ('has-twitter', '🐦 有X'),
+    ('renounced', '✅ 已弃权'),
+    ('honeypot', '🚫 貔貅'),
+]
+
+_base = {'version': None, 'view': None}  # 每个数据版本一份基础视图
+_views = OrderedDict()                    # filter_hours -> 由基础视图按窗口切出的视图（LRU）
+
+
+def _mtime(path):
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return 0
+
+
+def data_version():
+    """(state 版本, 收藏文件 mtime, 隐藏文件 mtime)；任一变化视图模型重算"""
+    snap = snapshot_reader.get()
+    state_version = snap.version if snap is not None else ('state', _mtime(STATE_FILE))
+    return state_version, _mtime(FAV_FILE), _mtime(HIDE_FILE)
+
+
+def key_priority(p):
+    # 主排序：可信度评分从高到低
+    score = -(p.get('trust_score', 0) or 0)
+    # 次排序：有网站+X > 有网站 > 有X > 无
+    has_web = bool(p.get('website'))
+    has_x = bool(p.get('twitter'))
+    if has_web and has_x: social = 0
+    elif has_web: social = 1
+    elif has_x: social = 2
+    else: social = 3
+    return (score, social)
+
+
+def project_tags(p):
+    tags = set()
+    if p.get('is_ai_mining'): tags.add('ai-mining')
+    if p.get('liquidity', 0) < 10000: tags.add('very-low-liq')
+    elif p.get('liquidity', 0) < 20000: tags.add('low-liq')
+    if p.get('website'): tags.add('has-website')
+    if p.get('twitter'): tags.add('has-twitter')
+    if p.get('renounced') == 1: tags.add('renounced')
+    if p.get('is_honeypot') == 1: tags.add('honeypot')
+    return tags
+
+
+def select_key_projects(visible_projects, now):
+    """重点观察：有网站或X的项目，但同名组里低分的踢到项目列表；返回 (重点项目, 降级地址集合)"""
     candidate_key = [p for p in visible_projects if p.get('website') or p.get('twitter')]
 
     # 构建全局 symbol -> 最高分 映射
@@ -404,7 +257,9 @@ def index():
     # 可信度为负数的项目移出重点观察
     for p in visible_projects:
         if p['address'] in key_set:
-            age = p.get('age_hours', 0) or 0
+            # age 按 now 从开盘时间算：冷存储中的项目不再逐轮回写 age_hours
+            ots = p.get('open_timestamp', 0) or 0
+            age = (now - ots) / 3600 if ots else (p.get('age_hours', 0) or 0)
             liq = p.get('liquidity', 0) or 0
             score = p.get('trust_score', 0) or 0
             if (age > 48 and liq < 10000) or score < 0:
@@ -413,14 +268,137 @@ def index():
 
     key_projects = [p for p in visible_projects if p['address'] in key_set]
     key_projects.sort(key=key_priority)
+    return key_projects, key_set, demoted_set
+
+
+def build_base():
+    """一个数据版本的基础视图：项目列表、收藏 / 隐藏、归档合计、每个项目的标签，和时间窗口无关"""
+    # 快照版本不变时复用已解析的项目列表（已按 open_timestamp 倒序）
+    projects, _ = load_projects(snapshot_reader)
+
+    # 收藏和隐藏项目取自全量数据（不受时间过滤）
+    favs_set = set(load_favs())
+    hidden_set = set(load_hidden())
+    archived = ""
+    try:
+        totals = ArchiveStore().summary()
+        if totals['days']:
+            archived = f" | 📁归档: {totals['count']} ({totals['days']}天, AI {totals['ai']})"
+    except Exception:
+        pass
+    return {
+        'projects': projects,
+        # 开盘时间取负后升序，时间窗口用二分切前缀
+        'neg_ots': [-(p.get('open_timestamp', 0) or 0) for p in projects],
+        'tags': {p['address']: project_tags(p) for p in projects},
+        'favs_set': favs_set,
+        'hidden_set': hidden_set,
+        'fav_projects': [p for p in projects if p['address'] in favs_set],
+        'hidden_projects': [p for p in projects if p['address'] in hidden_set],
+        'archived': archived,
+    }
+
+
+def build_view(base, filter_hours, now):
+    """从基础视图切出一个时间窗口：分组、排序、计数、标签都在这里算好，请求只负责渲染"""
+    projects = base['projects']
+    if filter_hours > 0:
+        cutoff = now - filter_hours * 3600
+        projects = projects[:bisect.bisect_right(base['neg_ots'], -cutoff)]
+    hidden_set = base['hidden_set']
+    fav_projects = base['fav_projects']
+
+    sc = get_symbol_counts(projects, {})
+
+    # 主列表排除隐藏项目
+    visible_projects = [p for p in projects if p['address'] not in hidden_set]
+    new_10m, new_1h, ai, normal, fake = classify_projects(visible_projects, set())
+
+    summary = f"{len(projects)} 个项目"
+    new_total = len(new_10m) + len(new_1h)
+    if new_total: summary += f" | 🆕新: {new_total}"
+    summary += f" | 🤖AI挖矿: {len(ai)} | 📊其他: {len(normal)}"
+    if fake: summary += f" | ⚠️可疑: {len(fake)}"
+    if fav_projects: summary += f" | ⭐收藏: {len(fav_projects)}"
+    summary += base['archived']
+
+    # 重点项目也排除隐藏
+    key_projects, key_set, demoted_set = select_key_projects(visible_projects, now)
+
+    # 主列表：排除重点观察里的；默认只显示 AI 挖矿和被降级的
+    all_list = [p for p in visible_projects if p['address'] not in key_set]
+    all_list.sort(key=lambda p: p.get('open_timestamp', 0), reverse=True)
+    ai_list = [p for p in all_list if p.get('is_ai_mining') or p['address'] in demoted_set]
+
+    # 收集所有标签用于动态筛选栏
+    tags = base['tags']
+    all_tags = set()
+    for p in visible_projects:
+        all_tags |= tags[p['address']]
+
+    return {
+        'built': now,
+        'summary': summary,
+        'sc': sc,
+        'favs_set': base['favs_set'],
+        'fav_projects': fav_projects,
+        'hidden_projects': base['hidden_projects'],
+        'key_projects': key_projects,
+        'list_projects': {False: ai_list, True: all_list},
+        'all_tags': all_tags,
+    }
+
+
+def get_view(filter_hours):
+    """
+    取缓存的窗口视图：数据版本变化时重建基础视图并清空窗口视图；
+    窗口视图由基础视图切出，超过 VIEW_MAX_AGE 重切，按 LRU 保留 VIEW_CACHE_SIZE 个
+    """
+    now = time.time()
+    version = data_version()
+    if _base['view'] is None or _base['version'] != version:
+        _base.update(version=version, view=build_base())
+        _views.clear()
+    view = _views.get(filter_hours)
+    if view is None or now - view['built'] > VIEW_MAX_AGE:
+        view = _views[filter_hours] = build_view(_base['view'], filter_hours, now)
+    _views.move_to_end(filter_hours)
+    while len(_views) > VIEW_CACHE_SIZE:
+        _views.popitem(last=False)
+    return view
+
+
+@app.route('/')
+def index():
+    # 时间范围过滤（URL参数 hours，默认12）
+    try:
+        filter_hours = int(request.args.get('hours', 12))
+    except:
+        filter_hours = 12
+    view = get_view(filter_hours)
+    sc = view['sc']
+    favs_set = view['favs_set']
+    fav_projects = view['fav_projects']
+    hidden_projects = view['hidden_projects']
+
+    now_str = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    summary = view['summary']
+
+    filter_checkboxes = ""
+    for tag_id, tag_label in TAG_DEFS:
+        if tag_id in view['all_tags']:
+            checked = 'checked' if tag_id == 'ai-mining' else ''
+            filter_checkboxes += f'<label><input type="checkbox" class="tag-filter" data-tag="{tag_id}" {checked} onchange="applyTagFilter()"> {tag_label}</label>\n'
+
+    # 时间按钮，根据当前 filter_hours 设置 active
+    time_buttons = ""
+    for h, label in [(0,'全部'),(1,'1h'),(3,'3h'),(12,'12h'),(24,'24h'),(48,'48h'),(72,'3d'),(168,'7d')]:
+        active = ' active' if h == filter_hours else ''
+        time_buttons += f'<button class="time-btn{active}" data-hours="{h}" onclick="setTimeFilter(this,{h})">{label}</button>\n'
 
-    # 主列表：排除重点观察里的，但包含被降级的
     show_all_tags = request.args.get('show_all', '0') == '1'
-    if not show_all_tags:
-        list_projects = [p for p in visible_projects if (p.get('is_ai_mining') or p['address'] in demoted_set) and p['address'] not in key_set]
-    else:
-        list_projects = [p for p in visible_projects if p['address'] not in key_set]
-    list_projects.sort(key=lambda p: p.get('open_timestamp', 0), reverse=True)
+    key_projects = view['key_projects']
+    list_projects = view['list_projects'][show_all_tags]
 
     title_suffix = f"{filter_hours}h" if filter_hours > 0 else "全部"
     if not show_all_tags:
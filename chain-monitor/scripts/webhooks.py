@@ -0,0 +1,389 @@
+#!/usr/bin/env python3
+"""
+链上项目监控 - Webhook 事件推送
+
+新项目通知（notify）和告警（alert）除了写发件箱、唤醒 OpenClaw，还可以推送给内部服务
+（交易机器人、聊天转发、审计日志……）。推送在独立线程的 asyncio 事件循环里进行，扫描循环只负责入队：
+  - 端点配置在 WEBHOOK_FILE（JSON 列表），每个端点独立的并发上限、超时、重试次数、订阅的事件
+  - POST JSON {"seq", "kind", "time", "payload"}，带 X-GMGN-Event / X-GMGN-Seq 头；
+    配置了 secret 时带 X-GMGN-Signature: sha256=<HMAC>；接收方按 seq 去重（至少一次）
+  - 失败（连接错误、超时、5xx、408、429）按指数退避重试，其余 4xx 不重试；
+    最终失败的事件追加到死信文件 DEAD_LETTER_FILE（JSONL，含端点、错误、完整事件）
+  - 每个端点统计发送 / 重试 / 死信次数和投递延迟直方图（入队到收到 2xx）
+
+端点配置示例（/tmp/gmgn_webhooks.json），除 url 外都可省略：
+  [{"name": "trading-bot", "url": "http://127.0.0.1:9001/events", "events": ["notify", "alert"],
+    "concurrency": 2, "timeout": 5, "retries": 5, "backoff": 1, "secret": "...", "headers": {}}]
+
+用法：
+  python3 webhooks.py --selftest            # 起本地模拟服务器（正常 / 偶发 500 / 慢 / 不可达）验证推送
+  python3 webhooks.py --dead                # 死信统计
+"""
+
+import argparse
+import asyncio
+import atexit
+import hashlib
+import hmac
+import json
+import os
+import random
+import ssl
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+from urllib.parse import urlsplit
+
+WEBHOOK_FILE = "/tmp/gmgn_webhooks.json"
+DEAD_LETTER_FILE = "/tmp/gmgn_webhook_dead.jsonl"
+DEFAULT_CONCURRENCY = 4
+DEFAULT_TIMEOUT = 10      # 单次请求超时（秒）
+DEFAULT_RETRIES = 5
+BACKOFF_BASE = 1          # 第 n 次重试前等待 BACKOFF_BASE * 2^n 秒（带抖动）
+BACKOFF_MAX = 60
+LATENCY_BUCKETS_MS = (50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000)
+EVENT_KINDS = ('notify', 'alert')
+RETRY_STATUS = (408, 429)
+
+_fanout = None
+
+
+def log(msg):
+    ts = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    print(f'[{ts}] {msg}', flush=True)
+
+
+def normalize(endpoints):
+    """补全端点配置的默认值"""
+    for i, ep in enumerate(endpoints):
+        ep.setdefault('name', f"endpoint-{i + 1}")
+        ep.setdefault('events', list(EVENT_KINDS))
+        ep.setdefault('concurrency', DEFAULT_CONCURRENCY)
+        ep.setdefault('timeout', DEFAULT_TIMEOUT)
+        ep.setdefault('retries', DEFAULT_RETRIES)
+        ep.setdefault('backoff', BACKOFF_BASE)
+        ep.setdefault('headers', {})
+    return endpoints
+
+
+def load_endpoints(path=WEBHOOK_FILE):
+    """读取端点配置，文件不存在返回空列表"""
+    if not os.path.exists(path):
+        return []
+    with open(path) as f:
+        return normalize(json.load(f))
+
+
+async def _post(url, body, headers, timeout):
+    """最小 HTTP/1.1 POST，返回状态码（每次请求一个连接）"""
+    u = urlsplit(url)
+    https = u.scheme == 'https'
+    port = u.port or (443 if https else 80)
+    path = (u.path or '/') + (f"?{u.query}" if u.query else '')
+    reader, writer = await asyncio.wait_for(
+        asyncio.open_connection(u.hostname, port, ssl=ssl.create_default_context() if https else None),
+        timeout)
+    try:
+        head = [f"POST {path} HTTP/1.1", f"Host: {u.hostname}:{port}",
+                "Content-Type: application/json", f"Content-Length: {len(body)}", "Connection: close"]
+        head += [f"{k}: {v}" for k, v in headers.items()]
+        writer.write(("\r\n".join(head) + "\r\n\r\n").encode() + body)
+        await writer.drain()
+        status_line = await asyncio.wait_for(reader.readline(), timeout)
+        return int(status_line.split()[1])
+    finally:
+        writer.close()
+
+
+class _Histogram:
+    def __init__(self):
+        self.counts = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+        self.total = 0.0
+
+    def add(self, ms):
+        i = 0
+        while i < len(LATENCY_BUCKETS_MS) and ms > LATENCY_BUCKETS_MS[i]:
+            i += 1
+        self.counts[i] += 1
+        self.total += ms
+
+    def quantile(self, q):
+        """按桶上界估计分位数（ms）"""
+        n = sum(self.counts)
+        if not n:
+            return None
+        target, acc = q * n, 0
+        for i, c in enumerate(self.counts):
+            acc += c
+            if acc >= target:
+                return LATENCY_BUCKETS_MS[i] if i < len(LATENCY_BUCKETS_MS) else float('inf')
+
+    def to_dict(self):
+        labels = [f"<={b}ms" for b in LATENCY_BUCKETS_MS] + [f">{LATENCY_BUCKETS_MS[-1]}ms"]
+        n = sum(self.counts)
+        return {
+            'buckets': {l: c for l, c in zip(labels, self.counts) if c},
+            'avg_ms': round(self.total / n, 1) if n else None,
+            'p50_ms': self.quantile(0.5),
+            'p95_ms': self.quantile(0.95),
+        }
+
+
+class WebhookFanout:
+    """把事件并发推送给多个端点"""
+
+    def __init__(self, endpoints, dead_letter=DEAD_LETTER_FILE):
+        self.endpoints = endpoints
+        self.dead_letter = dead_letter
+        self._loop = None
+        self._thread = None
+        self._tasks = set()
+        self._sems = {}
+        self._stats = {ep['name']: {'sent': 0, 'retries': 0, 'dead': 0, 'latency': _Histogram()}
+                       for ep in endpoints}
+
+    def start(self):
+        if self._thread is not None and self._thread.is_alive():
+            return self
+        ready = threading.Event()
+
+        def _run():
+            self._loop = asyncio.new_event_loop()
+            asyncio.set_event_loop(self._loop)
+            self._sems = {ep['name']: asyncio.Semaphore(ep['concurrency']) for ep in self.endpoints}
+            ready.set()
+            self._loop.run_forever()
+        self._thread = threading.Thread(target=_run, name='webhook-fanout', daemon=True)
+        self._thread.start()
+        ready.wait()
+        return self
+
+    def publish(self, kind, payload, seq=None):
+        """入队一个事件，立即返回（可从任意线程调用）。
+        在调用方线程序列化：payload 之后被扫描线程修改也不影响已入队的事件"""
+        event = {'seq': seq, 'kind': kind, 'time': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+                 'payload': payload}
+        body = json.dumps(event, ensure_ascii=False, separators=(',', ':')).encode()
+        self._loop.call_soon_threadsafe(self._dispatch, kind, seq, body, time.monotonic())
+
+    def _dispatch(self, kind, seq, body, queued):
+        for ep in self.endpoints:
+            if kind not in ep['events']:
+                continue
+            task = self._loop.create_task(self._deliver(ep, kind, seq, body, queued))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    def _headers(self, ep, kind, seq, body):
+        headers = dict(ep['headers'])
+        headers['X-GMGN-Event'] = kind
+        if seq is not None:
+            headers['X-GMGN-Seq'] = str(seq)
+        if ep.get('secret'):
+            sig = hmac.new(ep['secret'].encode(), body, hashlib.sha256).hexdigest()
+            headers['X-GMGN-Signature'] = f"sha256={sig}"
+        return headers
+
+    async def _deliver(self, ep, kind, seq, body, queued):
+        stats = self._stats[ep['name']]
+        headers = self._headers(ep, kind, seq, body)
+        error = None
+        attempt = 0
+        try:
+            for attempt in range(ep['retries'] + 1):
+                if attempt:
+                    stats['retries'] += 1
+                    delay = min(BACKOFF_MAX, ep['backoff'] * 2 ** (attempt - 1))
+                    await asyncio.sleep(delay * random.uniform(0.5, 1.0))
+                try:
+                    async with self._sems[ep['name']]:
+                        status = await asyncio.wait_for(_post(ep['url'], body, headers, ep['timeout']), ep['timeout'])
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    error = f"{type(e).__name__}: {e}"
+                    continue
+                if 200 <= status < 300:
+                    stats['sent'] += 1
+                    stats['latency'].add((time.monotonic() - queued) * 1000)
+                    return
+                error = f"HTTP {status}"
+                if status < 500 and status not in RETRY_STATUS:
+                    break  # 请求本身有问题，重试也不会成功
+        except asyncio.CancelledError:
+            # 关闭超时被取消：同样写死信，不丢事件
+            stats['dead'] += 1
+            self._dead(ep, seq, body, f"cancelled at shutdown (last error: {error})", attempt + 1)
+            raise
+        stats['dead'] += 1
+        self._dead(ep, seq, body, error, attempt + 1)
+
+    def _dead(self, ep, seq, body, error, attempts):
+        record = {'time': datetime.now().strftime('%Y-%m-%d %H:%M:%S'), 'endpoint': ep['name'],
+                  'url': ep['url'], 'error': error, 'attempts': attempts, 'event': json.loads(body)}
+        try:
+            with open(self.dead_letter, 'a') as f:
+                f.write(json.dumps(record, ensure_ascii=False) + '\n')
+        except OSError as e:
+            log(f"[Webhook] 死信写入失败: {e}")
+        log(f"[Webhook] {ep['name']} 投递失败（{attempts} 次）: {error}，seq={seq} 已写入死信")
+
+    def pending(self):
+        return len(self._tasks)
+
+    async def _drain(self):
+        """等待全部投递任务结束；调度在已入队的 _dispatch 之后，入队的事件都已建好任务"""
+        while self._tasks:
+            await asyncio.gather(*list(self._tasks), return_exceptions=True)
+
+    async def _cancel_all(self):
+        tasks = list(self._tasks)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def close(self, timeout=30):
+        """等待已入队事件投递完（最多 timeout 秒），超时未完成的写死信，然后停止事件循环"""
+        if self._thread is None or not self._thread.is_alive():
+            return
+        try:
+            asyncio.run_coroutine_threadsafe(self._drain(), self._loop).result(timeout)
+        except Exception:
+            asyncio.run_coroutine_threadsafe(self._cancel_all(), self._loop).result(timeout)
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(timeout)
+
+    def stats(self):
+        return {name: dict({k: v for k, v in s.items() if k != 'latency'}, latency=s['latency'].to_dict())
+                for name, s in self._stats.items()}
+
+
+def start_fanout(endpoints, dead_letter=DEAD_LETTER_FILE):
+    """启动推送（进程内只启动一个），退出时等待进行中的投递"""
+    global _fanout
+    if _fanout is None:
+        _fanout = WebhookFanout(endpoints, dead_letter)
+        atexit.register(_fanout.close)
+    return _fanout.start()
+
+
+# ============================================================
+# 本地模拟服务器自测
+# ============================================================
+def _selftest(n_events):
+    import socket
+    import tempfile
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    received = {}
+
+    def server(name, handle):
+        received[name] = Counter()
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers['Content-Length']))
+                seq = json.loads(body)['seq']
+                code = handle(seq)
+                if code == 200:
+                    received[name][seq] += 1
+                self.send_response(code)
+                self.end_headers()
+
+            def log_message(self, *args):
+                pass
+        srv = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        threading.Thread(target=srv.serve_forever, daemon=True).start()
+        return srv, f"http://127.0.0.1:{srv.server_address[1]}/events"
+
+    attempts = Counter()
+
+    def flaky(seq):
+        attempts[seq] += 1
+        return 500 if attempts[seq] <= 2 else 200
+
+    def slow(seq):
+        time.sleep(0.2)
+        return 200
+
+    # 不可达端口：绑定后立即关闭
+    s = socket.socket()
+    s.bind(('127.0.0.1', 0))
+    down_url = f"http://127.0.0.1:{s.getsockname()[1]}/events"
+    s.close()
+
+    servers = [server('ok', lambda seq: 200), server('flaky', flaky), server('slow', slow)]
+    endpoints = normalize([
+        {'name': 'ok', 'url': servers[0][1]},
+        {'name': 'flaky', 'url': servers[1][1], 'backoff': 0.05},
+        {'name': 'slow', 'url': servers[2][1], 'concurrency': 2, 'events': ['alert']},
+        {'name': 'down', 'url': down_url, 'retries': 2, 'backoff': 0.05, 'timeout': 2},
+    ])
+    dead_file = os.path.join(tempfile.mkdtemp(), "dead.jsonl")
+    fan = WebhookFanout(endpoints, dead_file).start()
+    t0 = time.monotonic()
+    for seq in range(1, n_events + 1):
+        fan.publish('alert' if seq % 2 else 'notify', {'n': seq}, seq)
+    enqueue_ms = (time.monotonic() - t0) * 1000
+    fan.close()
+    for srv, _ in servers:
+        srv.shutdown()
+
+    print(f"入队 {n_events} 个事件用时 {enqueue_ms:.1f}ms，全部投递完成用时 {time.monotonic() - t0:.2f}s\n")
+    stats = fan.stats()
+    for name, s in stats.items():
+        got = received.get(name)
+        extra = f"，服务端收到 {len(got)} 个不同 seq" if got is not None else ""
+        print(f"{name:<6} 成功 {s['sent']:>4}  重试 {s['retries']:>4}  死信 {s['dead']:>4}{extra}")
+        print(f"       延迟 {s['latency']}")
+    dead_lines = 0
+    if os.path.exists(dead_file):
+        with open(dead_file) as f:
+            dead_lines = sum(1 for _ in f)
+    print(f"\n死信文件 {dead_file}: {dead_lines} 条")
+
+    # 每个端点：成功 + 死信 = 订阅的事件数；可达端点全部成功且服务端不缺 seq
+    n_alert = (n_events + 1) // 2
+    expect = {'ok': (n_events, 0), 'flaky': (n_events, 0), 'slow': (n_alert, 0), 'down': (0, n_events)}
+    failed = []
+    for name, (sent, dead) in expect.items():
+        s = stats[name]
+        if (s['sent'], s['dead']) != (sent, dead):
+            failed.append(f"{name}: 成功 {s['sent']} 死信 {s['dead']}，预期 {sent} / {dead}")
+        if name in received and len(received[name]) != sent:
+            failed.append(f"{name}: 服务端收到 {len(received[name])} 个 seq，预期 {sent}")
+    if dead_lines != n_events:
+        failed.append(f"死信文件 {dead_lines} 条，预期 {n_events}")
+    if failed:
+        print("\n❌ 自测失败:\n  " + "\n  ".join(failed))
+        return False
+    print("\n✅ 自测通过")
+    return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Webhook 事件推送")
+    parser.add_argument('--selftest', action='store_true', help="用本地模拟服务器验证推送、重试、死信")
+    parser.add_argument('--events', type=int, default=40, help="自测事件数")
+    parser.add_argument('--dead', action='store_true', help="死信统计")
+    args = parser.parse_args()
+
+    if args.selftest:
+        if not _selftest(args.events):
+            raise SystemExit(1)
+    elif args.dead:
+        if not os.path.exists(DEAD_LETTER_FILE):
+            print("没有死信")
+            return
+        with open(DEAD_LETTER_FILE) as f:
+            records = [json.loads(line) for line in f if line.strip()]
+        for (name, error), n in Counter((r['endpoint'], r['error']) for r in records).most_common():
+            print(f"{name:<20} {n:>5}  {error}")
+    else:
+        for ep in load_endpoints():
+            print(f"{ep['name']:<20} {ep['url']}  events={','.join(ep['events'])} concurrency={ep['concurrency']}")
+
+
+if __name__ == '__main__':
+    main()
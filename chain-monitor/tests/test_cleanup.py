@@ -0,0 +1,33 @@
+"""cleanup_low_score_duplicates 回归检查：窗口回放传入的是普通 dict"""
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "scripts"))
+import gmgn_monitor as gm
+
+NOW = 1_800_000_000
+
+
+def _project(addr, symbol, hours, **kw):
+    return dict({'address': addr, 'symbol': symbol, 'open_timestamp': NOW - hours * 3600,
+                 'liquidity': 50000, 'age_hours': 0}, **kw)
+
+
+def test_cleanup_with_plain_dict_state(monkeypatch):
+    monkeypatch.setattr(gm, 'clock', lambda: NOW)
+    projects = [
+        _project('0xreal', 'PEPE', 60, trust_score=9, trust_rank='✅可能真品'),
+        _project('0xfake', 'PEPE', 60, trust_score=1, trust_rank='⚠️仿盘'),
+        _project('0xdead1', 'AAA', 30, liquidity=500),
+        _project('0xdead2', 'BBB', 30, liquidity=500),
+        _project('0xsocial', 'CCC', 30, liquidity=500, twitter='ccc'),
+        _project('0xyoung', 'DDD', 2, liquidity=500),
+    ]
+    state = {
+        'notified_full': {p['address']: p for p in projects},
+        'notified_tokens': {p['address']: NOW for p in projects},
+    }
+    # 存储的 age_hours 过期（0）也按开盘时间判断
+    assert gm.cleanup_low_score_duplicates(state) == 3
+    assert set(state['notified_full']) == {'0xreal', '0xsocial', '0xyoung'}
+    assert set(state['notified_tokens']) == set(state['notified_full'])
@@ -1,15 +1,106 @@
 #!/usr/bin/env python3
 """轻量 HTTP 服务，为链上监控看板提供 API"""
+import gzip
+import hashlib
 import json
 import os
+import sys
 import time
+from collections import OrderedDict
+from email.utils import formatdate, parsedate_to_datetime
 from http.server import HTTPServer, SimpleHTTPRequestHandler
+from urllib.parse import urlsplit, parse_qs
 from datetime import datetime
 
+try:
+    import brotli  # 可选：安装了才协商 br，否则只用 gzip
+except ImportError:
+    brotli = None
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "scripts"))
+from state_snapshot import SnapshotReader, F_AI, F_TRUST_RANK, load_projects
+from archive_store import ArchiveStore
+from project_query import ProjectQuery, QueryError
+
 STATE_FILE = "/tmp/gmgn_monitor_state.json"
-ARCHIVE_DB = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "archive", "archive_db.json")
+ARCHIVE_DB_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "archive", "db")
 WEB_DIR = os.path.dirname(os.path.abspath(__file__))
 PORT = 8234
+BODY_CACHE_SIZE = 256     # 缓存的响应体数（每个 path + 查询参数一份）
+COMPRESS_MIN = 1024       # 小于该字节数的响应不压缩
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+
+snapshot_reader = SnapshotReader()
+project_query = ProjectQuery(snapshot_reader)
+_body_cache = OrderedDict()  # path -> CachedBody
+
+
+def _cache_key():
+    """(快照版本, 快照生成时间)：响应体只随快照变化，ETag / Last-Modified 也随之不变；没有快照时为 None"""
+    snap = snapshot_reader.get()
+    return (snap.version, snap.created) if snap else None
+
+
+def _accepted_encodings(header):
+    """Accept-Encoding -> 可接受的编码集合（q=0 的排除）"""
+    out = set()
+    for part in (header or '').split(','):
+        name, _, params = part.partition(';')
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                if float(params[2:]) <= 0:
+                    continue
+            except ValueError:
+                continue
+        if name.strip():
+            out.add(name.strip().lower())
+    return out
+
+
+def _compress(body, encoding):
+    if encoding == 'br':
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    return gzip.compress(body, GZIP_LEVEL, mtime=0)
+
+
+def _choose_encoding(body, accepted):
+    if len(body) < COMPRESS_MIN:
+        return None
+    if brotli is not None and 'br' in accepted:
+        return 'br'
+    if 'gzip' in accepted or '*' in accepted:
+        return 'gzip'
+    return None
+
+
+class CachedBody:
+    """一个响应体及其校验信息；压缩结果按编码懒生成，同一响应体只压缩一次"""
+
+    def __init__(self, key, body):
+        self.key = key
+        self.body = body
+        self.etag = 'W/"%s"' % hashlib.blake2b(body, digest_size=8).hexdigest()
+        self.last_modified = key[1] if key else int(time.time())  # 快照生成时间
+        self._encoded = {}
+
+    def encoded(self, encoding):
+        if encoding not in self._encoded:
+            self._encoded[encoding] = _compress(self.body, encoding)
+        return self._encoded[encoding]
+
+    def matches(self, if_none_match, if_modified_since):
+        """条件请求是否命中（命中返回 304）；If-None-Match 优先"""
+        if if_none_match:
+            tags = {t.strip().removeprefix('W/') for t in if_none_match.split(',')}
+            return '*' in tags or self.etag.removeprefix('W/') in tags
+        if if_modified_since:
+            try:
+                return self.last_modified <= parsedate_to_datetime(if_modified_since).timestamp()
+            except (TypeError, ValueError):
+                return False
+        return False
 
 
 class Handler(SimpleHTTPRequestHandler):
@@ -17,64 +108,132 @@ class Handler(SimpleHTTPRequestHandler):
         super().__init__(*args, directory=WEB_DIR, **kwargs)
 
     def do_GET(self):
-        if self.path == '/api/projects':
+        if self.path.split('?')[0] == '/api/projects':
             self._serve_projects()
-        elif self.path == '/api/archive':
+        elif self.path.split('?')[0] == '/api/archive':
             self._serve_archive()
+        elif self.path == '/api/archive/manifest':
+            self._serve_archive_manifest()
         elif self.path == '/api/stats':
             self._serve_stats()
         else:
             super().do_GET()
 
-    def _serve_json(self, data):
-        body = json.dumps(data, ensure_ascii=False).encode()
-        self.send_response(200)
+    def _serve_json(self, data, status=200):
+        """JSON 响应；data 为 CachedBody 时带 ETag / Last-Modified，条件请求命中返回 304"""
+        entry = data if isinstance(data, CachedBody) else None
+        if entry is not None:
+            if entry.matches(self.headers.get('If-None-Match'), self.headers.get('If-Modified-Since')):
+                self.send_response(304)
+                self._send_validators(entry)
+                self.end_headers()
+                return
+            body = entry.body
+        else:
+            body = data if isinstance(data, bytes) else json.dumps(data, ensure_ascii=False).encode()
+        encoding = _choose_encoding(body, _accepted_encodings(self.headers.get('Accept-Encoding')))
+        if encoding:
+            body = entry.encoded(encoding) if entry is not None else _compress(body, encoding)
+        self.send_response(status)
         self.send_header('Content-Type', 'application/json; charset=utf-8')
         self.send_header('Access-Control-Allow-Origin', '*')
+        self.send_header('Vary', 'Accept-Encoding')
+        if encoding:
+            self.send_header('Content-Encoding', encoding)
+        if entry is not None:
+            self._send_validators(entry)
         self.send_header('Content-Length', len(body))
         self.end_headers()
         self.wfile.write(body)
 
+    def _send_validators(self, entry):
+        self.send_header('ETag', entry.etag)
+        self.send_header('Last-Modified', formatdate(entry.last_modified, usegmt=True))
+        self.send_header('Cache-Control', 'no-cache')  # 浏览器每次带条件请求重新验证
+
+    def _cached(self, build):
+        """快照未变时直接返回缓存的响应体（CachedBody）；build(now) 返回 dict 或已序列化的 JSON 文本，
+        以快照生成时间为 now，响应体不随时间变化"""
+        key = _cache_key()
+        entry = _body_cache.get(self.path)
+        if key is not None and entry and entry.key == key:
+            _body_cache.move_to_end(self.path)
+            return entry
+        now = key[1] if key else int(time.time())
+        body = build(now)
+        if not isinstance(body, str):
+            body = json.dumps(body, ensure_ascii=False)
+        entry = CachedBody(key, body.encode())
+        if key is not None:
+            _body_cache[self.path] = entry
+            _body_cache.move_to_end(self.path)
+            if len(_body_cache) > BODY_CACHE_SIZE:
+                _body_cache.popitem(last=False)
+        return entry
+
     def _serve_projects(self):
+        """按索引过滤 / 排序 / 分页，参数见 project_query.py"""
         try:
-            with open(STATE_FILE) as f:
-                state = json.load(f)
-            projects = list(state.get('notified_full', {}).values())
-            now = int(time.time())
-            for p in projects:
-                ots = p.get('open_timestamp', 0)
-                if ots:
-                    p['age_hours'] = round((now - ots) / 3600, 1)
-            projects.sort(key=lambda x: -x.get('open_timestamp', 0))
-            self._serve_json({'count': len(projects), 'projects': projects})
+            args = {k: v[-1] for k, v in parse_qs(urlsplit(self.path).query).items()}
+            self._serve_json(self._cached(lambda now: project_query.query_json(args, now)))
+        except QueryError as e:
+            self._serve_json({'error': str(e)}, 400)
         except Exception as e:
             self._serve_json({'error': str(e)})
 
     def _serve_archive(self):
+        """归档项目 {日期: [项目]}；?date= 单日，?start=&end= 日期范围（YYYY-MM-DD，含两端）"""
         try:
-            with open(ARCHIVE_DB) as f:
-                db = json.load(f)
-            self._serve_json(db)
+            qs = parse_qs(urlsplit(self.path).query)
+            start = qs.get('start', [None])[0]
+            end = qs.get('end', [None])[0]
+            if 'date' in qs:
+                start = end = qs['date'][0]
+            self._serve_json(ArchiveStore(ARCHIVE_DB_DIR).load_range(start, end))
         except Exception as e:
             self._serve_json({'error': str(e)})
 
-    def _serve_stats(self):
+    def _serve_archive_manifest(self):
+        """各日期归档条数，不读取项目数据"""
         try:
-            with open(STATE_FILE) as f:
-                state = json.load(f)
-            projects = list(state.get('notified_full', {}).values())
-            now = int(time.time())
-            active_48h = [p for p in projects if p.get('open_timestamp', 0) > now - 48*3600]
-            ai_count = sum(1 for p in active_48h if p.get('is_ai_mining'))
-            dup_count = sum(1 for p in active_48h if p.get('trust_rank'))
-            self._serve_json({
-                'total_tracked': len(projects),
+            store = ArchiveStore(ARCHIVE_DB_DIR)
+            self._serve_json({d: {'count': store.count(d), 'ai': store.ai_count(d)} for d in store.dates()})
+        except Exception as e:
+            self._serve_json({'error': str(e)})
+
+    def _serve_stats(self):
+        def build(now):
+            snap = snapshot_reader.get()
+            if snap is not None:
+                # 只读定长行，不解析项目 JSON
+                active_48h = [r for r in snap.rows() if r.open_timestamp > now - 48*3600]
+                ai_count = sum(1 for r in active_48h if r.flags & F_AI)
+                dup_count = sum(1 for r in active_48h if r.flags & F_TRUST_RANK)
+                total, last_scan = len(snap), snap.last_scan
+            else:
+                projects, state = load_projects(snapshot_reader)
+                active_48h = [p for p in projects if p.get('open_timestamp', 0) > now - 48*3600]
+                ai_count = sum(1 for p in active_48h if p.get('is_ai_mining'))
+                dup_count = sum(1 for p in active_48h if p.get('trust_rank'))
+                total, last_scan = len(projects), state.get('last_scan', 0)
+            # 归档统计只读各日期汇总，不加载项目
+            store = ArchiveStore(ARCHIVE_DB_DIR)
+            archive = store.summary()
+            archive['recent'] = [
+                {'date': d, **{k: v for k, v in store.rollup(d).items() if k != 'symbols'}}
+                for d in store.dates()[-7:][::-1]
+            ]
+            return {
+                'total_tracked': total,
                 'active_48h': len(active_48h),
                 'ai_mining': ai_count,
                 'duplicates_scored': dup_count,
-                'last_scan': state.get('last_scan', 0),
-                'updated': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
-            })
+                'last_scan': last_scan,
+                'archive': archive,
+                'updated': datetime.fromtimestamp(now).strftime('%Y-%m-%d %H:%M:%S'),
+            }
+        try:
+            self._serve_json(self._cached(build))
         except Exception as e:
             self._serve_json({'error': str(e)})
 